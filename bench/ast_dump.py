@@ -0,0 +1,54 @@
+"""
+# ----------------------------------------------------------------------
+# ast_dump.py
+#
+# Time the text and JSON AST dumpers on large generated programs
+# and on deep ';' chains.
+#
+# Usage: python3 -m bench.ast_dump
+# ----------------------------------------------------------------------
+"""
+
+import io
+import time
+
+from bench.ast_memory import make_program
+from compiler import ast, dump
+
+
+def make_chain(depth):
+    """Build a left-nested chain of 'depth' ';' expressions."""
+    expr = ast.ConstExpression(0, ast.Int())
+    for _ in range(depth):
+        leaf = ast.ConstExpression(0, ast.Int())
+        expr = ast.BinaryExpression(expr, ";", leaf)
+    return expr
+
+
+def measure(label, tree, dumper, **kwargs):
+    """Dump 'tree' to memory and report time and output size."""
+    out = io.StringIO()
+    start = time.perf_counter()
+    dumper(tree, out, **kwargs)
+    elapsed = time.perf_counter() - start
+    print("%-24s %-5s %8.3f s %10.1f KiB" % (
+        label, dumper.__name__[5:], elapsed, len(out.getvalue()) / 1024
+    ))
+
+
+def main():
+    for node_count in (100000, 1000000):
+        program, count = make_program(node_count)
+        label = "program, %d nodes" % count
+        measure(label, program, dump.dump_text)
+        measure(label, program, dump.dump_json)
+
+    for depth in (10000, 100000):
+        chain = make_chain(depth)
+        label = "chain, depth %d" % depth
+        measure(label, chain, dump.dump_json)
+        measure(label, chain, dump.dump_text, indent="")
+
+
+if __name__ == "__main__":
+    main()
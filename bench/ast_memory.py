@@ -0,0 +1,73 @@
+"""
+# ----------------------------------------------------------------------
+# ast_memory.py
+#
+# Measure the memory footprint of AST nodes on a large synthetic program.
+#
+# Usage: python3 -m bench.ast_memory [node_count]
+# ----------------------------------------------------------------------
+"""
+
+import resource
+import sys
+
+from compiler import ast
+
+
+def node_size(node):
+    """Return the bytes owned by a node (instance + attribute dict)."""
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def make_program(node_count):
+    """
+    Build a program of roughly 'node_count' nodes made of definitions
+    like 'let xN = xM + N * (f xM)'.
+    """
+    defs = []
+    count = 1
+    i = 0
+    while count < node_count:
+        name = "x%d" % i
+        prev = "x%d" % max(i - 1, 0)
+        body = ast.BinaryExpression(
+            ast.GenidExpression(prev),
+            "+",
+            ast.BinaryExpression(
+                ast.ConstExpression(i, ast.Int()),
+                "*",
+                ast.FunctionCallExpression("f", [ast.GenidExpression(prev)])
+            )
+        )
+        defs.append(ast.LetDef([ast.ConstantDef(name, body)]))
+        count += 9
+        i += 1
+    return ast.Program(defs), count
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    samples = (
+        ast.BinaryExpression(None, "+", None),
+        ast.GenidExpression("x"),
+        ast.ConstExpression(1, None),
+        ast.FunctionCallExpression("f", []),
+        ast.Int(),
+    )
+    for node in samples:
+        print("%-24s %4d bytes" % (node.__class__.__name__, node_size(node)))
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    program, count = make_program(node_count)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("nodes: %d" % count)
+    print("RSS growth: %.1f MiB" % ((rss_after - rss_before) / 1024))
+    print("peak RSS: %.1f MiB" % (rss_after / 1024))
+    return program
+
+
+if __name__ == "__main__":
+    main()
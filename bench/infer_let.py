@@ -0,0 +1,126 @@
+"""
+# ----------------------------------------------------------------------
+# infer_let.py
+#
+# Time let-generalization on deeply nested let ... in programs,
+#
+#   let f0 x = x in let f1 x = f0 x in ... let fN x = f(N-1) x in fN
+#
+# with level-based generalization against a naive one, which scans
+# the types of every binding in scope for free type variables.
+#
+# Usage: python3 -m bench.infer_let
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import ast, infer, symbol
+
+DEPTHS = (250, 500, 1000, 2000)
+
+
+def free_roots(unifier, term):
+    """Return the roots of the unknown TempTypes in 'term'."""
+    roots = set()
+    stack = [unifier.resolve(term)]
+    while stack:
+        part = stack.pop()
+        if type(part) is infer.TempType:
+            roots.add(part.tag)
+        else:
+            stack.extend(getattr(part, attr) for attr in part._child_fields)
+    return roots
+
+
+class Naive:
+
+    """Generalization by scanning the environment, as in Algorithm W."""
+
+    def __init__(self, unifier):
+        self.unifier = unifier
+        self.env = []  # (type, roots of its generic TempTypes)
+
+    def generalize(self, ttype, _):
+        env_roots = set()
+        for env_type, generic in self.env:
+            env_roots |= free_roots(self.unifier, env_type) - generic
+        generic = free_roots(self.unifier, ttype) - env_roots
+        self.env.append((ttype, generic))
+        return len(self.env) - 1
+
+    def instantiate(self, scheme, level):
+        ttype, generic = self.env[scheme]
+        term = self.unifier.resolve(ttype)
+        fresh = {
+            tag: self.unifier.context.new_temp(None, level=level)
+            for tag in generic
+        }
+        return self._copy(term, fresh)
+
+    @staticmethod
+    def _copy(term, fresh):
+        if type(term) is infer.TempType:
+            return fresh.get(term.tag, term)
+        if not term._child_fields:
+            return term
+        copy = term._clone()
+        for attr in term._child_fields:
+            setattr(copy, attr, Naive._copy(getattr(term, attr), fresh))
+        return copy
+
+
+class Levels:
+
+    """Level-based generalization."""
+
+    def __init__(self, unifier):
+        self.unifier = unifier
+
+    def generalize(self, ttype, nesting):
+        self.unifier.generalize(ttype, nesting)
+        return ttype
+
+    def instantiate(self, scheme, level):
+        return self.unifier.instantiate(scheme, level)
+
+
+def nested_lets(strategy_class, depth):
+    """Infer the types of a nested let program; return the time taken."""
+    unifier = infer.Unifier()
+    context = unifier.context
+    strategy = strategy_class(unifier)
+    table = symbol.Table()
+    start = time.perf_counter()
+    previous = None
+    for _ in range(depth):
+        nesting = table.nesting
+        table.open_scope()  # let fi ...
+        function = context.new_temp(None, level=table.nesting)
+        table.open_scope()  # ... x = ...
+        param = context.new_temp(None, level=table.nesting)
+        result = context.new_temp(None, level=table.nesting)
+        if previous is None:
+            unifier.unify(result, param)
+        else:
+            # The call f(i-1) x, of type 'result'.
+            callee = strategy.instantiate(previous, table.nesting)
+            unifier.unify(callee.fromType, param)
+            unifier.unify(callee.toType, result)
+        table.close_scope()
+        unifier.unify(function, ast.Function(param, result))
+        previous = strategy.generalize(function, nesting)
+    return time.perf_counter() - start
+
+
+def main():
+    for depth in DEPTHS:
+        naive = nested_lets(Naive, depth)
+        levels = nested_lets(Levels, depth)
+        print("depth %5d  naive %8.3f s  levels %8.3f s  %6.1fx" % (
+            depth, naive, levels, naive / levels
+        ))
+
+
+if __name__ == "__main__":
+    main()
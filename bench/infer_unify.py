@@ -0,0 +1,127 @@
+"""
+# ----------------------------------------------------------------------
+# infer_unify.py
+#
+# Time the unification engine on the constraints of long chains of
+# unannotated let definitions:
+#
+#   let x0 = 0        let x1 = x0        ...   (value chain)
+#   let f0 x = x      let f1 x = f0 x    ...   (function chain)
+#   let b1 = x1 < x0  let b2 = x2 < x1 ...   (comparison chain)
+#
+# and on types built bottom-up, each from the one before it:
+#
+#   t1 = t0 ref         t2 = t1 ref         ...   (ref tower)
+#   t1 = t0 -> int      t2 = t1 -> int      ...   (arrow tower)
+#
+# Usage: python3 -m bench.infer_unify
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import ast, infer
+
+SIZES = (1000, 10000, 100000)
+
+
+def value_chain(context, count):
+    """Return the constraints and TempTypes of a chain of values."""
+    xs = [context.new_temp(None) for _ in range(count)]
+    constraints = [
+        infer.AsTypeOfConstraint(xs[i], xs[i - 1])
+        for i in range(count - 1, 0, -1)
+    ]
+    constraints.append(infer.SpecConstraint(xs[0], ast.Int()))
+    return constraints, xs
+
+
+def function_chain(context, count):
+    """Return the constraints and TempTypes of a chain of functions."""
+    constraints = []
+    fs = []
+    for i in range(count):
+        f, x, r = (context.new_temp(None) for _ in range(3))
+        constraints.append(infer.SpecConstraint(f, ast.Function(x, r)))
+        if i == 0:
+            constraints.append(infer.AsTypeOfConstraint(r, x))
+        else:
+            # The call 'f(i-1) x': f(i-1) must take x and return r.
+            constraints.append(
+                infer.SpecConstraint(fs[-1], ast.Function(x, r))
+            )
+        fs.append(f)
+    constraints.append(
+        infer.SpecConstraint(fs[-1], ast.Function(ast.Int(), ast.Int()))
+    )
+    return constraints, fs
+
+
+def comparison_chain(context, count):
+    """
+    Return the constraints and TempTypes of a chain of comparisons,
+    'let b_i = x_i < x_(i-1)', of operands all of the same type.
+    """
+    constraints = []
+    xs = []
+    for i in range(count):
+        x, b = context.new_temp(None), context.new_temp(None)
+        constraints.append(
+            infer.NegSetConstraint(x, (ast.Function, ast.Array))
+        )
+        if xs:
+            constraints.append(infer.AsTypeOfConstraint(x, xs[-1]))
+        constraints.append(infer.SpecConstraint(b, ast.Bool()))
+        xs.append(x)
+    constraints.append(infer.SpecConstraint(xs[0], ast.Int()))
+    return constraints, xs
+
+
+def tower(make):
+    """
+    Return a function making the constraints of a type built bottom-up,
+    where the type of each TempType is 'make' of the one before it, and
+    the TempType of the whole type. Resolving the others as well would
+    copy the tower once per level.
+    """
+    def make_tower(context, count):
+        ts = [context.new_temp(None) for _ in range(count)]
+        constraints = [
+            infer.SpecConstraint(ts[i], make(ts[i - 1]))
+            for i in range(1, count)
+        ]
+        return constraints, ts[-1:]
+    return make_tower
+
+
+def run(label, make, count):
+    """Solve the constraints of one program and resolve every type."""
+    unifier = infer.Unifier()
+    constraints, ttypes = make(unifier.context, count)
+    start = time.perf_counter()
+    unifier.solve(constraints)
+    solved = time.perf_counter()
+    for ttype in ttypes:
+        unifier.resolve(ttype)
+    resolved = time.perf_counter()
+    print("%-16s %7d  solve %8.3f s %6.2f us/constraint  resolve %8.3f s" % (
+        label, count, solved - start,
+        (solved - start) * 1e6 / len(constraints), resolved - solved
+    ))
+
+
+def main():
+    for count in SIZES:
+        run("value chain", value_chain, count)
+    for count in SIZES:
+        run("function chain", function_chain, count)
+    for count in SIZES:
+        run("comparison chain", comparison_chain, count)
+    for count in SIZES:
+        run("ref tower", tower(ast.Ref), count)
+    for count in SIZES:
+        run("arrow tower", tower(lambda t: ast.Function(t, ast.Int())), count)
+
+
+if __name__ == "__main__":
+    main()
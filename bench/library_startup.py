@@ -0,0 +1,46 @@
+"""
+# ----------------------------------------------------------------------
+# library_startup.py
+#
+# Time the construction of symbol tables with the shared library
+# namespace against tables holding their own copy of its entries.
+#
+# Usage: python3 -m bench.library_startup
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import library, symbol
+
+TABLES = 10000
+
+
+def copied_library_table():
+    """Make a Table owning an entry for every library function."""
+    table = symbol.Table(namespace={})
+    for node in library.NAMESPACE.values():
+        table.insert_symbol(node)
+    return table
+
+
+def timed(label, func, repeat):
+    """Call 'func' 'repeat' times and report the time per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print("%-32s %10.2f us" % (label, elapsed * 1e6 / repeat))
+
+
+def main():
+    print("%d library functions" % len(library.NAMESPACE))
+    timed("build namespace (once)", library._build, 100)
+    timed("Table, shared library", symbol.Table, TABLES)
+    timed("Table, copied library", copied_library_table, TABLES)
+    timed("CompactTable, shared library", symbol.CompactTable, TABLES)
+    timed("PersistentTable, shared library", symbol.PersistentTable, TABLES)
+
+
+if __name__ == "__main__":
+    main()
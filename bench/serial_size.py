@@ -0,0 +1,81 @@
+"""
+# ----------------------------------------------------------------------
+# serial_size.py
+#
+# Compare the binary AST format with pickle on the tests/correct
+# programs, scaled up by repetition.
+#
+# Usage: python3 -m bench.serial_size [copies]
+# ----------------------------------------------------------------------
+"""
+
+import glob
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from compiler import ast, parse, serial
+
+
+def make_source(copies):
+    """Return the text of all tests/correct programs, 'copies' times."""
+    sources = []
+    for path in sorted(glob.glob("tests/correct/*.lla")):
+        with open(path) as source:
+            sources.append(source.read())
+    return "\n".join(sources * copies)
+
+
+def timed(func, *args):
+    """Call 'func' and return its result along with the seconds it took."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    tree = parse.quiet_parse(make_source(copies))
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "ast.pickle")
+        serial_path = os.path.join(tmp, "ast.bin")
+
+        with open(pickle_path, "wb") as out:
+            _, pickle_dump = timed(pickle.dump, tree, out, -1)
+        with open(serial_path, "wb") as out:
+            _, serial_dump = timed(serial.dump, tree, out)
+
+        def pickle_load():
+            with open(pickle_path, "rb") as inp:
+                return pickle.load(inp)
+
+        _, pickle_load_time = timed(pickle_load)
+        flat, serial_open = timed(serial.load, serial_path)
+        names, serial_scan = timed(
+            lambda: [flat.name(i) for i in flat.nodes_of_class(ast.Def)]
+        )
+        _, serial_full = timed(flat.to_node)
+        node_count = len(flat)
+        flat.close()
+
+        print("nodes: %d, definitions: %d" % (node_count, len(names)))
+        print("%-8s %10s %10s %10s" % ("", "size KiB", "dump s", "load s"))
+        print("%-8s %10.1f %10.3f %10.3f" % (
+            "pickle", os.path.getsize(pickle_path) / 1024,
+            pickle_dump, pickle_load_time
+        ))
+        print("%-8s %10.1f %10.3f %10.3f" % (
+            "serial", os.path.getsize(serial_path) / 1024,
+            serial_dump, serial_open
+        ))
+        print("serial: scan definitions %.3f s, materialize all %.3f s" % (
+            serial_scan, serial_full
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+# ----------------------------------------------------------------------
+# span_query.py
+#
+# Time "innermost node at position" queries on a large parsed program,
+# walking the AST against querying the span interval index.
+#
+# Usage: python3 -m bench.span_query [definition_count]
+# ----------------------------------------------------------------------
+"""
+
+import random
+import sys
+import time
+
+from compiler import ast, error, parse
+
+
+class _InnermostFinder(ast.Visitor):
+
+    """Walk the AST, pruning subtrees whose span misses an offset."""
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+        self.found = None
+
+    def pre_Node(self, node):
+        span = node.span
+        if span is None:
+            return True
+        if not span[0] <= self.offset < span[1]:
+            return False
+        self.found = node
+        return True
+
+
+def walk_query(tree, offset):
+    """Find the innermost node at 'offset' by walking the tree."""
+    finder = _InnermostFinder(offset)
+    finder.visit(tree)
+    return finder.found
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source = "\n".join(
+        "let x%d y = (x%d y) + %d * (if y > 0 then y else -y)" %
+        (i, max(i - 1, 0), i)
+        for i in range(count)
+    )
+    parser = parse.Parser(logger=error.LoggerMock())
+    tree = parser.parse(source)
+    spans = parser.spans
+
+    rng = random.Random(0)
+    offsets = [rng.randrange(len(source)) for _ in range(200)]
+
+    start = time.perf_counter()
+    spans.intervals()
+    build = time.perf_counter() - start
+    print("%d definitions, %d spans" % (count, len(spans.intervals())))
+    print("%-24s %10.3f ms" % ("index build", build * 1e3))
+
+    for label, query in (
+        ("tree walk", lambda offset: walk_query(tree, offset)),
+        ("interval index", spans.node_at),
+    ):
+        start = time.perf_counter()
+        for offset in offsets:
+            query(offset)
+        elapsed = time.perf_counter() - start
+        print("%-24s %10.3f ms/query" % (
+            label, elapsed * 1e3 / len(offsets)
+        ))
+
+    for offset in offsets:
+        assert walk_query(tree, offset) is spans.node_at(offset)
+
+
+if __name__ == "__main__":
+    main()
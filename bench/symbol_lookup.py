@@ -0,0 +1,49 @@
+"""
+# ----------------------------------------------------------------------
+# symbol_lookup.py
+#
+# Time live-definition lookups in the symbol table under deep
+# shadowing: one visible definition of a name buried under many
+# definitions in hidden scopes.
+#
+# Usage: python3 -m bench.symbol_lookup
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import ast, symbol
+
+LOOKUPS = 100000
+
+
+def make_table(depth):
+    """
+    Build a table with 'depth' nested scopes, each defining "x".
+    All but the outermost are hidden, as are the scopes of a chain of
+    non-recursive 'let's while their definitions are analyzed.
+    """
+    table = symbol.Table()
+    for level in range(depth):
+        scope = table.open_scope()
+        table.insert_symbol(ast.GenidExpression("x"))
+        if level:
+            scope.visible = False
+    return table
+
+
+def main():
+    for depth in (1, 10, 100, 1000):
+        table = make_table(depth)
+        lookup = table.lookup_live_definition
+        start = time.perf_counter()
+        for _ in range(LOOKUPS):
+            lookup("x")
+        elapsed = time.perf_counter() - start
+        print("depth %5d %10.3f us/lookup" % (
+            depth, elapsed * 1e6 / LOOKUPS
+        ))
+
+
+if __name__ == "__main__":
+    main()
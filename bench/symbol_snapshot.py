@@ -0,0 +1,69 @@
+"""
+# ----------------------------------------------------------------------
+# symbol_snapshot.py
+#
+# Capture the environment before every top-level definition of a large
+# program, as a parallel or incremental analysis would: by copying the
+# live definitions out of a symbol.Table, or by taking a snapshot of a
+# symbol.PersistentTable. Also time plain insertion and lookup.
+#
+# Usage: python3 -m bench.symbol_snapshot
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import ast, symbol
+
+
+def copy_environment(table):
+    """Capture the live definitions of a Table by copying them."""
+    return dict(
+        (name, table.lookup_live_definition(name))
+        for name in table._visible_table
+    )
+
+
+def capture_all(table, nodes, capture):
+    """Define 'nodes' one scope each, capturing the table before each."""
+    snapshots = []
+    for node in nodes:
+        snapshots.append(capture(table))
+        table.open_scope()
+        table.insert_symbol(node)
+    return snapshots
+
+
+def lookups(table, nodes):
+    """Define 'nodes' in one scope, then look every one of them up."""
+    table.open_scope()
+    for node in nodes:
+        table.insert_symbol(node)
+    for node in nodes:
+        table.lookup_live_definition(node.name)
+
+
+def timed(label, func, *args):
+    """Run 'func' and report the time taken."""
+    start = time.perf_counter()
+    func(*args)
+    print("%-40s %8.3f s" % (label, time.perf_counter() - start))
+
+
+def main():
+    for count in (1000, 5000):
+        nodes = [ast.GenidExpression("x%d" % i) for i in range(count)]
+        timed("Table, copy, %d definitions" % count,
+              capture_all, symbol.Table(), nodes, copy_environment)
+        timed("PersistentTable, snapshot, %d definitions" % count,
+              capture_all, symbol.PersistentTable(), nodes,
+              symbol.PersistentTable.snapshot)
+
+    nodes = [ast.GenidExpression("x%d" % i) for i in range(200000)]
+    for cls in (symbol.Table, symbol.CompactTable, symbol.PersistentTable):
+        timed("%s, 200000 inserts and lookups" % cls.__name__,
+              lookups, cls(), nodes)
+
+
+if __name__ == "__main__":
+    main()
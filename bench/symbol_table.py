@@ -0,0 +1,99 @@
+"""
+# ----------------------------------------------------------------------
+# symbol_table.py
+#
+# Compare symbol.Table and symbol.CompactTable on synthetic workloads
+# of one million bindings: many short-lived scopes, and deeply nested
+# scopes all alive at once.
+#
+# Usage: python3 -m bench.symbol_table
+# ----------------------------------------------------------------------
+"""
+
+import gc
+import time
+import tracemalloc
+
+from compiler import ast, symbol
+
+BINDINGS = 1000000
+VOCABULARY = 1000
+
+
+def _set_visible(table, visible):
+    """Change the visibility of the current scope of either table."""
+    if isinstance(table, symbol.CompactTable):
+        table.set_visible(visible)
+    else:
+        table.cur_scope.visible = visible
+
+
+def blocks(table, nodes, width):
+    """
+    Analyze scopes of 'width' bindings one after the other, as for
+    a sequence of 'let's: open a hidden scope, look up names, define
+    the names, show the scope and look the names up again.
+    """
+    lookup = table.lookup_live_definition
+    insert = table.insert_symbol
+    for start in range(0, len(nodes), width):
+        table.open_scope()
+        _set_visible(table, False)
+        block = nodes[start:start + width]
+        for node in block:
+            lookup(node.name)
+        for node in block:
+            insert(node)
+        _set_visible(table, True)
+        for node in block:
+            lookup(node.name)
+        table.close_scope()
+
+
+def nested(table, nodes, width):
+    """
+    Open nested scopes of 'width' bindings each, then close them.
+    Return the memory traced while all scopes are open, if tracing.
+    """
+    insert = table.insert_symbol
+    for start in range(0, len(nodes), width):
+        table.open_scope()
+        for node in nodes[start:start + width]:
+            insert(node)
+    size = tracemalloc.get_traced_memory()[0]
+    for _ in range(0, len(nodes), width):
+        table.close_scope()
+    return size
+
+
+def main():
+    names = ["x%d" % i for i in range(VOCABULARY)]
+    nodes = [
+        ast.GenidExpression(names[i % VOCABULARY]) for i in range(BINDINGS)
+    ]
+    print("%d bindings over %d names" % (BINDINGS, VOCABULARY))
+    for cls in (symbol.Table, symbol.CompactTable):
+        gc.collect()
+        start = time.perf_counter()
+        blocks(cls(), nodes, 10)
+        elapsed = time.perf_counter() - start
+        print("%-14s blocks  %8.3f s" % (cls.__name__, elapsed))
+
+        gc.collect()
+        start = time.perf_counter()
+        nested(cls(), nodes, VOCABULARY)
+        elapsed = time.perf_counter() - start
+
+        # Tracing slows down allocation, so measure memory separately.
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        size = nested(cls(), nodes, VOCABULARY)
+        tracemalloc.stop()
+        print("%-14s nested  %8.3f s %8.1f MiB" % (
+            cls.__name__, elapsed, (size - base) / 2 ** 20
+        ))
+
+
+if __name__ == "__main__":
+    main()
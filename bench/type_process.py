@@ -0,0 +1,57 @@
+"""
+# ----------------------------------------------------------------------
+# type_process.py
+#
+# Time the processing of large groups of generated algebraic types:
+# a chain of mutually recursive types and independent binary trees.
+#
+# Usage: python3 -m bench.type_process
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import parse, typesem
+
+TYPES = 2000
+
+
+def cycle(count):
+    """Return a group of 'count' types, each referring to the next."""
+    return parse.quiet_parse(" ".join(["type"] + [
+        "%st%d = N%d of int t%d | L%d" % (
+            "and " if i else "", i, i, (i + 1) % count, i
+        )
+        for i in range(count)
+    ]), "typedef")
+
+
+def trees(count):
+    """Return a group of 'count' independent recursive tree types."""
+    return parse.quiet_parse(" ".join(["type"] + [
+        "%st%d = N%d of t%d int t%d | L%d" % (
+            "and " if i else "", i, i, i, i, i
+        )
+        for i in range(count)
+    ]), "typedef")
+
+
+def timed(label, group, repeat=10):
+    """Process 'group' in fresh tables and report the time per type."""
+    best = None
+    for _ in range(repeat):
+        table = typesem.Table()
+        start = time.perf_counter()
+        table.process(group)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-28s %10.2f us/type" % (label, best * 1e6 / len(group)))
+
+
+def main():
+    timed("%d types in one cycle" % TYPES, cycle(TYPES))
+    timed("%d independent trees" % TYPES, trees(TYPES))
+
+
+if __name__ == "__main__":
+    main()
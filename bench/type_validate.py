@@ -0,0 +1,54 @@
+"""
+# ----------------------------------------------------------------------
+# type_validate.py
+#
+# Time the validation of type annotations: a long curried function
+# type validated once, and the same annotation validated repeatedly.
+#
+# Usage: python3 -m bench.type_validate
+# ----------------------------------------------------------------------
+"""
+
+import time
+
+from compiler import ast, parse, typesem
+
+ARROWS = 200
+REPEAT = 10000
+
+
+def curried(arrows):
+    """Return the canonical type 'int -> int -> ... -> int'."""
+    source = " -> ".join(["int"] * (arrows + 1))
+    return parse.quiet_parse(source, "type")
+
+
+def timed(label, func, repeat):
+    """Call 'func' 'repeat' times and report the time per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print("%-36s %10.2f us" % (label, elapsed * 1e6 / repeat))
+
+
+def main():
+    t = curried(ARROWS)
+    timed(
+        "validate %d arrows, fresh table" % ARROWS,
+        lambda: typesem.Table().validate(t),
+        REPEAT // 100
+    )
+    table = typesem.Table()
+    timed("validate %d arrows, again" % ARROWS,
+          lambda: table.validate(t), REPEAT)
+
+    deep = ast.Int()
+    for _ in range(100000):
+        deep = ast.Function(ast.Int(), deep)
+    timed("validate 100000 arrows, fresh table",
+          lambda: typesem.Table().validate(deep), 1)
+
+
+if __name__ == "__main__":
+    main()
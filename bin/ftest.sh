@@ -1,10 +1,11 @@
 #!/bin/sh
 
 TEST_PATH=tests/correct
+PYTHON=${PYTHON:-python3}
 
 for i in $(ls $TEST_PATH); do
     echo ".: Testing: $i"
-    python3 main.py -i $TEST_PATH/$i
+    $PYTHON main.py -i $TEST_PATH/$i
     if [ $? -ne 0 ]; then
         exit 1
     fi
@@ -0,0 +1,289 @@
+"""
+# ----------------------------------------------------------------------
+# arena.py
+#
+# Flat (struct-of-arrays) representation of Llama ASTs
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+"""
+
+from array import array
+
+from compiler import ast
+
+# == NODE KINDS ==
+
+# All concrete node classes. The index of a class is its node kind.
+# NOTE: Append only; kinds are persisted by compiler.serial.
+NODE_CLASSES = (
+    ast.Program,
+    ast.LetDef,
+    ast.ConstantDef,
+    ast.FunctionDef,
+    ast.Param,
+    ast.BinaryExpression,
+    ast.UnaryExpression,
+    ast.ConstructorCallExpression,
+    ast.ArrayExpression,
+    ast.ConstExpression,
+    ast.ConidExpression,
+    ast.GenidExpression,
+    ast.DeleteExpression,
+    ast.DimExpression,
+    ast.ForExpression,
+    ast.FunctionCallExpression,
+    ast.LetInExpression,
+    ast.IfExpression,
+    ast.MatchExpression,
+    ast.Clause,
+    ast.Pattern,
+    ast.GenidPattern,
+    ast.NewExpression,
+    ast.WhileExpression,
+    ast.VariableDef,
+    ast.ArrayVariableDef,
+    ast.TDef,
+    ast.Constructor,
+    ast.Bool,
+    ast.Char,
+    ast.Float,
+    ast.Int,
+    ast.Unit,
+    ast.User,
+    ast.Ref,
+    ast.Array,
+    ast.Function,
+)
+
+# Pseudo-kinds: a plain list of subtrees and an absent (None) subtree.
+LIST = len(NODE_CLASSES)
+NONE = LIST + 1
+
+_KIND_OF_CLASS = {cls: kind for kind, cls in enumerate(NODE_CLASSES)}
+
+# Marker of a missing link or position.
+NIL = -1
+
+
+def kind_name(kind):
+    """Return a printable name for a node kind."""
+    if kind == LIST:
+        return "list"
+    if kind == NONE:
+        return "None"
+    return NODE_CLASSES[kind].__name__
+
+
+class Arena:
+
+    """
+    An AST stored as parallel typed arrays, indexed by node number.
+
+    Nodes are numbered in preorder, so the root is node 0 and every
+    node precedes its descendants. For every node the arena stores its
+    kind, parent, first child, next sibling, position and the offset of
+    its data values. Data values (names, operators, constants) live in
+    an interned value table and are referenced by index.
+
+    Children of a node appear in the order of its class's
+    '_child_fields'; a list of subtrees is a LIST node and a missing
+    subtree is a NONE node, so the tree shape is fully preserved.
+
+    The view methods below only read the arrays; no AST objects are
+    created unless 'to_node' is called.
+    """
+
+    def __init__(self):
+        """Make a new, empty arena."""
+        self.kinds = array('B')
+        self.parents = array('i')
+        self.first_children = array('i')
+        self.next_siblings = array('i')
+        self.linenos = array('i')
+        self.lexposes = array('i')
+        self.data_offsets = array('i')
+
+        # Value ids of the data fields of all nodes, back to back.
+        self.data = array('i')
+
+        # Interned values; 'self.data' indexes this list.
+        self.values = []
+        self._value_ids = {}
+
+    # == CONSTRUCTION ==
+
+    def _intern(self, value):
+        """Return the id of 'value' in the value table."""
+        if isinstance(value, list):
+            value = tuple(value)
+        # The type is part of the key, so that 1, 1.0 and True differ.
+        key = (type(value), value)
+        value_id = self._value_ids.get(key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._value_ids[key] = value_id
+        return value_id
+
+    def _append(self, kind, parent, obj):
+        """Append a new node, link it to its parent and return its index."""
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.parents.append(parent)
+        self.first_children.append(NIL)
+        self.next_siblings.append(NIL)
+        self.data_offsets.append(len(self.data))
+
+        if isinstance(obj, ast.Node):
+            for attr in obj._data_fields:
+                self.data.append(self._intern(getattr(obj, attr)))
+            lineno, lexpos = obj.lineno, obj.lexpos
+            self.linenos.append(NIL if lineno is None else lineno)
+            self.lexposes.append(NIL if lexpos is None else lexpos)
+        else:
+            self.linenos.append(NIL)
+            self.lexposes.append(NIL)
+        return index
+
+    @classmethod
+    def from_node(cls, root):
+        """Build an arena holding the tree rooted at 'root'."""
+        arena = cls()
+        # Last child appended under each node, for sibling linking.
+        last_children = {}
+        stack = [(root, NIL)]
+        while stack:
+            obj, parent = stack.pop()
+            if obj is None:
+                kind = NONE
+            elif isinstance(obj, list):
+                kind = LIST
+            else:
+                kind = _KIND_OF_CLASS[type(obj)]
+
+            index = arena._append(kind, parent, obj)
+            if parent != NIL:
+                prev = last_children.get(parent, NIL)
+                if prev == NIL:
+                    arena.first_children[parent] = index
+                else:
+                    arena.next_siblings[prev] = index
+                last_children[parent] = index
+
+            if kind == LIST:
+                children = obj
+            elif kind == NONE:
+                continue
+            else:
+                children = [getattr(obj, attr) for attr in obj._child_fields]
+            stack.extend((child, index) for child in reversed(children))
+        return arena
+
+    # == READ-ONLY VIEW ==
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, index):
+        """Return the kind of a node."""
+        return self.kinds[index]
+
+    def node_class(self, index):
+        """Return the ast class of a node, or None for pseudo-kinds."""
+        kind = self.kinds[index]
+        if kind < LIST:
+            return NODE_CLASSES[kind]
+        return None
+
+    def parent(self, index):
+        """Return the parent of a node, or NIL for the root."""
+        return self.parents[index]
+
+    def children(self, index):
+        """Iterate over the children of a node."""
+        child = self.first_children[index]
+        while child != NIL:
+            yield child
+            child = self.next_siblings[child]
+
+    def child(self, index, attr):
+        """Return the child of a node stored in field 'attr'."""
+        position = NODE_CLASSES[self.kinds[index]]._child_fields.index(attr)
+        child = self.first_children[index]
+        for _ in range(position):
+            child = self.next_siblings[child]
+        return child
+
+    def data_value(self, index, attr):
+        """Return the value of the data field 'attr' of a node."""
+        position = NODE_CLASSES[self.kinds[index]]._data_fields.index(attr)
+        return self.values[self.data[self.data_offsets[index] + position]]
+
+    def name(self, index):
+        """Return the name of a node carrying one, None otherwise."""
+        kind = self.kinds[index]
+        if kind < LIST and 'name' in NODE_CLASSES[kind]._data_fields:
+            return self.data_value(index, 'name')
+        return None
+
+    def position(self, index):
+        """Return the (lineno, lexpos) of a node; None when unknown."""
+        lineno, lexpos = self.linenos[index], self.lexposes[index]
+        return (
+            None if lineno == NIL else lineno,
+            None if lexpos == NIL else lexpos
+        )
+
+    def subtree_end(self, index):
+        """Return the index following the last descendant of a node."""
+        while index != NIL:
+            sibling = self.next_siblings[index]
+            if sibling != NIL:
+                return sibling
+            index = self.parents[index]
+        return len(self.kinds)
+
+    def preorder(self, index=0):
+        """Iterate over a subtree in preorder, by index."""
+        return iter(range(index, self.subtree_end(index)))
+
+    def nodes_of_class(self, cls, index=0):
+        """Iterate over the nodes of a subtree that are instances of 'cls'."""
+        wanted = bytes(
+            issubclass(klass, cls) for klass in NODE_CLASSES
+        ) + b'\0\0'
+        kinds = self.kinds
+        return (i for i in self.preorder(index) if wanted[kinds[i]])
+
+    # == CONVERSION TO AST ==
+
+    def _make(self, index, children):
+        """Create the object of node 'index' from its built children."""
+        kind = self.kinds[index]
+        if kind == LIST:
+            return children
+        if kind == NONE:
+            return None
+
+        cls = NODE_CLASSES[kind]
+        node = cls.__new__(cls)
+        offset = self.data_offsets[index]
+        for i, attr in enumerate(cls._data_fields):
+            value = self.values[self.data[offset + i]]
+            if isinstance(value, tuple):
+                value = list(value)
+            setattr(node, attr, value)
+        for attr, child in zip(cls._child_fields, children):
+            setattr(node, attr, child)
+        node.set_pos(*self.position(index))
+        return node
+
+    def to_node(self, index=0):
+        """Rebuild the AST objects of the subtree rooted at 'index'."""
+        end = self.subtree_end(index)
+        built = {}
+        # Descendants follow their ancestors, so build backwards.
+        for i in range(end - 1, index - 1, -1):
+            children = [built.pop(child) for child in self.children(i)]
+            built[i] = self._make(i, children)
+        return built[index]
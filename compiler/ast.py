@@ -13,14 +13,77 @@
 
 import abc
 import collections.abc
+import io
 
 # pylint: disable=redefined-builtin
 # == INTERFACES OF AST NODES ==
 
 
-class Node(metaclass=abc.ABCMeta):
-    lineno = None
-    lexpos = None
+class _NodeMeta(abc.ABCMeta):
+
+    """
+    Metaclass of all AST nodes.
+
+    Each node class declares its attributes, split into '_data_fields'
+    (names, operators, literal values, flags) and '_child_fields'
+    (nodes, lists of nodes or None). Nodes are slotted: unless a class
+    provides __slots__ itself, its slots are the fields it declares
+    on top of those of its bases.
+    """
+
+    def __new__(cls, name, bases, namespace):
+        if '__slots__' not in namespace:
+            inherited = {
+                attr
+                for base in bases
+                for klass in base.__mro__
+                for attr in klass.__dict__.get('__slots__', ())
+            }
+            declared = namespace.get('_data_fields', ())
+            declared += namespace.get('_child_fields', ())
+            namespace['__slots__'] = tuple(
+                attr for attr in declared if attr not in inherited
+            )
+        return super().__new__(cls, name, bases, namespace)
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._fields = cls._data_fields + cls._child_fields
+
+
+def _freeze(value):
+    """Return a hashable version of a data field value."""
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _copy_data(value):
+    """Copy a data field value, so that no mutable state is shared."""
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class Node(metaclass=_NodeMeta):
+    # Position of the node in the source: None if unknown, an explicit
+    # (lineno, lexpos) pair, or the span.SpanTable recording its span,
+    # at index '_span_index' there.
+    # Nodes can be weakly referenced, as before they were slotted.
+    __slots__ = ('_span', '_span_index', '__weakref__')
+
+    # Attributes holding plain values.
+    _data_fields = ()
+
+    # Attributes holding subtrees: a node, a list of subtrees or None.
+    _child_fields = ()
+
+    def __new__(cls, *args, **kwargs):
+        """Create a node. Position is unknown until explicitly set."""
+        # pylint: disable=unused-argument
+        node = super().__new__(cls)
+        node._span = None
+        return node
 
     @abc.abstractmethod
     def __init__(self):
@@ -29,19 +92,183 @@ class Node(metaclass=abc.ABCMeta):
     def __eq__(self, other):
         """
         Two nodes are equal if they are of the same type
-        and have all attributes equal. Override as needed.
+        and have all attributes equal. Positions are ignored.
+
+        The comparison uses an explicit stack, so arbitrarily
+        deep trees can be compared.
+        """
+        stack = [(self, other)]
+        while stack:
+            node1, node2 = stack.pop()
+            if node1 is node2:
+                continue
+            if isinstance(node1, Node):
+                cls = type(node1)
+                if cls is not type(node2):
+                    return False
+                for attr in cls._data_fields:
+                    if getattr(node1, attr) != getattr(node2, attr):
+                        return False
+                for attr in cls._child_fields:
+                    stack.append((getattr(node1, attr), getattr(node2, attr)))
+            elif isinstance(node1, list):
+                if not isinstance(node2, list) or len(node1) != len(node2):
+                    return False
+                stack.extend(zip(node1, node2))
+            elif isinstance(node2, (Node, list)) or node1 != node2:
+                return False
+        return True
+
+    def __hash__(self):
+        """
+        Hash the whole tree, consistently with equality.
+
+        The preorder sequence of classes, data values and list lengths
+        determines the tree, so it is folded into the hash.
+        Annotations such as 'type' are part of the tree: a node must not
+        be mutated while it is used as a dict key or set member.
+        """
+        hashed = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Node):
+                cls = type(node)
+                hashed.append(cls)
+                hashed.extend(
+                    _freeze(getattr(node, attr)) for attr in cls._data_fields
+                )
+                stack.extend(
+                    getattr(node, attr)
+                    for attr in reversed(cls._child_fields)
+                )
+            elif isinstance(node, list):
+                hashed.append(len(node))
+                stack.extend(reversed(node))
+            else:
+                hashed.append(node)
+        return hash(tuple(hashed))
+
+    def _clone(self):
+        """Return a copy of this node alone, sharing all children."""
+        cls = type(self)
+        node = cls.__new__(cls)
+        for attr in cls._data_fields:
+            setattr(node, attr, _copy_data(getattr(self, attr)))
+        for attr in cls._child_fields:
+            setattr(node, attr, getattr(self, attr))
+        node.copy_pos(self)
+        return node
+
+    def __copy__(self):
+        return self._clone()
+
+    def __deepcopy__(self, memo):
         """
-        # pylint: disable=unidiomatic-typecheck
-        return type(self) == type(other) and all(
-            getattr(self, attr) == getattr(other, attr)
-            for attr in self.__dict__.keys()
-            if attr not in ('lineno', 'lexpos')
-        )
+        Copy the whole tree, using an explicit stack.
+
+        Subtrees shared in the original are shared in the copy.
+        """
+        def copy_child(child):
+            if id(child) in memo:
+                return memo[id(child)]
+            if isinstance(child, Node):
+                new_child = child._clone()
+            elif isinstance(child, list):
+                new_child = list(child)
+            else:
+                return child
+            memo[id(child)] = new_child
+            stack.append(new_child)
+            return new_child
+
+        stack = []
+        root = copy_child(self)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                node[:] = [copy_child(item) for item in node]
+            else:
+                for attr in node._child_fields:
+                    setattr(node, attr, copy_child(getattr(node, attr)))
+        return root
+
+    def _position(self):
+        """Return the (lineno, lexpos) of the node."""
+        span = self._span
+        if span is None:
+            return None, None
+        if isinstance(span, tuple):
+            return span
+        return span.position(self)
+
+    @property
+    def lineno(self):
+        """Line of the node in the source, or None if unknown."""
+        return self._position()[0]
+
+    @lineno.setter
+    def lineno(self, lineno):
+        self.set_pos(lineno, self.lexpos)
+
+    @property
+    def lexpos(self):
+        """Column of the node in the source, or None if unknown."""
+        return self._position()[1]
+
+    @lexpos.setter
+    def lexpos(self, lexpos):
+        self.set_pos(self.lineno, lexpos)
+
+    @property
+    def span(self):
+        """
+        The (start, end) offsets of the node in the source,
+        or None if the node was not recorded in a span table.
+        """
+        span = self._span
+        if span is None or isinstance(span, tuple):
+            return None
+        return span.span(self)
+
+    def has_pos(self):
+        """Return whether the position of the node is known."""
+        return self._span is not None
+
+    def set_pos(self, lineno, lexpos):
+        """Set line info explicitly, detaching the node from any span."""
+        if lineno is None and lexpos is None:
+            self._span = None
+        else:
+            self._span = (lineno, lexpos)
 
     def copy_pos(self, node):
-        """Copy line info from another AST node."""
-        self.lineno = node.lineno
-        self.lexpos = node.lexpos
+        """
+        Copy line info from another AST node. A node recorded in a span
+        table shares its span with the copy; nothing new is recorded.
+        """
+        span = node._span
+        self._span = span
+        if span is not None and not isinstance(span, tuple):
+            self._span_index = node._span_index
+
+    def locate_type(self, root, t):
+        """
+        Return type 't' as first written within the type 'root' of this
+        node: a copy of 't' positioned there, or 't' itself if unknown.
+
+        Canonical types are shared by all their occurrences, so their
+        own position is that of the first occurrence in the program.
+        """
+        span = self._span
+        if span is None or isinstance(span, tuple):
+            return t
+        extent = span.type_span(self, root, t)
+        if extent is None:
+            return t
+        located = t._clone()
+        located.set_pos(*span.line_column(extent[0]))
+        return located
 
     def pos_to_str(self):
         """Return node position as a string."""
@@ -54,30 +281,18 @@ class Node(metaclass=abc.ABCMeta):
         return "%d:%d:" % (self.lineno, self.lexpos)
 
     def __repr__(self):
-        attrs = [attr for attr in dir(self) if attr[0] != '_']
-        values = [getattr(self, attr) for attr in attrs]
-        safe_values = []
-        for value in values:
-            displayable_types = (int, float, bool, str, list, Type, Expression)
-            if isinstance(value, displayable_types) or value is None:
-                safe_values.append(str(value).replace("\n", "\n\t"))
-            else:
-                safe_values.append(
-                    '(non-scalar of type %s)' % value.__class__.__name__
-                )
-        pairs = (
-            "%s = '%s'" % (attr, value)
-            for (attr, value) in zip(attrs, safe_values)
-        )
-        return "ASTNode:%s with attributes:\n\t* %s" \
-               % (self.__class__.__name__, "\n\t* ".join(pairs))
+        # Imported here, as the dumper itself depends on this module.
+        from compiler import dump
+        out = io.StringIO()
+        dump.dump_text(self, out)
+        return out.getvalue().rstrip("\n")
 
 
 class DataNode(Node):
 
     """A node to which a definite type can and should be assigned."""
 
-    type = None
+    pass
 
 
 class Expression(DataNode):
@@ -96,13 +311,32 @@ class NameNode(collections.abc.Hashable, Node):
     Provides basic hashing functionality.
     """
 
-    name = None
-
     def __hash__(self):
         """Simple hash. Override as needed."""
         return hash(self.name)
 
 
+class NameUse(NameNode):
+
+    """
+    A use of a name defined elsewhere.
+
+    Name resolution records the 'definition' the name refers to and its
+    'address', a (nesting, slot) pair: the nesting of the scope holding
+    the definition and the position of the definition in that scope.
+    Both are None until resolved. They are annotations, not fields:
+    they take no part in equality, copying or dumping.
+    """
+
+    __slots__ = ('definition', 'address')
+
+    def __new__(cls, *args, **kwargs):
+        node = super().__new__(cls, *args, **kwargs)
+        node.definition = None
+        node.address = None
+        return node
+
+
 class Def(NameNode):
 
     """Definition of a new name."""
@@ -118,8 +352,6 @@ class ListNode(collections.abc.Iterable, Node):
     Supports iterating through the nodes list.
     """
 
-    list = None
-
     def __iter__(self):
         return iter(self.list)
 
@@ -135,6 +367,8 @@ class Builtin(Type, NameNode):
 
     """One of the builtin types."""
 
+    _data_fields = ('name',)
+
     def __init__(self):
         self.name = self.__class__.__name__.lower()
 
@@ -142,17 +376,25 @@ class Builtin(Type, NameNode):
 
 
 class Program(ListNode):
+    _child_fields = ('list',)
+
     def __init__(self, list):
         self.list = list
 
 
 class LetDef(ListNode):
+    _data_fields = ('isRec',)
+    _child_fields = ('list',)
+
     def __init__(self, list, isRec=False):
         self.list = list
         self.isRec = isRec
 
 
 class ConstantDef(Def):
+    _data_fields = ('name',)
+    _child_fields = ('type', 'body')
+
     def __init__(self, name, body, type=None):
         self.name = name
         self.body = body
@@ -160,6 +402,9 @@ class ConstantDef(Def):
 
 
 class FunctionDef(Def):
+    _data_fields = ('name',)
+    _child_fields = ('params', 'type', 'body')
+
     def __init__(self, name, params, body, type=None):
         self.name = name
         self.params = params
@@ -168,12 +413,18 @@ class FunctionDef(Def):
 
 
 class Param(DataNode, NameNode):
+    _data_fields = ('name',)
+    _child_fields = ('type',)
+
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
 
 
 class BinaryExpression(Expression):
+    _data_fields = ('operator',)
+    _child_fields = ('leftOperand', 'rightOperand', 'type')
+
     def __init__(self, leftOperand, operator, rightOperand):
         self.leftOperand = leftOperand
         self.operator = operator
@@ -182,6 +433,9 @@ class BinaryExpression(Expression):
 
 
 class UnaryExpression(Expression):
+    _data_fields = ('operator',)
+    _child_fields = ('operand', 'type')
+
     def __init__(self, operator, operand):
         self.operator = operator
         self.operand = operand
@@ -189,13 +443,19 @@ class UnaryExpression(Expression):
 
 
 class ConstructorCallExpression(Expression, ListNode, NameNode):
+    _data_fields = ('name',)
+    _child_fields = ('list', 'type')
+
     def __init__(self, name, list):
         self.name = name
         self.list = list
         self.type = None
 
 
-class ArrayExpression(Expression, ListNode, NameNode):
+class ArrayExpression(Expression, ListNode, NameUse):
+    _data_fields = ('name',)
+    _child_fields = ('list', 'type')
+
     def __init__(self, name, list):
         self.name = name
         self.list = list
@@ -203,37 +463,54 @@ class ArrayExpression(Expression, ListNode, NameNode):
 
 
 class ConstExpression(Expression):
+    _data_fields = ('value',)
+    _child_fields = ('type',)
+
     def __init__(self, value, type):
         self.value = value
         self.type = type
 
 
 class ConidExpression(Expression, NameNode):
+    _data_fields = ('name',)
+    _child_fields = ('type',)
+
     def __init__(self, name):
         self.name = name
         self.type = None
 
 
-class GenidExpression(Expression, NameNode):
+class GenidExpression(Expression, NameUse):
+    _data_fields = ('name',)
+    _child_fields = ('type',)
+
     def __init__(self, name):
         self.name = name
         self.type = None
 
 
 class DeleteExpression(Expression):
+    _child_fields = ('expr', 'type')
+
     def __init__(self, expr):
         self.expr = expr
         self.type = None
 
 
-class DimExpression(Expression, NameNode):
+class DimExpression(Expression, NameUse):
+    _data_fields = ('name', 'dimension')
+    _child_fields = ('type',)
+
     def __init__(self, name, dimension=1):
         self.name = name
         self.dimension = dimension
         self.type = None
 
 
-class ForExpression(Expression):
+class ForExpression(Expression, NameNode):
+    _data_fields = ('counter', 'isDown')
+    _child_fields = ('startExpr', 'stopExpr', 'body', 'type')
+
     def __init__(self, counter, startExpr, stopExpr, body, isDown=False):
         self.counter = counter
         self.startExpr = startExpr
@@ -242,8 +519,16 @@ class ForExpression(Expression):
         self.isDown = isDown
         self.type = None
 
+    @property
+    def name(self):
+        """Name of the loop counter, which the loop defines."""
+        return self.counter
+
+
+class FunctionCallExpression(Expression, ListNode, NameUse):
+    _data_fields = ('name',)
+    _child_fields = ('list', 'type')
 
-class FunctionCallExpression(Expression, ListNode, NameNode):
     def __init__(self, name, list):
         self.name = name
         self.list = list
@@ -251,6 +536,8 @@ class FunctionCallExpression(Expression, ListNode, NameNode):
 
 
 class LetInExpression(Expression):
+    _child_fields = ('letdef', 'expr', 'type')
+
     def __init__(self, letdef, expr):
         self.letdef = letdef
         self.expr = expr
@@ -258,6 +545,8 @@ class LetInExpression(Expression):
 
 
 class IfExpression(Expression):
+    _child_fields = ('condition', 'thenExpr', 'elseExpr', 'type')
+
     def __init__(self, condition, thenExpr, elseExpr=None):
         self.condition = condition
         self.thenExpr = thenExpr
@@ -266,6 +555,8 @@ class IfExpression(Expression):
 
 
 class MatchExpression(Expression, ListNode):
+    _child_fields = ('expr', 'list', 'type')
+
     def __init__(self, expr, list):
         self.expr = expr
         self.list = list
@@ -273,28 +564,39 @@ class MatchExpression(Expression, ListNode):
 
 
 class Clause(Node):
+    _child_fields = ('pattern', 'expr')
+
     def __init__(self, pattern, expr):
         self.pattern = pattern
         self.expr = expr
 
 
 class Pattern(ListNode, NameNode):
+    _data_fields = ('name',)
+    _child_fields = ('list',)
+
     def __init__(self, name, list=None):
         self.name = name
         self.list = list or []
 
 
 class GenidPattern(NameNode):
+    _data_fields = ('name',)
+
     def __init__(self, name):
         self.name = name
 
 
 class NewExpression(Expression):
+    _child_fields = ('type',)
+
     def __init__(self, type):
         self.type = type
 
 
 class WhileExpression(Expression):
+    _child_fields = ('condition', 'body', 'type')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -302,12 +604,17 @@ class WhileExpression(Expression):
 
 
 class VariableDef(Def):
+    _data_fields = ('name',)
+    _child_fields = ('type',)
+
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
 
 
 class ArrayVariableDef(VariableDef):
+    _child_fields = ('dimensions', 'type')
+
     def __init__(self, name, dimensions, type=None):
         self.name = name
         self.dimensions = dimensions
@@ -315,12 +622,22 @@ class ArrayVariableDef(VariableDef):
 
 
 class TDef(ListNode):
+    _child_fields = ('type', 'list')
+
     def __init__(self, type, list):
         self.type = type
         self.list = list
 
+    @property
+    def name(self):
+        """Name of the defined type."""
+        return self.type.name
+
 
 class Constructor(NameNode, ListNode):
+    _data_fields = ('name',)
+    _child_fields = ('list',)
+
     def __init__(self, name, list=None):
         self.name = name
         self.list = list or []
@@ -361,16 +678,23 @@ class User(Type, NameNode):
 
     """A user-defined type."""
 
+    _data_fields = ('name',)
+
     def __init__(self, name):
         self.name = name
 
 
 class Ref(Type):
+    _child_fields = ('type',)
+
     def __init__(self, type):
         self.type = type
 
 
 class Array(Type):
+    _data_fields = ('dimensions',)
+    _child_fields = ('type',)
+
     def __init__(self, type, dimensions=1):
         self.type = type
         self.dimensions = dimensions
@@ -382,11 +706,245 @@ def String():
 
 
 class Function(Type):
+    _child_fields = ('fromType', 'toType')
+
     def __init__(self, fromType, toType):
         self.fromType = fromType
         self.toType = toType
 
 
+class TypeInterner:
+
+    """
+    Factory of canonical (hash-consed) types.
+
+    Structurally equal types interned by the same interner are the
+    same object, so they compare equal by identity and take memory
+    once per distinct type, not once per occurrence.
+
+    Canonical types are shared by all their occurrences: they must
+    never be mutated, and a position stored on one is that of a
+    single occurrence only.
+    """
+
+    def __init__(self):
+        """Make a new, empty interner."""
+        # Keys  : (class, data field values, ids of canonical children)
+        # Values: canonical type
+        self._types = {}
+
+    def __len__(self):
+        return len(self._types)
+
+    def _key(self, t, children):
+        return (type(t),) + tuple(
+            _freeze(getattr(t, attr)) for attr in t._data_fields
+        ) + tuple(id(child) for child in children)
+
+    def intern(self, t):
+        """
+        Return the canonical type structurally equal to type 't',
+        making 't' canonical if no such type exists yet. When 't' has
+        subtypes that are not canonical, it is copied, not modified.
+        """
+        # Canonical version of each type seen, by id.
+        canonical = {}
+        stack = [(t, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in canonical:
+                continue
+            children = [getattr(node, attr) for attr in node._child_fields]
+            if not ready:
+                stack.append((node, True))
+                stack.extend(
+                    (child, False) for child in children
+                    if child is not None
+                )
+                continue
+
+            new_children = [
+                None if child is None else canonical[id(child)]
+                for child in children
+            ]
+            key = self._key(node, new_children)
+            found = self._types.get(key)
+            if found is None:
+                found = node
+                if any(
+                    new is not old
+                    for new, old in zip(new_children, children)
+                ):
+                    found = node._clone()
+                    for attr, child in zip(node._child_fields, new_children):
+                        setattr(found, attr, child)
+                self._types[key] = found
+            canonical[id(node)] = found
+        return canonical[id(t)]
+
+
+# == GENERIC TRAVERSAL ==
+
+# Placeholder for list items removed by a Transformer.
+_REMOVED = object()
+
+
+class Visitor:
+
+    """
+    Walker over an AST, using an explicit stack instead of recursion.
+
+    Subclasses hook into the walk by defining 'pre_<Class>' and
+    'post_<Class>' methods, called on entering and on leaving a node
+    of that class or of a subclass (e.g. 'pre_Type' sees all types).
+    Plain lists of nodes are visited as well, via 'pre_list' and
+    'post_list'. A 'pre' hook returning False prunes the node: neither
+    its children nor its 'post' hook are visited.
+
+    Children are visited in the order of each class's '_child_fields'.
+    A 'pre' hook may instead return a sequence of the children to visit,
+    in order; callables in it are called when reached, e.g. to open a
+    scope between two children.
+    """
+
+    def __init__(self):
+        # Cache: node class -> (pre hook, post hook)
+        self._hooks = {}
+
+    def _get_hooks(self, cls):
+        """Find the hooks handling 'cls', honouring its MRO."""
+        try:
+            return self._hooks[cls]
+        except KeyError:
+            pass
+
+        hooks = []
+        for prefix in ('pre_', 'post_'):
+            hook = None
+            for klass in cls.__mro__:
+                hook = getattr(self, prefix + klass.__name__, None)
+                if hook is not None:
+                    break
+            hooks.append(hook)
+        self._hooks[cls] = hooks = tuple(hooks)
+        return hooks
+
+    def visit(self, root):
+        """Walk the tree rooted at 'root'."""
+        stack = [(root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if not isinstance(node, (Node, list)):
+                node()
+                continue
+            pre, post = self._get_hooks(type(node))
+            if leaving:
+                post(node)
+                continue
+
+            order = pre(node) if pre is not None else None
+            if order is False:
+                continue
+            if post is not None:
+                stack.append((node, True))
+
+            if order is not None and order is not True:
+                children = reversed(order)
+            elif isinstance(node, list):
+                children = reversed(node)
+            else:
+                children = (
+                    getattr(node, attr)
+                    for attr in reversed(node._child_fields)
+                )
+            stack.extend(
+                (child, False)
+                for child in children
+                if isinstance(child, (Node, list)) or callable(child)
+            )
+
+
+def _keyed(children, order):
+    """
+    Pair each item in 'order' with its key in the (child, key) pairs
+    'children': a field name or list index. Callables have no key.
+    """
+    keys = {}
+    for child, key in reversed(children):
+        keys.setdefault(id(child), []).append(key)
+    keyed = []
+    for item in order:
+        if isinstance(item, (Node, list)):
+            assert keys.get(id(item)), "Only children can be visited"
+            keyed.append((item, keys[id(item)].pop()))
+        else:
+            keyed.append((item, None))
+    return keyed
+
+
+class Transformer(Visitor):
+
+    """
+    Rewriter of an AST, using an explicit stack instead of recursion.
+
+    Hooks are defined as for a Visitor. The value returned by a 'post'
+    hook replaces the visited node in its parent; returning None clears
+    the parent's field or drops the node from its list. A 'post' hook
+    sees its children already transformed. A sequence returned by a
+    'pre' hook may only hold children of the node and callables.
+    """
+
+    def visit(self, root):
+        """Transform the tree rooted at 'root' and return the new root."""
+        holder = [root]
+        stack = [(root, False, holder, 0)]
+        while stack:
+            node, leaving, parent, key = stack.pop()
+            if not isinstance(node, (Node, list)):
+                node()
+                continue
+            pre, post = self._get_hooks(type(node))
+            if leaving:
+                if isinstance(node, list):
+                    node[:] = [item for item in node if item is not _REMOVED]
+                if post is not None:
+                    new_node = post(node)
+                    if new_node is not node:
+                        if isinstance(parent, list):
+                            if new_node is None:
+                                new_node = _REMOVED
+                            parent[key] = new_node
+                        else:
+                            setattr(parent, key, new_node)
+                continue
+
+            order = pre(node) if pre is not None else None
+            if order is False:
+                continue
+            stack.append((node, True, parent, key))
+
+            if isinstance(node, list):
+                children = [(node[i], i) for i in range(len(node))]
+            else:
+                children = [
+                    (getattr(node, attr), attr)
+                    for attr in node._child_fields
+                ]
+            if order is not None and order is not True:
+                children = _keyed(children, order)
+            pending = [
+                (child, False, node, attr)
+                for child, attr in children
+                if isinstance(child, (Node, list)) or callable(child)
+            ]
+            pending.reverse()
+            stack.extend(pending)
+
+        if holder[0] is _REMOVED:
+            return None
+        return holder[0]
+
+
 # == BASE ERROR CLASS ==
 
 class NodeError(Exception):
@@ -0,0 +1,108 @@
+"""
+# ----------------------------------------------------------------------
+# dump.py
+#
+# Streaming text and JSON dumpers for Llama ASTs
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+
+Both dumpers walk the tree with an explicit stack and write each piece
+of output exactly once, so they run in time linear in the size of the
+output and never hit the recursion limit. Note that the indented text
+format repeats the indentation on every line, so its output (unlike
+the JSON output) grows with the depth of the tree as well.
+"""
+
+import json
+
+from compiler import ast
+
+
+def _position(node):
+    """Return the position suffix of a node in text dumps."""
+    if node.lineno is None:
+        return ""
+    if node.lexpos is None:
+        return " @%d" % node.lineno
+    return " @%d:%d" % (node.lineno, node.lexpos)
+
+
+def dump_text(root, file, indent="  "):
+    """
+    Write an indented text dump of the tree rooted at 'root'
+    to the text file object 'file'.
+
+    Every node takes one line holding its class, its data fields
+    and its position. Its child fields follow, one level deeper,
+    each labeled with the field name. Items of lists are labeled
+    with their index.
+    """
+    write = file.write
+    stack = [("", root, 0)]
+    while stack:
+        label, obj, depth = stack.pop()
+        write(indent * depth)
+        write(label)
+
+        if isinstance(obj, ast.Node):
+            write(obj.__class__.__name__)
+            for attr in obj._data_fields:
+                write(" %s=%r" % (attr, getattr(obj, attr)))
+            write(_position(obj))
+            write("\n")
+            stack.extend(
+                ("%s: " % attr, getattr(obj, attr), depth + 1)
+                for attr in reversed(obj._child_fields)
+            )
+        elif isinstance(obj, list):
+            if obj:
+                write("[%d]\n" % len(obj))
+            else:
+                write("[]\n")
+            stack.extend(
+                ("[%d] " % i, obj[i], depth + 1)
+                for i in range(len(obj) - 1, -1, -1)
+            )
+        else:
+            write("%r\n" % (obj,))
+
+
+def dump_json(root, file):
+    """
+    Write a JSON dump of the tree rooted at 'root'
+    to the text file object 'file'.
+
+    A node becomes an object whose "node" member holds its class
+    name, followed by its position, its data fields and its child
+    fields. Lists become arrays and absent subtrees null.
+    """
+    write = file.write
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    # Strings on the stack are output; anything else is a subtree.
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, str):
+            write(obj)
+        elif isinstance(obj, ast.Node):
+            write('{"node": "%s"' % obj.__class__.__name__)
+            if obj.lineno is not None:
+                write(', "lineno": %d' % obj.lineno)
+            if obj.lexpos is not None:
+                write(', "lexpos": %d' % obj.lexpos)
+            for attr in obj._data_fields:
+                write(', "%s": %s' % (attr, encode(getattr(obj, attr))))
+            stack.append("}")
+            for attr in reversed(obj._child_fields):
+                child = getattr(obj, attr)
+                stack.append(child if child is not None else "null")
+                stack.append(', "%s": ' % attr)
+        elif isinstance(obj, list):
+            stack.append("]")
+            for i in range(len(obj) - 1, -1, -1):
+                stack.append(obj[i] if obj[i] is not None else "null")
+                if i:
+                    stack.append(", ")
+            write("[")
+        else:
+            write(encode(obj))
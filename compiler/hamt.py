@@ -0,0 +1,211 @@
+"""
+# ----------------------------------------------------------------------
+# hamt.py
+#
+# Persistent hash array mapped tries
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+
+A HAMT is an immutable map: updating it returns a new map and leaves
+the old one intact. Both share all of the trie except the path from the
+root to the updated key, so an update copies at most one small node per
+level, and a reference to a map is a free snapshot of it.
+
+The trie branches 32 ways on successive 5-bit chunks of the key's hash.
+Each node stores only its populated branches, flattened into a tuple of
+(key, value) pairs, plus a bitmap telling which branches those are. A
+pair whose key is _SUBTRIE holds a child node as its value. Keys whose
+hashes agree on all 64 bits end up together in a collision node.
+"""
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# Key of the pairs holding a child node.
+_SUBTRIE = object()
+
+
+def _hash(key):
+    """Return the hash of 'key' as an unsigned 64-bit integer."""
+    return hash(key) & _HASH_MASK
+
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Before Python 3.10
+    def _popcount(bits):
+        """Return the number of bits set in 'bits'."""
+        return bin(bits).count('1')
+
+
+class _BitmapNode:
+
+    """A trie node: populated branches and the bitmap locating them."""
+
+    __slots__ = ('bitmap', 'items')
+
+    def __init__(self, bitmap, items):
+        self.bitmap = bitmap
+        self.items = items
+
+
+class _CollisionNode:
+
+    """A leaf holding the (key, value) pairs of one full hash."""
+
+    __slots__ = ('hash', 'items')
+
+    def __init__(self, hash_, items):
+        self.hash = hash_
+        self.items = items
+
+
+def _pair_node(shift, hash1, key1, value1, hash2, key2, value2):
+    """Return a node holding two pairs whose keys differ."""
+    if shift >= _HASH_BITS:
+        return _CollisionNode(hash1, (key1, value1, key2, value2))
+    index1 = (hash1 >> shift) & _MASK
+    index2 = (hash2 >> shift) & _MASK
+    if index1 == index2:
+        child = _pair_node(
+            shift + _BITS, hash1, key1, value1, hash2, key2, value2
+        )
+        return _BitmapNode(1 << index1, (_SUBTRIE, child))
+    if index1 < index2:
+        items = (key1, value1, key2, value2)
+    else:
+        items = (key2, value2, key1, value1)
+    return _BitmapNode((1 << index1) | (1 << index2), items)
+
+
+def _assoc(root, hash_, key, value):
+    """
+    Return 'root' with 'key' mapped to 'value', and whether 'key' is new.
+    Returns 'root' itself if it already maps 'key' to 'value'.
+    """
+    # Walk down to the node holding 'key', remembering the path.
+    path = []
+    node, shift = root, 0
+    while True:
+        if isinstance(node, _CollisionNode):
+            items = node.items
+            for i in range(0, len(items), 2):
+                if items[i] == key:
+                    if items[i + 1] is value:
+                        return root, False
+                    items = items[:i + 1] + (value,) + items[i + 2:]
+                    added = False
+                    break
+            else:
+                items, added = items + (key, value), True
+            new = _CollisionNode(hash_, items)
+            break
+
+        bit = 1 << ((hash_ >> shift) & _MASK)
+        i = 2 * _popcount(node.bitmap & (bit - 1))
+        items = node.items
+        if not node.bitmap & bit:
+            items = items[:i] + (key, value) + items[i:]
+            new, added = _BitmapNode(node.bitmap | bit, items), True
+            break
+
+        old_key, old_value = items[i], items[i + 1]
+        if old_key is _SUBTRIE:
+            path.append((node, i))
+            node, shift = old_value, shift + _BITS
+            continue
+        if old_key == key:
+            if old_value is value:
+                return root, False
+            items = items[:i + 1] + (value,) + items[i + 2:]
+            new, added = _BitmapNode(node.bitmap, items), False
+        else:
+            child = _pair_node(
+                shift + _BITS, _hash(old_key), old_key, old_value,
+                hash_, key, value
+            )
+            items = items[:i] + (_SUBTRIE, child) + items[i + 2:]
+            new, added = _BitmapNode(node.bitmap, items), True
+        break
+
+    # Copy the path, pointing each node to the copy of its child.
+    while path:
+        node, i = path.pop()
+        items = node.items
+        new = _BitmapNode(node.bitmap, items[:i + 1] + (new,) + items[i + 2:])
+    return new, added
+
+
+class HAMT:
+
+    """
+    An immutable mapping. Keys must be hashable; 'set' returns
+    an updated copy sharing structure with the original.
+    """
+
+    __slots__ = ('_root', '_len')
+
+    def __init__(self):
+        """Make an empty map."""
+        self._root = _EMPTY_NODE
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def get(self, key, default=None):
+        """Return the value of 'key', or 'default' if it is absent."""
+        hash_ = _hash(key)
+        node, shift = self._root, 0
+        while True:
+            if isinstance(node, _CollisionNode):
+                items = node.items
+                for i in range(0, len(items), 2):
+                    if items[i] == key:
+                        return items[i + 1]
+                return default
+            bitmap = node.bitmap
+            bit = 1 << ((hash_ >> shift) & _MASK)
+            if not bitmap & bit:
+                return default
+            i = 2 * _popcount(bitmap & (bit - 1))
+            items = node.items
+            item_key = items[i]
+            if item_key is _SUBTRIE:
+                node, shift = items[i + 1], shift + _BITS
+            elif item_key == key:
+                return items[i + 1]
+            else:
+                return default
+
+    def __contains__(self, key):
+        return self.get(key, _SUBTRIE) is not _SUBTRIE
+
+    def set(self, key, value):
+        """Return a copy of the map with 'key' mapped to 'value'."""
+        root, added = _assoc(self._root, _hash(key), key, value)
+        if root is self._root:
+            return self
+        new = HAMT.__new__(HAMT)
+        new._root = root
+        new._len = self._len + added
+        return new
+
+    def items(self):
+        """Iterate over the (key, value) pairs of the map."""
+        stack = [self._root]
+        while stack:
+            items = stack.pop().items
+            for i in range(0, len(items), 2):
+                if items[i] is _SUBTRIE:
+                    stack.append(items[i + 1])
+                else:
+                    yield items[i], items[i + 1]
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
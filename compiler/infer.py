@@ -8,36 +8,158 @@
 # Authors: Nick Korasidis <renelvon@gmail.com>
 #          Dimitris Koutsoukos <dim.kou.shmmy@gmail.com>
 # ----------------------------------------------------------------------
+
+Types being inferred are terms: TempTypes, standing for unknown types,
+and ast.Type nodes whose children are themselves terms. A Unifier
+makes terms equal by binding TempTypes, grouped in union-find classes.
+
+Let-polymorphism uses levels. The level of a TempType is the nesting
+of the symbol.Table scope it was made in, and the level of a class is
+the lowest among its members and the classes whose bindings it occurs
+in. A let in a scope of nesting N may generalize exactly the classes
+of its type with level above N: those no binding outside the let can
+refer to. Generalizing a type and instantiating it both take time
+proportional to the type, not to the whole environment.
 """
 
+from array import array
+
+from compiler import ast
+
+# == INFERENCE ERRORS ==
+
+
+class InferenceError(ast.NodeError):
+    """
+    Exception thrown on detecting a type error during inference.
+    This class is only meant as an ABC.
+    Only specific subclasses should be instantiated.
+    """
+    _node_error_msg = "Type error"
+
+
+class TypeMismatchError(InferenceError):
+    """Exception thrown on unifying types of different structure."""
+    _node_error_msg = "Type mismatch"
+    _prev_error_msg = " conflicting type"
+
+
+class OccursCheckError(InferenceError):
+    """Exception thrown on inferring an infinite (cyclic) type."""
+    _node_error_msg = "Infinite type: type occurs in itself"
+
+
+class ForbiddenTypeError(InferenceError):
+    """Exception thrown on inferring a type forbidden by a constraint."""
+    _node_error_msg = "Type not allowed here"
+
+
+# == TYPE DOMAINS ==
+
+# The kinds of types, by their outermost ast class. A set of kinds, or
+# domain, is a bitset with bit '_KIND_BITS[cls]' set for each kind in it.
+_KINDS = (
+    ast.Bool, ast.Char, ast.Float, ast.Int, ast.Unit,
+    ast.User, ast.Ref, ast.Array, ast.Function
+)
+_KIND_BITS = {cls: 1 << i for i, cls in enumerate(_KINDS)}
+
+# The domain of a type about which nothing is known.
+ANY_KIND = (1 << len(_KINDS)) - 1
+
+
+def domain(kinds):
+    """Return the domain of a collection of ast type classes."""
+    bits = 0
+    for cls in kinds:
+        bits |= _KIND_BITS[cls]
+    return bits
+
+
+def kinds(bits):
+    """Return the ast type classes in a domain, as a tuple."""
+    return tuple(cls for cls in _KINDS if bits & _KIND_BITS[cls])
+
+
+# == TYPE VARIABLES ==
+
+# Level of the classes generalized by a let, standing for any type.
+GENERIC = 2 ** 31 - 1
+
 
 class TempType:
-    """A temporary type used during inference."""
+    """
+    A temporary type used during inference: a handle on a type
+    variable of a Context. It stands for the same type in any term.
+    """
+
+    __slots__ = ('tag',)
+
+    def __init__(self, tag):
+        """Make the handle of the variable numbered 'tag' in its Context."""
+        self.tag = tag
+
+    def __repr__(self):
+        return "TempType(%d)" % self.tag
+
+
+class Context:
+    """
+    The type variables of one inference session.
+
+    Variables are numbered from 0 in order of allocation, and their
+    state is kept in arrays indexed by that number, not in the TempTypes
+    handed out. No global state is involved, so independent sessions
+    can run concurrently, and nothing refers back to the context: once
+    types are written back, dropping it frees all it holds.
+    """
+
+    def __init__(self):
+        """Make a new, empty context."""
+        # Per variable: its TempType, the node whose type it is, and
+        # the type the user specified for that node, if any.
+        self.temps = []
+        self.nodes = []
+        self.spec_types = []
+
+        # Union-find state, maintained by a Unifier. Per variable: the
+        # parent in its class (itself for the root) and an upper bound
+        # on the height of the class tree. Per root: the type the class
+        # is bound to, if any, the domain of kinds it may take and its
+        # level, or GENERIC.
+        self.parents = array('i')
+        self.ranks = array('B')
+        self.bindings = []
+        self.domains = array('H')
+        self.levels = array('i')
 
-    _next_free = 1  # Next free papaki.
+        # Roots given a binding since the last cycle check, each with
+        # the TempType of the unification that bound it.
+        self.unchecked = []
 
-    @classmethod
-    def _get_next_tag(cls):
-        cls._next_free += 1
-        return cls._next_free
+    def __len__(self):
+        return len(self.temps)
 
-    def __init__(self, node, spec_type=None):
+    def new_temp(self, node, spec_type=None, level=0):
         """
-        Construct a new temporary type for node `node`.
+        Return a new temporary type for node `node`, made at 'level':
+        the nesting of the current scope of the symbol table.
 
         The user may optionally supply a type for this node;
         such a specification is not binding but will improve
         error reporting.
         """
-        self._node = node
-        self._spec_type = spec_type
-        self._inferred_type = None
-
-        self._tag = self._get_next_tag()
-
-    def write_back(self):
-        self._node.type = self._inferred_type
-        # TODO: Validate the type before returning.
+        tag = len(self.temps)
+        ttype = TempType(tag)
+        self.temps.append(ttype)
+        self.nodes.append(node)
+        self.spec_types.append(spec_type)
+        self.parents.append(tag)
+        self.ranks.append(0)
+        self.bindings.append(None)
+        self.domains.append(ANY_KIND)
+        self.levels.append(level)
+        return ttype
 
 
 class Constraint:
@@ -63,7 +185,8 @@ class SetConstraint(Constraint):
     """
     A constraint enforcing a TempType to acquire a value from a given set.
 
-    These constraints are due to the type system.
+    These constraints are due to the type system. Types are given by
+    their ast classes, e.g. (ast.Int, ast.Float).
 
     Note: This is actually only used in comparison operators.
     """
@@ -95,3 +218,423 @@ class AsTypeOfConstraint(Constraint):
     def __init__(self, ttype1, ttype2):
         self.ttype1 = ttype1
         self.ttype2 = ttype2
+
+
+# == UNIFICATION ==
+
+
+class Unifier:
+    """
+    A unification engine over the terms of a Context.
+
+    TempTypes are kept in disjoint classes of equal types, each a tree
+    of parent links; 'find' compresses the paths it walks and 'union'
+    hangs the shallower tree under the root of the deeper one, so both
+    take near-constant amortized time. The root of a class is bound to
+    a structural type, or to nothing while the type is unknown.
+
+    Set and negative set constraints narrow the domain of a class: the
+    kinds of type (see _KINDS) it may take, as a bitset. Merging two
+    classes intersects their domains and binding a class checks the
+    kind of its binding, so a forbidden type is caught as soon as it
+    appears, in constant time, without revisiting earlier constraints.
+
+    Terms are unified with an explicit stack of pairs. Two classes are
+    merged before their bindings are compared, so unification ends even
+    on cyclic terms. Instead of an occurs check on every binding, cycles
+    are looked for once, by 'check_cycles', when 'solve' is done: a
+    single walk from the classes bound since the last check visits
+    every class reachable from them at most once. Until then terms may
+    be cyclic; 'resolve' and 'instantiate' detect cycles in what they
+    walk.
+
+    Internally, classes are handled by the numbers of their roots.
+    """
+
+    def __init__(self, context=None):
+        """Make a unifier for the variables of 'context', or a new one."""
+        if context is None:
+            context = Context()
+        self.context = context
+        self._parents = context.parents
+        self._ranks = context.ranks
+        self._bindings = context.bindings
+        self._domains = context.domains
+        self._levels = context.levels
+
+    def _find(self, tag):
+        """Return the root of the class of variable 'tag'."""
+        parents = self._parents
+        root = tag
+        while parents[root] != root:
+            root = parents[root]
+        while tag != root:
+            parents[tag], tag = root, parents[tag]
+        return root
+
+    def find(self, ttype):
+        """Return the TempType at the root of the class of a TempType."""
+        return self.context.temps[self._find(ttype.tag)]
+
+    def _union(self, root1, root2):
+        """Merge the classes of two roots and return the new root."""
+        ranks = self._ranks
+        if ranks[root1] < ranks[root2]:
+            root1, root2 = root2, root1
+        elif ranks[root1] == ranks[root2]:
+            ranks[root1] += 1
+        self._parents[root2] = root1
+        return root1
+
+    def _error(self, exc, ttype, other=None):
+        """Return exception 'exc' on the nodes of TempTypes."""
+        nodes = self.context.nodes
+        return exc(
+            nodes[ttype.tag],
+            nodes[other.tag] if type(other) is TempType else None
+        )
+
+    def unify(self, ttype, term):
+        """
+        Make the TempType 'ttype' and the term 'term' equal.
+
+        Raise TypeMismatchError if they have different structure. On
+        error, the classes merged so far stay merged. A type made part
+        of itself is only reported by 'check_cycles'.
+        """
+        find = self._find
+        bindings, domains, levels = self._bindings, self._domains, self._levels
+        unchecked = self.context.unchecked
+        stack = [(ttype, term)]
+        while stack:
+            a, b = stack.pop()
+            if type(a) is TempType:
+                a = find(a.tag)
+            if type(b) is TempType:
+                b = find(b.tag)
+
+            if type(a) is int:
+                if type(b) is int:
+                    if a == b:
+                        continue
+                    binding1, binding2 = bindings[a], bindings[b]
+                    merged = domains[a] & domains[b]
+                    level = min(levels[a], levels[b])
+                    root = self._union(a, b)
+                    if binding1 is None:
+                        bindings[root] = binding2
+                    else:
+                        bindings[root] = binding1
+                        if binding2 is not None:
+                            stack.append((binding1, binding2))
+                    levels[root] = level
+                    if bindings[root] is not None:
+                        unchecked.append((ttype, root))
+                        self._lower_levels(bindings[root], level)
+                    self._narrow(ttype, root, merged)
+                elif bindings[a] is None:
+                    if not _KIND_BITS[type(b)] & domains[a]:
+                        raise self._error(ForbiddenTypeError, ttype)
+                    bindings[a] = b
+                    unchecked.append((ttype, a))
+                    self._lower_levels(b, levels[a])
+                else:
+                    stack.append((bindings[a], b))
+            elif type(b) is int:
+                stack.append((b, a))
+            elif a is not b:
+                cls = type(a)
+                if cls is not type(b) or any(
+                    getattr(a, attr) != getattr(b, attr)
+                    for attr in cls._data_fields
+                ):
+                    raise self._error(TypeMismatchError, ttype, term)
+                stack.extend(
+                    (getattr(a, attr), getattr(b, attr))
+                    for attr in cls._child_fields
+                )
+
+    def _lower_levels(self, term, level):
+        """
+        Lower to 'level' the level of every class occurring in 'term'.
+        The classes in the binding of a class have no higher level than
+        it, so only the bindings of classes actually lowered are visited.
+        """
+        find, bindings, levels = self._find, self._bindings, self._levels
+        stack = [term]
+        while stack:
+            term = stack.pop()
+            if type(term) is TempType:
+                root = find(term.tag)
+                if levels[root] > level:
+                    levels[root] = level
+                    if bindings[root] is not None:
+                        stack.append(bindings[root])
+            else:
+                stack.extend(
+                    getattr(term, attr) for attr in term._child_fields
+                )
+
+    def check_cycles(self):
+        """
+        Raise OccursCheckError if a class is part of its own binding,
+        on the node of the unification that bound it. Terms were acyclic
+        at the last check, so any cycle passes through a class bound
+        since then.
+        """
+        find, bindings = self._find, self._bindings
+        unchecked = self.context.unchecked
+        roots, unchecked[:] = unchecked[:], []
+        # Classes whose binding is being visited, and visited fully.
+        active = set()
+        done = set()
+        for ttype, start in roots:
+            start = find(start)
+            if start in done:
+                continue
+            # Pending items: (class, None) to enter it, (class, True)
+            # to leave it, or (None, term) for part of a binding.
+            work = [(start, None)]
+            while work:
+                root, term = work.pop()
+                if root is None:
+                    if type(term) is TempType:
+                        work.append((find(term.tag), None))
+                    else:
+                        work.extend(
+                            (None, getattr(term, attr))
+                            for attr in term._child_fields
+                        )
+                elif term is True:
+                    active.discard(root)
+                    done.add(root)
+                elif root in active:
+                    raise self._error(OccursCheckError, ttype)
+                elif root not in done:
+                    active.add(root)
+                    work.append((root, True))
+                    if bindings[root] is not None:
+                        work.append((None, bindings[root]))
+
+    def _narrow(self, ttype, root, bits):
+        """
+        Narrow the domain of the class of 'root' to 'bits'. Raise
+        ForbiddenTypeError, on the node of 'ttype', if no kind is left
+        or the binding of the class is not of an allowed kind.
+        """
+        self._domains[root] = bits
+        binding = self._bindings[root]
+        if not bits or (
+            binding is not None and not _KIND_BITS[type(binding)] & bits
+        ):
+            raise self._error(ForbiddenTypeError, ttype)
+
+    def restrict(self, ttype, bits):
+        """
+        Restrict the TempType 'ttype' to the kinds in domain 'bits'.
+        Raise ForbiddenTypeError if it can then have no type.
+        """
+        root = self._find(ttype.tag)
+        self._narrow(ttype, root, self._domains[root] & bits)
+
+    def domain(self, ttype):
+        """Return the domain of kinds the TempType 'ttype' may take."""
+        root = self._find(ttype.tag)
+        binding = self._bindings[root]
+        if binding is not None:
+            return _KIND_BITS[type(binding)]
+        return self._domains[root]
+
+    def resolve(self, term):
+        """
+        Return the type that 'term' stands for, with every bound
+        TempType replaced by its binding. Unknown types are left as
+        the roots of their classes. Parts of 'term' not containing
+        TempTypes are returned as they are, not copied.
+        """
+        return self._resolve(term, {}, {})
+
+    def _resolve(self, term, roots, resolved):
+        """
+        Resolve 'term', given the terms already resolved: classes in
+        'roots', by root number, and structural terms in 'resolved',
+        by id.
+        """
+        find, bindings = self._find, self._bindings
+        temps = self.context.temps
+        active = set()
+        stack = [(term, False)]
+        while stack:
+            node, ready = stack.pop()
+            if type(node) is TempType:
+                root = find(node.tag)
+                if root in roots:
+                    continue
+                binding = bindings[root]
+                if binding is None:
+                    roots[root] = temps[root]
+                elif ready:
+                    active.discard(root)
+                    roots[root] = resolved[id(binding)]
+                elif root in active:
+                    raise self._error(OccursCheckError, node)
+                else:
+                    active.add(root)
+                    stack.append((node, True))
+                    stack.append((binding, False))
+                continue
+
+            if id(node) in resolved:
+                continue
+            children = [getattr(node, attr) for attr in node._child_fields]
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            new_children = [
+                roots[find(child.tag)] if type(child) is TempType
+                else resolved[id(child)]
+                for child in children
+            ]
+            if all(new is old for new, old in zip(new_children, children)):
+                resolved[id(node)] = node
+            else:
+                copy = node._clone()
+                for attr, child in zip(node._child_fields, new_children):
+                    setattr(copy, attr, child)
+                resolved[id(node)] = copy
+
+        if type(term) is TempType:
+            return roots[find(term.tag)]
+        return resolved[id(term)]
+
+    def level(self, ttype):
+        """Return the level of the class of the TempType 'ttype'."""
+        return self._levels[self._find(ttype.tag)]
+
+    def generalize(self, ttype, nesting):
+        """
+        Generalize the type 'ttype' of a let in a scope of 'nesting':
+        mark GENERIC the classes in it of a higher level. Only the parts
+        of the type made inside the let are visited.
+
+        A generalized type must only be used through 'instantiate'.
+        """
+        find, bindings, levels = self._find, self._bindings, self._levels
+        stack = [ttype]
+        while stack:
+            term = stack.pop()
+            if type(term) is TempType:
+                root = find(term.tag)
+                level = levels[root]
+                if nesting < level < GENERIC:
+                    levels[root] = GENERIC
+                    if bindings[root] is not None:
+                        stack.append(bindings[root])
+            else:
+                stack.extend(
+                    getattr(term, attr) for attr in term._child_fields
+                )
+
+    def instantiate(self, term, level, node=None):
+        """
+        Return a copy of the generalized type 'term' for a use of it,
+        at 'node', in a scope of nesting 'level'. Every GENERIC class is
+        replaced by a fresh TempType with the same domain; parts of the
+        type without GENERIC classes are shared, not copied.
+        """
+        find, bindings, levels = self._find, self._bindings, self._levels
+        context = self.context
+        roots = {}  # Instance of each GENERIC class, by root number.
+        copies = {}  # Instance of each structural term, by id.
+        active = set()  # GENERIC classes whose binding is being copied.
+        stack = [(term, False)]
+        while stack:
+            part, ready = stack.pop()
+            if type(part) is TempType:
+                root = find(part.tag)
+                if root in roots:
+                    continue
+                binding = bindings[root]
+                if levels[root] != GENERIC:
+                    roots[root] = part
+                elif binding is None:
+                    fresh = context.new_temp(node, level=level)
+                    self._domains[fresh.tag] = self._domains[root]
+                    roots[root] = fresh
+                elif ready:
+                    active.discard(root)
+                    roots[root] = copies[id(binding)]
+                elif root in active:
+                    raise self._error(OccursCheckError, part)
+                else:
+                    active.add(root)
+                    stack.append((part, True))
+                    stack.append((binding, False))
+                continue
+
+            if id(part) in copies:
+                continue
+            children = [getattr(part, attr) for attr in part._child_fields]
+            if not ready:
+                stack.append((part, True))
+                stack.extend((child, False) for child in children)
+                continue
+            new_children = [
+                roots[find(child.tag)] if type(child) is TempType
+                else copies[id(child)]
+                for child in children
+            ]
+            if all(new is old for new, old in zip(new_children, children)):
+                copies[id(part)] = part
+            else:
+                copy = part._clone()
+                for attr, child in zip(part._child_fields, new_children):
+                    setattr(copy, attr, child)
+                copies[id(part)] = copy
+
+        if type(term) is TempType:
+            return roots[find(term.tag)]
+        return copies[id(term)]
+
+    def write_back(self):
+        """
+        Set the type of the node of every variable of the context to
+        the type inferred for it. The context may be dropped afterwards.
+        """
+        context = self.context
+        roots, resolved = {}, {}
+        for ttype, node in zip(context.temps, context.nodes):
+            if node is not None:
+                node.type = self._resolve(ttype, roots, resolved)
+                # TODO: Validate the type before returning.
+
+    def solve(self, constraints):
+        """
+        Solve a sequence of constraints, in order, raising an
+        InferenceError on the first one that cannot hold. A type still
+        unknown at the end satisfies every set constraint on it as long
+        as its domain is not empty. Types made part of themselves are
+        reported once all constraints are solved.
+        """
+        # Domains of the type sets seen, as they tend to recur.
+        domains = {}
+        for constraint in constraints:
+            if isinstance(constraint, SpecConstraint):
+                self.unify(constraint.ttype, constraint.spec_type)
+            elif isinstance(constraint, AsTypeOfConstraint):
+                self.unify(constraint.ttype1, constraint.ttype2)
+            else:
+                if isinstance(constraint, SetConstraint):
+                    types, negate = constraint.good_types, False
+                else:
+                    types, negate = constraint.bad_types, True
+                key = (negate, tuple(types))
+                bits = domains.get(key)
+                if bits is None:
+                    bits = domain(types)
+                    if negate:
+                        bits = ANY_KIND & ~bits
+                    domains[key] = bits
+                self.restrict(constraint.ttype, bits)
+        self.check_cycles()
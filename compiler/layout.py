@@ -0,0 +1,239 @@
+"""
+# ----------------------------------------------------------------------
+# layout.py
+#
+# Data layout of Llama types
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+
+The layout of a type tells how its values are stored: their size and
+alignment in bytes, and whether a value is boxed, i.e. a pointer to
+data on the heap. Layouts are for a 64-bit target:
+
+    unit                0 bytes, nothing to store
+    bool, char          1 byte
+    int, float          8 bytes (two's complement, IEEE 754 double)
+    ref T               pointer to a heap cell holding a T
+    T1 -> T2            pointer to a heap closure
+    array [*,..] of T   descriptor, stored inline: a pointer to the
+                        elements followed by the size of each dimension
+    user type           packed tag if no constructor takes arguments,
+                        else a pointer to a heap block: the tag, then
+                        the arguments of the constructor
+
+Types must be valid (see typesem.Table.validate) and their user types
+processed by the typesem.Table the layouts are computed for.
+"""
+
+from compiler import ast, typesem
+
+# Size and alignment of a pointer, and of an int.
+WORD = 8
+
+# Size of the tag at the start of the heap block of a constructor.
+TAG_SIZE = 4
+
+# Size of the values of each builtin type; each is aligned to its size.
+_BUILTIN_SIZES = {
+    ast.Bool: 1,
+    ast.Char: 1,
+    ast.Float: 8,
+    ast.Int: WORD,
+    ast.Unit: 0,
+}
+
+# Sizes of packed tags, smallest first.
+_TAG_SIZES = (1, 2, 4)
+
+
+def _align(offset, alignment):
+    """Round 'offset' up to a multiple of 'alignment'."""
+    return -(-offset // alignment) * alignment
+
+
+class Layout:
+    """The layout of the values of a type."""
+    # Size of a value, in bytes. It is a multiple of the alignment.
+    size = 0
+
+    # Alignment of a value, in bytes.
+    align = 1
+
+    # Whether a value is a pointer to data on the heap.
+    boxed = False
+
+    def __init__(self, size, align, boxed=False):
+        """Create a new layout."""
+        self.size = size
+        self.align = align
+        self.boxed = boxed
+
+
+class ArrayLayout(Layout):
+    """
+    The layout of an array descriptor: a pointer to the elements,
+    at offset 0, followed by the size of each dimension, as ints.
+    """
+    # Number of dimensions.
+    dimensions = 1
+
+    # Layout of the elements. Elements are stored contiguously, in
+    # row-major order, 'element.size' bytes apart.
+    element = None
+
+    def __init__(self, dimensions, element):
+        """Create the layout of arrays of 'element'."""
+        super().__init__(WORD * (1 + dimensions), WORD)
+        self.dimensions = dimensions
+        self.element = element
+
+    @staticmethod
+    def dimension_offset(k):
+        """Return the offset of the size of dimension 'k', from 0."""
+        return WORD * (1 + k)
+
+
+class UserLayout(Layout):
+    """
+    The layout of a user type. An enumeration is packed into the
+    smallest unsigned integer holding all its tags; any other type is
+    boxed, and the block layout of each constructor gives the contents
+    of the heap blocks it builds.
+    """
+    # The typesem.ConstructorTable of the type.
+    table = None
+
+    # Whether a value is just its tag.
+    packed = False
+
+    def __init__(self, table):
+        """Create the layout of the type with ConstructorTable 'table'."""
+        self.table = table
+        self.packed = table.enum
+        if self.packed:
+            size = next(
+                size for size in _TAG_SIZES if len(table) <= 1 << 8 * size
+            )
+            super().__init__(size, size)
+        else:
+            super().__init__(WORD, WORD, boxed=True)
+
+
+class BlockLayout:
+    """
+    The layout of the heap block built by a constructor: its tag at
+    offset 0, then its arguments, each aligned to its layout.
+    """
+    # Tag of the constructor.
+    tag = 0
+
+    # Per argument: its offset and its Layout.
+    offsets = ()
+    fields = ()
+
+    # Size of the block, a multiple of WORD.
+    size = 0
+
+    def __init__(self, tag, fields):
+        """Lay out the block of constructor 'tag', given argument layouts."""
+        self.tag = tag
+        self.fields = tuple(fields)
+        offsets = []
+        offset = TAG_SIZE
+        for field in self.fields:
+            offset = _align(offset, field.align)
+            offsets.append(offset)
+            offset += field.size
+        self.offsets = tuple(offsets)
+        self.size = _align(offset, WORD)
+
+
+class Table:
+    """
+    Layouts of the types of one program, computed on demand and
+    cached per type. Canonical types (see ast.TypeInterner) are shared
+    by all their occurrences, so each is laid out once.
+    """
+
+    def __init__(self, type_table):
+        """Make a new Table, for the user types of 'type_table'."""
+        self.type_table = type_table
+
+        # Layouts of the types seen so far.
+        # Keys  : ids of types
+        # Values: (type, layout); the type is kept alive so ids stay unique
+        self._layouts = dict()
+
+        # Layouts of user types and of constructor blocks, by name.
+        self._user_layouts = dict()
+        self._block_layouts = dict()
+
+        self._dispatcher = {
+            typecon: self._layout_builtin
+            for typecon in ast.builtin_types_map.values()
+        }
+        self._dispatcher.update((
+            (ast.Array, self._layout_array),
+            (ast.Function, self._layout_pointer),
+            (ast.Ref, self._layout_pointer),
+            (ast.User, self._layout_user)
+        ))
+
+    def _layout_builtin(self, t):
+        """A builtin value is stored inline, aligned to its size."""
+        size = _BUILTIN_SIZES[type(t)]
+        return Layout(size, max(size, 1))
+
+    def _layout_array(self, t):
+        """An array value is its descriptor."""
+        # Elements are never arrays, so this recurses at most once.
+        return ArrayLayout(t.dimensions, self.layout(t.type))
+
+    def _layout_pointer(self, _):
+        """A ref or function value is a pointer."""
+        return Layout(WORD, WORD, boxed=True)
+
+    def _layout_user(self, t):
+        """A user type value is a packed tag or a pointer to a block."""
+        return self.user_layout(t.name, t)
+
+    def layout(self, t):
+        """Return the Layout of type 't'."""
+        found = self._layouts.get(id(t))
+        if found is not None:
+            return found[1]
+        result = self._dispatcher[type(t)](t)
+        self._layouts[id(t)] = (t, result)
+        return result
+
+    def user_layout(self, name, node=None):
+        """
+        Return the UserLayout of the user type named. If there is no
+        such processed type, raise typesem.UndefTypeError on 'node'.
+        """
+        result = self._user_layouts.get(name)
+        if result is None:
+            table = self.type_table.lookup_constructor_table(name)
+            if table is None:
+                raise typesem.UndefTypeError(
+                    ast.User(name) if node is None else node
+                )
+            result = self._user_layouts[name] = UserLayout(table)
+        return result
+
+    def block_layout(self, name):
+        """
+        Return the BlockLayout of the constructor named. If there is
+        no such constructor, raise typesem.UndefConstructorError.
+        """
+        result = self._block_layouts.get(name)
+        if result is None:
+            found = self.type_table.lookup_tag(name)
+            if found is None:
+                raise typesem.UndefConstructorError(ast.Constructor(name))
+            table, tag = found
+            result = BlockLayout(
+                tag, [self.layout(t) for t in table.fields[tag]]
+            )
+            self._block_layouts[name] = result
+        return result
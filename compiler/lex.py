@@ -257,6 +257,10 @@ class _LexerFactory:
                 )
             return None
 
+        # Keep the token's extent in the input, for source spans.
+        tok.startpos = tok.lexpos
+        tok.endpos = self.lexer.lexpos
+
         # Track the token's column instead of lexing position.
         tok.lexpos -= self.bol
         if self.verbose:
@@ -285,25 +289,25 @@ class _LexerFactory:
     t_string_ignore = ""
 
     # Newlines
+    @lex.TOKEN(r'\n+')
     def t_ANY_newline(self, tok):
-        r'\n+'
         self.lexer.lineno += len(tok.value)
         self.bol = self.lexer.lexpos - 1
 
     # Single-line comments. Do not consume the newline.
+    @lex.TOKEN(r'--[^\n]*')
     def t_SCOMMENT(self, _):
-        r'--[^\n]*'
         pass
 
     # Start of block comment
+    @lex.TOKEN(r'\(\*')
     def t_INITIAL_comment_LCOMMENT(self, _):
-        r'\(\*'
         self.level += 1
         self.lexer.begin('comment')
 
     # End of block comment
+    @lex.TOKEN(r'\*\)')
     def t_comment_RCOMMENT(self, _):
-        r'\*\)'
         if self.level > 1:
             self.level -= 1
         else:
@@ -313,8 +317,8 @@ class _LexerFactory:
     # Ignore (almost) anything inside a block comment
     # but stop matching when '(', '*' or a newline appears.
     # Match each comment-initiating character seperately.
+    @lex.TOKEN(r'[(*]|[^\n(*]+')
     def t_comment_SPECIAL(self, _):
-        r'[(*]|[^\n(*]+'
         pass
 
     # == LEXING OF TOKENS CARRYING NO VALUE ==
@@ -372,8 +376,8 @@ class _LexerFactory:
     t_CONID     = r'[A-Z][A-Za-z0-9_]*'
 
     # Generic identifiers, reserved words, boolean constants
+    @lex.TOKEN(r'[a-z][A-Za-z0-9_]*')
     def t_GENID(self, tok):
-        r'[a-z][A-Za-z0-9_]*'
         tok.type = reserved_tokens.get(tok.value, tok.type)
 
         str_to_bool_map = {
@@ -385,8 +389,8 @@ class _LexerFactory:
         return tok
 
     # Floating-point constants
+    @lex.TOKEN(r'\d+\.\d+([eE]([+\-]?)\d+)?')
     def t_FCONST(self, tok):
-        r'\d+\.\d+([eE]([+\-]?)\d+)?'
         try:
             tok.value = float(tok.value)
         except OverflowError:
@@ -399,8 +403,8 @@ class _LexerFactory:
         return tok
 
     # Integer constants
+    @lex.TOKEN(r'\d+')
     def t_ICONST(self, tok):
-        r'\d+'
         tok.value = int(tok.value)
         # TODO Check if constant is too big in another module.
         return tok
@@ -432,8 +436,8 @@ class _LexerFactory:
         return tok
 
     # Malformed char literal ahead; enter 'char' state for recovery.
+    @lex.TOKEN(r"'")
     def t_INITIAL_LCHAR(self, tok):
-        r"'"
         self.logger.error(
             "%d:%d: error: Bad character literal.",
             tok.lineno,
@@ -442,13 +446,13 @@ class _LexerFactory:
         self.lexer.begin('char')
 
     # Malformed char literal payload
+    @lex.TOKEN("[^'\n]+")
     def t_char_CCONST(self, _):
-        "[^'\n]+"
         pass
 
     # Exit recovery mode.
+    @lex.TOKEN(r"'")
     def t_char_RCHAR(self, tok):
-        r"'"
         tok.type = 'CCONST'
         tok.value = '\0'
         self.lexer.begin('INITIAL')
@@ -462,8 +466,8 @@ class _LexerFactory:
         return tok
 
     # Malformed string literal ahead; enter 'string' state for recovery.
+    @lex.TOKEN(r'"')
     def t_INITIAL_LSTRING(self, tok):
-        r'"'
         self.logger.error(
             "%d:%d: error: Bad string literal.",
             tok.lineno,
@@ -472,13 +476,13 @@ class _LexerFactory:
         self.lexer.begin('string')
 
     # Malformed string literal payload
+    @lex.TOKEN('[^\"\n]+')
     def t_string_SCONST(self, _):
-        '[^\"\n]+'
         pass
 
     # Exit recovery mode
+    @lex.TOKEN(r'"')
     def t_string_RSTRING(self, tok):
-        r'"'
         tok.type = 'SCONST'
         tok.value = explode('')
         self.lexer.begin('INITIAL')
@@ -0,0 +1,96 @@
+"""
+# ----------------------------------------------------------------------
+# library.py
+#
+# The Llama standard library namespace
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+
+The library functions are declared as virtual AST nodes: FunctionDefs
+with typed Params, a result type and no body. The namespace is built
+once, when this module is first imported, and shared read-only by all
+symbol tables: neither the mapping nor the nodes in it may be mutated.
+"""
+
+import types
+
+from compiler import ast
+
+# Every library function: name, parameter types and result type.
+# "string" stands for an array of char; "int ref" for a ref to int.
+_SIGNATURES = (
+    # Input and output
+    ("print_int", ("int",), "unit"),
+    ("print_bool", ("bool",), "unit"),
+    ("print_char", ("char",), "unit"),
+    ("print_float", ("float",), "unit"),
+    ("print_string", ("string",), "unit"),
+    ("read_int", ("unit",), "int"),
+    ("read_bool", ("unit",), "bool"),
+    ("read_char", ("unit",), "char"),
+    ("read_float", ("unit",), "float"),
+    ("read_string", ("string",), "unit"),
+
+    # Mathematical functions
+    ("abs", ("int",), "int"),
+    ("fabs", ("float",), "float"),
+    ("sqrt", ("float",), "float"),
+    ("sin", ("float",), "float"),
+    ("cos", ("float",), "float"),
+    ("tan", ("float",), "float"),
+    ("atan", ("float",), "float"),
+    ("exp", ("float",), "float"),
+    ("ln", ("float",), "float"),
+    ("pi", ("unit",), "float"),
+
+    # Increment and decrement
+    ("incr", ("int ref",), "unit"),
+    ("decr", ("int ref",), "unit"),
+
+    # Conversions
+    ("float_of_int", ("int",), "float"),
+    ("int_of_float", ("float",), "int"),
+    ("round", ("float",), "int"),
+    ("int_of_char", ("char",), "int"),
+    ("char_of_int", ("int",), "char"),
+
+    # String functions
+    ("strlen", ("string",), "int"),
+    ("strcmp", ("string", "string"), "int"),
+    ("strcpy", ("string", "string"), "unit"),
+    ("strcat", ("string", "string"), "unit"),
+)
+
+_PARAM_NAMES = ("x", "y")
+
+
+def _make_type(spec, interner):
+    """Return the canonical type named by 'spec'."""
+    if spec == "string":
+        return interner.intern(ast.String())
+    if spec.endswith(" ref"):
+        return interner.intern(ast.Ref(_make_type(spec[:-4], interner)))
+    return interner.intern(ast.builtin_types_map[spec]())
+
+
+def _build():
+    """Return the library namespace, a read-only name -> node mapping."""
+    interner = ast.TypeInterner()
+    namespace = {}
+    for name, param_types, result_type in _SIGNATURES:
+        params = [
+            ast.Param(param_name, _make_type(spec, interner))
+            for param_name, spec in zip(_PARAM_NAMES, param_types)
+        ]
+        result = _make_type(result_type, interner)
+        namespace[name] = ast.FunctionDef(name, params, None, result)
+    return types.MappingProxyType(namespace)
+
+
+# The library namespace, shared by every symbol table.
+NAMESPACE = _build()
+
+# Position of every library function in the library scope.
+SLOTS = types.MappingProxyType(
+    dict((name, slot) for slot, name in enumerate(NAMESPACE))
+)
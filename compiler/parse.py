@@ -13,21 +13,57 @@
 
 from ply import yacc
 
-from compiler import ast, error, lex
+from compiler import ast, error, lex, span
 
 
 _TABLE_DIR = 'tables'
 
 
-def _track(p):
-    """Add position to root of reduced grammar rule."""
-    if isinstance(p[1], ast.Node):
-        if p[0] is not p[1]:
-            p[0].copy_pos(p[1])
+def _rule(productions):
+    """
+    Attach the given grammar productions to a p_* rule.
+
+    PLY reads productions from the docstrings of the rule functions.
+    Since 'python -OO' strips docstrings, the grammar is declared
+    explicitly and stored where PLY expects it.
+    """
+    def set_productions(func):
+        func.__doc__ = productions
+        return func
+    return set_productions
+
+
+def _wrap_occurrence(symbol, wrapper):
+    """
+    Make the type occurrence on a grammar symbol an occurrence of the
+    type 'wrapper' built around it, spanning the same input.
+    """
+    _, start, end, _ = occurrence = symbol.occurrence
+    symbol.occurrence = (wrapper, start, end, (occurrence,))
+
+
+def _track_symbol(p):
+    """
+    Add the source span of the right-hand side of a reduced rule to
+    its grammar symbol, and return that span, or None if unknown.
+
+    Tokens carry their span from the lexer, so spans travel up the
+    grammar symbols independently of the AST nodes built for them.
+    """
+    symbols = p.slice
+    for i in range(1, len(symbols)):
+        start = getattr(symbols[i], 'startpos', None)
+        if start is not None:
+            break
     else:
-        node = p[0]
-        node.lineno = p.lineno(1)
-        node.lexpos = p.lexpos(1)
+        return None
+    for i in range(len(symbols) - 1, 0, -1):
+        end = getattr(symbols[i], 'endpos', None)
+        if end is not None:
+            break
+    symbols[0].startpos = start
+    symbols[0].endpos = end
+    return start, end
 
 
 class Parser:
@@ -61,481 +97,486 @@ class Parser:
     #                separated by tokens of type B.
     # In cases where B is absent, whitespace may be assumed as separator.
 
+    @_rule("""program : def_list""")
     def p_program(self, p):
-        """program : def_list"""
         p[0] = ast.Program(p[1])
 
+    @_rule("""def_list : letdef def_list
+                       | typedef def_list
+                       | empty""")
     def p_def_list(self, p):
-        """def_list : letdef def_list
-                    | typedef def_list
-                    | empty"""
         self._expand_list(p)
 
+    @_rule("""letdef : LET REC def_seq
+                     | LET def_seq""")
     def p_letdef(self, p):
-        """letdef : LET REC def_seq
-                  | LET def_seq"""
         if len(p) == 4:
             p[0] = ast.LetDef(p[3], isRec=True)
         else:
             p[0] = ast.LetDef(p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""def_seq : def AND def_seq
+                      | def""")
     def p_def_seq(self, p):
-        """def_seq : def AND def_seq
-                   | def"""
         self._expand_seq(p)
 
+    @_rule("""def : constant_def
+                  | function_def
+                  | var_def""")
     def p_def(self, p):
-        """def : constant_def
-               | function_def
-               | var_def"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""constant_def : GENID COLON type EQ expr
+                           | GENID EQ expr""")
     def p_constant_def(self, p):
-        """constant_def : GENID COLON type EQ expr
-                        | GENID EQ expr"""
         if len(p) == 6:
             p[0] = ast.ConstantDef(p[1], p[5], p[3])
         else:
             p[0] = ast.ConstantDef(p[1], p[3])
-        _track(p)
+        self._track(p)
 
+    @_rule("""function_def : GENID param_seq COLON type EQ expr
+                           | GENID param_seq EQ expr""")
     def p_function_def(self, p):
-        """function_def : GENID param_seq COLON type EQ expr
-                        | GENID param_seq EQ expr"""
         if len(p) == 7:
             p[0] = ast.FunctionDef(p[1], p[2], p[6], p[4])
         else:
             p[0] = ast.FunctionDef(p[1], p[2], p[4])
-        _track(p)
+        self._track(p)
 
+    @_rule("""param_seq : param param_seq
+                        | param""")
     def p_param_seq(self, p):
-        """param_seq : param param_seq
-                     | param"""
         self._expand_seq(p, 1, 2)
 
+    @_rule("""param : LPAREN GENID COLON type RPAREN
+                    | GENID""")
     def p_param(self, p):
-        """param : LPAREN GENID COLON type RPAREN
-                 | GENID"""
         if len(p) == 6:
             p[0] = ast.Param(p[2], p[4])
         else:
             p[0] = ast.Param(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""type : LPAREN type RPAREN
+                   | builtin_type
+                   | derived_type""")
     def p_type(self, p):
-        """type : LPAREN type RPAREN
-                | builtin_type
-                | derived_type"""
         if len(p) == 4:
             p[0] = p[2]
+            p.slice[0].occurrence = p.slice[2].occurrence
         else:
             p[0] = p[1]
-        _track(p)
-
+            p.slice[0].occurrence = p.slice[1].occurrence
+        _track_symbol(p)
+
+    @_rule("""builtin_type : BOOL
+                           | CHAR
+                           | FLOAT
+                           | INT
+                           | UNIT""")
     def p_builtin_type(self, p):
-        """builtin_type : BOOL
-                        | CHAR
-                        | FLOAT
-                        | INT
-                        | UNIT"""
-        p[0] = ast.builtin_types_map[p[1]]()
-        _track(p)
+        self._intern_type(p, ast.builtin_types_map[p[1]]())
 
+    @_rule("""derived_type : array_type
+                           | function_type
+                           | ref_type
+                           | user_type""")
     def p_derived_type(self, p):
-        """derived_type : array_type
-                        | function_type
-                        | ref_type
-                        | user_type"""
         p[0] = p[1]
-        _track(p)
+        p.slice[0].occurrence = p.slice[1].occurrence
+        _track_symbol(p)
 
+    @_rule("""array_type : ARRAY LBRACKET star_comma_seq RBRACKET OF type
+                         | ARRAY OF type""")
     def p_array_type(self, p):
-        """array_type : ARRAY LBRACKET star_comma_seq RBRACKET OF type
-                      | ARRAY OF type"""
         if len(p) == 7:
-            p[0] = ast.Array(p[6], p[3])
+            self._intern_type(p, ast.Array(p[6], p[3]))
         else:
-            p[0] = ast.Array(p[3])
-        _track(p)
+            self._intern_type(p, ast.Array(p[3]))
 
+    @_rule("""star_comma_seq : TIMES COMMA star_comma_seq
+                             | TIMES""")
     def p_star_comma_seq(self, p):
-        """star_comma_seq : TIMES COMMA star_comma_seq
-                          | TIMES"""
         # We 'll be counting stars :)
         if len(p) == 4:
             p[0] = p[3] + 1
         else:
             p[0] = 1
 
+    @_rule("""function_type : type ARROW type""")
     def p_function_type(self, p):
-        """function_type : type ARROW type"""
-        p[0] = ast.Function(p[1], p[3])
-        _track(p)
+        self._intern_type(p, ast.Function(p[1], p[3]))
 
+    @_rule("""ref_type : type REF""")
     def p_ref_type(self, p):
-        """ref_type : type REF"""
-        p[0] = ast.Ref(p[1])
-        _track(p)
+        self._intern_type(p, ast.Ref(p[1]))
 
+    @_rule("""user_type : GENID""")
     def p_user_type(self, p):
-        """user_type : GENID"""
-        p[0] = ast.User(p[1])
-        _track(p)
+        self._intern_type(p, ast.User(p[1]))
 
+    @_rule("""empty :""")
     def p_empty(self, _):
-        """empty :"""
         return None
 
+    @_rule("""expr : expr PLUS expr
+                   | expr MINUS expr
+                   | expr TIMES expr
+                   | expr DIVIDE expr
+                   | expr FPLUS expr
+                   | expr FMINUS expr
+                   | expr FTIMES expr
+                   | expr FDIVIDE expr
+                   | expr MOD expr
+                   | expr FPOW expr
+                   | expr EQ expr
+                   | expr NEQ expr
+                   | expr NATEQ expr
+                   | expr NATNEQ expr
+                   | expr LT expr
+                   | expr LE expr
+                   | expr GT expr
+                   | expr GE expr
+                   | expr BOR expr
+                   | expr BAND expr
+                   | expr SEMICOLON expr
+                   | expr ASSIGN expr
+                   | NOT expr
+                   | PLUS expr %prec SIGN
+                   | MINUS expr %prec SIGN
+                   | FPLUS expr %prec SIGN
+                   | FMINUS expr %prec SIGN
+                   | begin_end_expr
+                   | constructor_call_expr
+                   | delete_expr
+                   | dim_expr
+                   | for_expr
+                   | function_call_expr
+                   | in_expr
+                   | if_expr
+                   | match_expr
+                   | simple_expr
+                   | while_expr""")
     def p_expr(self, p):
-        """expr : expr PLUS expr
-                | expr MINUS expr
-                | expr TIMES expr
-                | expr DIVIDE expr
-                | expr FPLUS expr
-                | expr FMINUS expr
-                | expr FTIMES expr
-                | expr FDIVIDE expr
-                | expr MOD expr
-                | expr FPOW expr
-                | expr EQ expr
-                | expr NEQ expr
-                | expr NATEQ expr
-                | expr NATNEQ expr
-                | expr LT expr
-                | expr LE expr
-                | expr GT expr
-                | expr GE expr
-                | expr BOR expr
-                | expr BAND expr
-                | expr SEMICOLON expr
-                | expr ASSIGN expr
-                | NOT expr
-                | PLUS expr %prec SIGN
-                | MINUS expr %prec SIGN
-                | FPLUS expr %prec SIGN
-                | FMINUS expr %prec SIGN
-                | begin_end_expr
-                | constructor_call_expr
-                | delete_expr
-                | dim_expr
-                | for_expr
-                | function_call_expr
-                | in_expr
-                | if_expr
-                | match_expr
-                | simple_expr
-                | while_expr"""
         if len(p) == 4:
             p[0] = ast.BinaryExpression(p[1], p[2], p[3])
         elif len(p) == 3:
             p[0] = ast.UnaryExpression(p[1], p[2])
         else:
             p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""begin_end_expr : BEGIN expr END""")
     def p_begin_end_expr(self, p):
-        """begin_end_expr : BEGIN expr END"""
         p[0] = p[2]
-        _track(p)
+        self._track(p)
 
+    @_rule("""constructor_call_expr : CONID simple_expr_seq""")
     def p_constructor_call_expr(self, p):
-        """constructor_call_expr : CONID simple_expr_seq"""
         p[0] = ast.ConstructorCallExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""simple_expr_seq : simple_expr simple_expr_seq
+                              | simple_expr""")
     def p_simple_expr_seq(self, p):
-        """simple_expr_seq : simple_expr simple_expr_seq
-                           | simple_expr"""
         self._expand_seq(p, 1, 2)
 
+    @_rule("""simple_expr : array_simple_expr
+                          | paren_simple_expr
+                          | bang_simple_expr
+                          | new_expr
+                          | bconst_simple_expr
+                          | cconst_simple_expr
+                          | conid_simple_expr
+                          | fconst_simple_expr
+                          | genid_simple_expr
+                          | iconst_simple_expr
+                          | sconst_simple_expr
+                          | uconst_simple_expr""")
     def p_simple_expr(self, p):
-        """simple_expr : array_simple_expr
-                       | paren_simple_expr
-                       | bang_simple_expr
-                       | new_expr
-                       | bconst_simple_expr
-                       | cconst_simple_expr
-                       | conid_simple_expr
-                       | fconst_simple_expr
-                       | genid_simple_expr
-                       | iconst_simple_expr
-                       | sconst_simple_expr
-                       | uconst_simple_expr"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""array_simple_expr : GENID LBRACKET expr_comma_seq RBRACKET""")
     def p_array_simple_expr(self, p):
-        """array_simple_expr : GENID LBRACKET expr_comma_seq RBRACKET"""
         p[0] = ast.ArrayExpression(p[1], p[3])
-        _track(p)
+        self._track(p)
 
+    @_rule("""paren_simple_expr : LPAREN expr RPAREN""")
     def p_paren_simple_expr(self, p):
-        """paren_simple_expr : LPAREN expr RPAREN"""
         p[0] = p[2]
-        _track(p)
+        self._track(p)
 
+    @_rule("""bang_simple_expr : BANG simple_expr""")
     def p_bang_simple_expr(self, p):
-        """bang_simple_expr : BANG simple_expr"""
         p[0] = ast.UnaryExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""bconst_simple_expr : TRUE
+                                 | FALSE""")
     def p_bconst_simple_expr(self, p):
-        """bconst_simple_expr : TRUE
-                              | FALSE"""
-        p[0] = ast.ConstExpression(p[1], ast.Bool())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], self.types.intern(ast.Bool()))
+        self._track(p)
 
+    @_rule("""cconst_simple_expr : CCONST""")
     def p_cconst_simple_expr(self, p):
-        """cconst_simple_expr : CCONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Char())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], self.types.intern(ast.Char()))
+        self._track(p)
 
+    @_rule("""conid_simple_expr : CONID""")
     def p_conid_simple_expr(self, p):
-        """conid_simple_expr : CONID"""
         p[0] = ast.ConidExpression(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""iconst_simple_expr : ICONST""")
     def p_iconst_simple_expr(self, p):
-        """iconst_simple_expr : ICONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], self.types.intern(ast.Int()))
+        self._track(p)
 
+    @_rule("""fconst_simple_expr : FCONST""")
     def p_fconst_simple_expr(self, p):
-        """fconst_simple_expr : FCONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], self.types.intern(ast.Float()))
+        self._track(p)
 
+    @_rule("""genid_simple_expr : GENID""")
     def p_genid_simple_expr(self, p):
-        """genid_simple_expr : GENID"""
         p[0] = ast.GenidExpression(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""sconst_simple_expr : SCONST""")
     def p_sconst_simple_expr(self, p):
-        """sconst_simple_expr : SCONST"""
-        p[0] = ast.ConstExpression(p[1], ast.String())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], self.types.intern(ast.String()))
+        self._track(p)
 
+    @_rule("""uconst_simple_expr : LPAREN RPAREN""")
     def p_uconst_simple_expr(self, p):
-        """uconst_simple_expr : LPAREN RPAREN"""
-        p[0] = ast.ConstExpression(None, ast.Unit())
-        _track(p)
+        p[0] = ast.ConstExpression(None, self.types.intern(ast.Unit()))
+        self._track(p)
 
+    @_rule("""delete_expr : DELETE expr""")
     def p_delete_expr(self, p):
-        """delete_expr : DELETE expr"""
         p[0] = ast.DeleteExpression(p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""dim_expr : DIM ICONST GENID
+                       | DIM GENID""")
     def p_dim_expr(self, p):
-        """dim_expr : DIM ICONST GENID
-                    | DIM GENID"""
         if len(p) == 4:
             p[0] = ast.DimExpression(p[3], p[2])
         else:
             p[0] = ast.DimExpression(p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""for_expr : for_to_expr
+                       | for_downto_expr""")
     def p_for_expr(self, p):
-        """for_expr : for_to_expr
-                    | for_downto_expr"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""for_to_expr : FOR GENID EQ expr TO expr DO expr DONE""")
     def p_for_to_expr(self, p):
-        """for_to_expr : FOR GENID EQ expr TO expr DO expr DONE"""
         p[0] = ast.ForExpression(p[2], p[4], p[6], p[8])
-        _track(p)
+        self._track(p)
 
+    @_rule("""for_downto_expr : FOR GENID EQ expr DOWNTO expr DO expr DONE""")
     def p_for_downto_expr(self, p):
-        """for_downto_expr : FOR GENID EQ expr DOWNTO expr DO expr DONE"""
         p[0] = ast.ForExpression(p[2], p[4], p[6], p[8], isDown=True)
-        _track(p)
+        self._track(p)
 
+    @_rule("""function_call_expr : GENID simple_expr_seq""")
     def p_function_call_expr(self, p):
-        """function_call_expr : GENID simple_expr_seq"""
         p[0] = ast.FunctionCallExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""in_expr : letdef IN expr""")
     def p_in_expr(self, p):
-        """in_expr : letdef IN expr"""
         p[0] = ast.LetInExpression(p[1], p[3])
-        _track(p)
+        self._track(p)
 
+    # WARNING: Changing order of clauses produces Syntax Errors,
+    # probably due to a PLY bug.
+    @_rule("""if_expr : IF expr THEN expr
+                      | IF expr THEN expr ELSE expr""")
     def p_if_expr(self, p):
-        # WARNING: Changing order of clauses produces Syntax Errors,
-        # probably due to a PLY bug.
-        """if_expr : IF expr THEN expr
-                   | IF expr THEN expr ELSE expr"""
         if len(p) == 7:
             p[0] = ast.IfExpression(p[2], p[4], p[6])
         else:
             p[0] = ast.IfExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
+    @_rule("""match_expr : MATCH expr WITH clause_seq END""")
     def p_match_expr(self, p):
-        """match_expr : MATCH expr WITH clause_seq END"""
         p[0] = ast.MatchExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
+    @_rule("""clause_seq : clause PIPE clause_seq
+                         | clause""")
     def p_clause_seq(self, p):
-        """clause_seq : clause PIPE clause_seq
-                      | clause"""
         self._expand_seq(p)
 
+    @_rule("""clause : pattern ARROW expr""")
     def p_clause(self, p):
-        """clause : pattern ARROW expr"""
         p[0] = ast.Clause(p[1], p[3])
-        _track(p)
+        self._track(p)
 
+    @_rule("""pattern : complex_pattern
+                      | simple_pattern""")
     def p_pattern(self, p):
-        """pattern : complex_pattern
-                   | simple_pattern"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""complex_pattern : CONID simple_pattern_seq""")
     def p_complex_pattern(self, p):
-        """complex_pattern : CONID simple_pattern_seq"""
         p[0] = ast.Pattern(p[1], p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""simple_pattern_seq : simple_pattern simple_pattern_seq
+                                 | simple_pattern""")
     def p_simple_pattern_seq(self, p):
-        """simple_pattern_seq : simple_pattern simple_pattern_seq
-                              | simple_pattern"""
         self._expand_seq(p, list_idx=2)
 
+    @_rule("""simple_pattern : LPAREN pattern RPAREN
+                             | bconst_simple_expr
+                             | cconst_simple_expr
+                             | conid_simple_pattern
+                             | fconst_simple_expr
+                             | iconst_simple_expr
+                             | genid_simple_pattern
+                             | mfconst_simple_pattern
+                             | miconst_simple_pattern
+                             | pfconst_simple_pattern
+                             | piconst_simple_pattern""")
     def p_simple_pattern(self, p):
-        """simple_pattern : LPAREN pattern RPAREN
-                          | bconst_simple_expr
-                          | cconst_simple_expr
-                          | conid_simple_pattern
-                          | fconst_simple_expr
-                          | iconst_simple_expr
-                          | genid_simple_pattern
-                          | mfconst_simple_pattern
-                          | miconst_simple_pattern
-                          | pfconst_simple_pattern
-                          | piconst_simple_pattern"""
         if len(p) == 4:
             p[0] = p[2]
         else:
             p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""conid_simple_pattern : CONID""")
     def p_conid_simple_pattern(self, p):
-        """conid_simple_pattern : CONID"""
         p[0] = ast.Pattern(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""genid_simple_pattern : GENID""")
     def p_genid_simple_pattern(self, p):
-        """genid_simple_pattern : GENID"""
         p[0] = ast.GenidPattern(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""mfconst_simple_pattern : FMINUS FCONST""")
     def p_mfconst_simple_pattern(self, p):
-        """mfconst_simple_pattern : FMINUS FCONST"""
-        p[0] = ast.ConstExpression(-p[2], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(-p[2], self.types.intern(ast.Float()))
+        self._track(p)
 
+    @_rule("""pfconst_simple_pattern : FPLUS FCONST""")
     def p_pfconst_simple_pattern(self, p):
-        """pfconst_simple_pattern : FPLUS FCONST"""
-        p[0] = ast.ConstExpression(p[2], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(p[2], self.types.intern(ast.Float()))
+        self._track(p)
 
+    @_rule("""miconst_simple_pattern : MINUS ICONST""")
     def p_miconst_simple_pattern(self, p):
-        """miconst_simple_pattern : MINUS ICONST"""
-        p[0] = ast.ConstExpression(-p[2], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(-p[2], self.types.intern(ast.Int()))
+        self._track(p)
 
+    @_rule("""piconst_simple_pattern : PLUS ICONST""")
     def p_piconst_simple_pattern(self, p):
-        """piconst_simple_pattern : PLUS ICONST"""
-        p[0] = ast.ConstExpression(p[2], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(p[2], self.types.intern(ast.Int()))
+        self._track(p)
 
+    @_rule("""new_expr : NEW type""")
     def p_new_expr(self, p):
-        """new_expr : NEW type"""
         p[0] = ast.NewExpression(p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""while_expr : WHILE expr DO expr DONE""")
     def p_while_expr(self, p):
-        """while_expr : WHILE expr DO expr DONE"""
         p[0] = ast.WhileExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
+    @_rule("""var_def : array_var_def
+                      | simple_var_def""")
     def p_var_def(self, p):
-        """var_def : array_var_def
-                   | simple_var_def"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""array_var_def : array_var_def_typed
+                            | array_var_def_untyped""")
     def p_array_var_def(self, p):
-        """array_var_def : array_var_def_typed
-                         | array_var_def_untyped"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
+    @_rule("""array_var_def_typed : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET COLON type""")
     def p_array_var_def_typed(self, p):
-        """array_var_def_typed : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET COLON type"""
         item_type = p[7]
-        arr_type = ast.Array(item_type, len(p[4]))
+        arr_type = self.types.intern(ast.Array(item_type, len(p[4])))
+        _wrap_occurrence(p.slice[7], arr_type)
         p[0] = ast.ArrayVariableDef(p[2], p[4], arr_type)
-        _track(p)
+        self._track(p)
 
+    @_rule("""array_var_def_untyped : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET""")
     def p_array_var_def_untyped(self, p):
-        """array_var_def_untyped : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET"""
         p[0] = ast.ArrayVariableDef(p[2], p[4])
-        _track(p)
+        self._track(p)
 
+    @_rule("""expr_comma_seq : expr COMMA expr_comma_seq
+                             | expr""")
     def p_expr_comma_seq(self, p):
-        """expr_comma_seq : expr COMMA expr_comma_seq
-                          | expr"""
         self._expand_seq(p)
 
+    @_rule("""simple_var_def : MUTABLE GENID
+                             | MUTABLE GENID COLON type""")
     def p_simple_var_def(self, p):
-        """simple_var_def : MUTABLE GENID
-                          | MUTABLE GENID COLON type"""
         if len(p) == 5:
-            vartype = ast.Ref(p[4])
-            vartype.copy_pos(p[4])
+            vartype = self.types.intern(ast.Ref(p[4]))
+            if not vartype.has_pos():
+                symbol = p.slice[4]
+                self.spans.record(vartype, symbol.startpos, symbol.endpos)
+            _wrap_occurrence(p.slice[4], vartype)
             p[0] = ast.VariableDef(p[2], vartype)
         else:
             p[0] = ast.VariableDef(p[2])
-        _track(p)
+        self._track(p)
 
+    @_rule("""typedef : TYPE tdef_and_seq""")
     def p_typedef(self, p):
-        """typedef : TYPE tdef_and_seq"""
         p[0] = p[2]
 
+    @_rule("""tdef_and_seq : tdef AND tdef_and_seq
+                           | tdef""")
     def p_tdef_and_seq(self, p):
-        """tdef_and_seq : tdef AND tdef_and_seq
-                        | tdef"""
         self._expand_seq(p)
 
+    @_rule("""tdef : user_type EQ constr_pipe_seq
+                   | builtin_type EQ constr_pipe_seq""")
     def p_tdef(self, p):
-        """tdef : user_type EQ constr_pipe_seq
-                | builtin_type EQ constr_pipe_seq"""
         # NOTE: Flag redefinition of builtin_types during semantic analysis.
         p[0] = ast.TDef(p[1], p[3])
-        _track(p)
+        self._track(p)
 
+    @_rule("""constr_pipe_seq : constr PIPE constr_pipe_seq
+                              | constr""")
     def p_constr_pipe_seq(self, p):
-        """constr_pipe_seq : constr PIPE constr_pipe_seq
-                           | constr"""
         self._expand_seq(p)
 
+    @_rule("""constr : CONID OF type_seq
+                     | CONID""")
     def p_constr(self, p):
-        """constr : CONID OF type_seq
-                  | CONID"""
         if len(p) == 4:
             p[0] = ast.Constructor(p[1], p[3])
         else:
             p[0] = ast.Constructor(p[1])
-        _track(p)
+        self._track(p)
 
+    @_rule("""type_seq : type type_seq
+                       | type""")
     def p_type_seq(self, p):
-        """type_seq : type type_seq
-                    | type"""
         self._expand_seq(p, list_idx=2)
+        occurrences = p.slice[2].occurrences if len(p) == 3 else []
+        occurrences.insert(0, p.slice[1].occurrence)
+        p.slice[0].occurrences = occurrences
 
     def p_error(self, p):
         """Signal syntax error"""
@@ -551,6 +592,7 @@ class Parser:
             self.logger.error("Syntax error in unknown token")
 
     def _expand_seq(self, p, last_idx=1, list_idx=3):
+        _track_symbol(p)
         if len(p) == last_idx + 1:
             p[0] = [p[last_idx]]
         else:
@@ -558,6 +600,7 @@ class Parser:
             p[0] = p[list_idx]
 
     def _expand_list(self, p):
+        _track_symbol(p)
         if p[1] is None:
             # end of list
             p[0] = []
@@ -565,11 +608,52 @@ class Parser:
             p[2].insert(0, p[1])
             p[0] = p[2]
 
+    def _track(self, p):
+        """
+        Record the source span of the root of a reduced grammar rule,
+        and where the types in its right-hand side are written.
+        """
+        extent = _track_symbol(p)
+        if extent is not None and p[0] is not p[1]:
+            self.spans.record(p[0], *extent)
+            occurrences = []
+            for symbol in p.slice[1:]:
+                occurrence = getattr(symbol, 'occurrence', None)
+                if occurrence is not None:
+                    occurrences.append(occurrence)
+                occurrences.extend(getattr(symbol, 'occurrences', ()))
+            if occurrences:
+                self.spans.record_types(p[0], occurrences)
+
+    def _intern_type(self, p, new_type):
+        """
+        Reduce a type rule to the canonical version of 'new_type'.
+
+        The first occurrence of a type lends its span to the canonical
+        type. Every occurrence is kept on its grammar symbol, as a tree
+        of (type, start, end, subtype occurrences), until the node the
+        type is written in records it (see SpanTable.record_types).
+        """
+        canonical = self.types.intern(new_type)
+        start, end = _track_symbol(p)
+        if not canonical.has_pos():
+            self.spans.record(canonical, start, end)
+        p.slice[0].occurrence = (canonical, start, end, tuple(
+            symbol.occurrence
+            for symbol in p.slice[1:]
+            if getattr(symbol, 'occurrence', None) is not None
+        ))
+        p[0] = canonical
+
     parser = None
     tokens = lex.tokens
     logger = None
     verbose = False
 
+    # Canonical types and source spans of the program being parsed.
+    types = None
+    spans = None
+
     def __init__(self, debug=False, logger=None, optimize=True,
                  start='program', verbose=False):
         """
@@ -624,9 +708,15 @@ class Parser:
         """
         Parse the input and return the AST. If a lexer is not provided,
         create one on the fly.
+
+        Structurally equal types in the AST are the same object;
+        the canonical types of the last parse are kept in 'types'.
+        The source spans of its nodes are kept in 'spans'.
         """
         if lexer is None:
             lexer = lex.Lexer(logger=self.logger)
+        self.types = ast.TypeInterner()
+        self.spans = span.SpanTable(data)
         return self.parser.parse(data, lexer, debug=self.verbose)
 
 
@@ -9,14 +9,22 @@
 # ----------------------------------------------------------------------
 """
 
+import functools
+
 from compiler import ast, error, symbol, typesem
 
 
-class Analyzer:
-    """A semantic analyzer for Llama programs."""
+class Analyzer(ast.Visitor):
+    """
+    A semantic analyzer for Llama programs.
+
+    The analyzer walks the AST as an ast.Visitor: the 'pre_*' and
+    'post_*' hooks below run on entering and on leaving each node.
+    """
 
     def __init__(self, logger=None):
         """Initialize a new Analyzer."""
+        super().__init__()
         self.symbol_table = symbol.Table()
         self.type_table = typesem.Table()
         if logger is None:
@@ -24,42 +32,6 @@ class Analyzer:
         else:
             self.logger = logger
 
-        self._dispatcher = {
-            ast.Program: self.analyze,
-            ast.LetDef: self.analyze_letdef,
-            ast.ConstantDef: self.analyze_constant_def,
-            ast.FunctionDef: self.analyze_function_def,
-            ast.VariableDef: self.analyze_variable_def,
-            ast.ArrayVariableDef: self.analyze_array_variable_def,
-            ast.Param: self.analyze_param,
-            ast.BinaryExpression: self.analyze_binary_expression,
-            ast.UnaryExpression: self.analyze_unary_expression,
-            ast.ConstructorCallExpression:
-                self.analyze_constructor_call_expression,
-            ast.ArrayExpression: self.analyze_array_expression,
-            ast.ConstExpression: self.analyze_const_expression,
-            ast.ConidExpression: self.analyze_conid_expression,
-            ast.GenidExpression: self.analyze_genid_expression,
-            ast.DeleteExpression: self.analyze_delete_expression,
-            ast.DimExpression: self.analyze_dim_expression,
-            ast.ForExpression: self.analyze_for_expression,
-            ast.FunctionCallExpression:
-                self.analyze_function_call_expression,
-            ast.LetInExpression: self.analyze_let_in_expression,
-            ast.IfExpression: self.analyze_if_expression,
-            ast.MatchExpression: self.analyze_match_expression,
-            ast.NewExpression: self.analyze_new_expression,
-            ast.WhileExpression: self.analyze_while_expression,
-            ast.Clause: self.analyze_clause,
-            ast.Pattern: self.analyze_pattern,
-            ast.GenidPattern: self.analyze_genid_pattern,
-
-            list: self.analyze_typedef,  # TODO: Redo ast.TypeDef?
-            # NOTE: Some ast nodes are omitted, as they are
-            # processed elsewhere. These include type annotations as
-            # well as type declarations.
-        }
-
         self._unop_dispatcher = {
             "!": self.analyze_bang_expression,
 
@@ -72,9 +44,6 @@ class Analyzer:
             "-.": self.analyze_float_sign_expression
         }
 
-    def _dispatch(self, node):
-        self._dispatcher[type(node)](node)
-
     def _insert_symbol(self, sym):
         try:
             self.symbol_table.insert_symbol(sym)
@@ -86,10 +55,9 @@ class Analyzer:
             self._insert_symbol(sym)
 
     def analyze(self, program):
-        for definition in program:
-            self._dispatch(definition)
+        self.visit(program)
 
-    def analyze_letdef(self, letdef):
+    def pre_LetDef(self, letdef):
         scope = self.symbol_table.open_scope()
         if letdef.isRec:
             assert scope.visible, "New scope is invisible."
@@ -97,45 +65,81 @@ class Analyzer:
         else:
             scope.visible = False
 
-        for definition in letdef:
-            self._dispatch(definition)
-
+    def post_LetDef(self, letdef):
         if not letdef.isRec:
-            scope.visible = True
+            self.symbol_table.cur_scope.visible = True
             self._insert_symbols(letdef)
 
-    def analyze_typedef(self, typedef):
-        try:
-            self.type_table.process(typedef)
-        except typesem.InvalidTypeError as e:
-            self.logger.error(str(e))
-
-    def analyze_constant_def(self, definition):
-        pass
+    def post_LetInExpression(self, _):
+        # Close the scope opened by the inner letdef.
+        self.symbol_table.close_scope()
 
-    def analyze_function_def(self, definition):
+    def pre_list(self, nodes):
+        # A typedef is a list of TDefs. TODO: Redo ast.TypeDef?
+        if nodes and isinstance(nodes[0], ast.TDef):
+            try:
+                self.type_table.process(nodes)
+            except typesem.InvalidTypeError as e:
+                self.logger.error(str(e))
+            return False
+        return True
+
+    def pre_Type(self, _):
+        # Type annotations are processed elsewhere.
+        return False
+
+    def pre_FunctionDef(self, definition):
         scope = self.symbol_table.open_scope()
         assert scope.visible, "New scope is invisible."
         self._insert_symbols(definition.params)
 
-        for param in definition.params:
-            self._dispatch(param)
-
-        self._dispatch(definition.body)
+    def post_FunctionDef(self, _):
         self.symbol_table.close_scope()
 
-    def analyze_variable_def(self, definition):
-        pass
+    def pre_ForExpression(self, loop):
+        # The counter is only defined in the body, not in the bounds.
+        return (
+            loop.startExpr,
+            loop.stopExpr,
+            functools.partial(self._enter_loop_body, loop),
+            loop.body
+        )
 
-    def analyze_array_variable_def(self, definition):
-        pass
+    def _enter_loop_body(self, loop):
+        self.symbol_table.open_scope()
+        self._insert_symbol(loop)
 
-    def analyze_param(self, param):
-        pass
+    def post_ForExpression(self, _):
+        self.symbol_table.close_scope()
 
-    def analyze_unary_expression(self, expression):
+    def pre_Clause(self, clause):
+        self.symbol_table.open_scope()
+        # Insert the names bound by the pattern, left to right.
+        stack = [clause.pattern]
+        while stack:
+            pattern = stack.pop()
+            if isinstance(pattern, ast.GenidPattern):
+                self._insert_symbol(pattern)
+            elif isinstance(pattern, ast.Pattern):
+                stack.extend(reversed(pattern.list))
+
+    def post_Clause(self, _):
+        self.symbol_table.close_scope()
+
+    def pre_NameUse(self, use):
+        """
+        Resolve a use of a name: annotate it with its definition and
+        the address of the definition in the symbol table.
+        """
+        resolved = self.symbol_table.resolve(use.name)
+        if resolved is None:
+            self.logger.error(str(symbol.UndefIdentifierError(use)))
+            return
+        use.definition, nesting, slot = resolved
+        use.address = nesting, slot
+
+    def pre_UnaryExpression(self, expression):
         self._unop_dispatcher[expression.operator](expression)
-        self._dispatch(expression.operand)
 
     def analyze_bang_expression(self, expression):
         pass
@@ -149,60 +153,6 @@ class Analyzer:
     def analyze_float_sign_expression(self, expression):
         pass
 
-    def analyze_binary_expression(self, expression):
-        pass
-
-    def analyze_constructor_call_expression(self, expression):
-        pass
-
-    def analyze_array_expression(self, expression):
-        pass
-
-    def analyze_const_expression(self, expression):
-        pass
-
-    def analyze_conid_expression(self, expression):
-        pass
-
-    def analyze_genid_expression(self, expression):
-        pass
-
-    def analyze_delete_expression(self, expression):
-        pass
-
-    def analyze_dim_expression(self, expression):
-        pass
-
-    def analyze_for_expression(self, expression):
-        pass
-
-    def analyze_function_call_expression(self, expression):
-        pass
-
-    def analyze_let_in_expression(self, expression):
-        pass
-
-    def analyze_if_expression(self, expression):
-        pass
-
-    def analyze_match_expression(self, expression):
-        pass
-
-    def analyze_new_expression(self, expression):
-        pass
-
-    def analyze_while_expression(self, expression):
-        pass
-
-    def analyze_clause(self, clause):
-        pass
-
-    def analyze_pattern(self, pattern):
-        pass
-
-    def analyze_genid_pattern(self, pattern):
-        pass
-
 
 def analyze(program, logger=None):
     """
@@ -0,0 +1,409 @@
+"""
+# ----------------------------------------------------------------------
+# serial.py
+#
+# Compact binary serialization of Llama ASTs
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+
+File layout (header and footer fields are little-endian; the arrays
+are in the byte order recorded in the header):
+
+    header      magic, format version, byte order of the arrays
+    sections    each padded to 8 bytes, in this order:
+                kinds           node kinds, as in compiler.arena
+                parents         parent of each node
+                ends            index following the subtree of each node
+                linenos         line of each node
+                lexposes        column of each node
+                data            value ids of the data fields of all nodes
+                value_offsets   offset of each value in the value table
+                values          the tagged encoding of every value
+    footer      (offset, size) of every section, the typecode of every
+                array section, node and value counts, and the magic again
+
+Integer arrays are stored with the narrowest of the signed typecodes
+'b', 'h', 'i' and 'q' that holds all their items, so small programs,
+short lines and few distinct names take fewer bytes per node.
+
+Nodes are numbered in preorder, as in compiler.arena, so children and
+siblings follow from 'ends' and the data offsets of a node follow from
+the kinds before it; neither is stored.
+
+The writer emits sections one after the other and records where each
+one landed; the footer is written last, so the output need not be
+seekable. The loader memory-maps the file and exposes the arrays in
+place: nothing is decoded until it is asked for.
+"""
+
+from array import array
+import itertools
+import mmap
+import struct
+import sys
+
+from compiler import arena
+
+MAGIC = b'LLAMAAST'
+
+# Bump on any incompatible change, including to arena.NODE_CLASSES.
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHBx4x')
+
+# Array sections, in file order.
+_ARRAY_SECTIONS = (
+    'kinds',
+    'parents',
+    'ends',
+    'linenos',
+    'lexposes',
+    'data',
+    'value_offsets',
+)
+
+_SECTION_COUNT = len(_ARRAY_SECTIONS) + 1
+
+_FOOTER = struct.Struct(
+    '<%dQ%dsQQ8s' % (2 * _SECTION_COUNT, len(_ARRAY_SECTIONS))
+)
+
+# Typecodes for integer sections, narrowest first.
+_TYPECODES = ('b', 'h', 'i', 'q')
+
+_BYTE_ORDERS = {'little': 0, 'big': 1}
+
+# Value table tags.
+_NONE = b'N'
+_TRUE = b'T'
+_FALSE = b'F'
+_INT = b'i'
+_BIGINT = b'I'
+_FLOAT = b'd'
+_STR = b's'
+_TUPLE = b't'
+
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+_LENGTH = struct.Struct('<I')
+
+# Number of data fields of each node kind, as a bytes.translate table.
+_DATA_COUNTS = bytes(
+    len(arena.NODE_CLASSES[kind]._data_fields)
+    if kind < len(arena.NODE_CLASSES) else 0
+    for kind in range(256)
+)
+
+
+class SerialError(Exception):
+    """Exception thrown on reading a malformed or incompatible AST file."""
+    pass
+
+
+# == VALUE ENCODING ==
+
+def _encode_value(value):
+    """Return the encoding of a value table entry."""
+    if value is None:
+        return _NONE
+    if value is True:
+        return _TRUE
+    if value is False:
+        return _FALSE
+    if isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            return _INT + _INT64.pack(value)
+        digits = str(value).encode('ascii')
+        return _BIGINT + _LENGTH.pack(len(digits)) + digits
+    if isinstance(value, float):
+        return _FLOAT + _FLOAT64.pack(value)
+    if isinstance(value, str):
+        encoded = value.encode('utf-8', 'surrogatepass')
+        return _STR + _LENGTH.pack(len(encoded)) + encoded
+    if isinstance(value, tuple):
+        items = [_encode_value(item) for item in value]
+        return b''.join([_TUPLE, _LENGTH.pack(len(value))] + items)
+    raise TypeError("Cannot serialize value %r" % (value,))
+
+
+def _decode_value(buf, pos):
+    """Decode the value at 'buf[pos:]'; return it and the end position."""
+    tag = bytes(buf[pos:pos + 1])
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        return _INT64.unpack_from(buf, pos)[0], pos + _INT64.size
+    if tag == _FLOAT:
+        return _FLOAT64.unpack_from(buf, pos)[0], pos + _FLOAT64.size
+
+    length = _LENGTH.unpack_from(buf, pos)[0]
+    pos += _LENGTH.size
+    if tag == _STR:
+        raw = bytes(buf[pos:pos + length])
+        return raw.decode('utf-8', 'surrogatepass'), pos + length
+    if tag == _BIGINT:
+        return int(bytes(buf[pos:pos + length])), pos + length
+    if tag == _TUPLE:
+        items = []
+        for _ in range(length):
+            item, pos = _decode_value(buf, pos)
+            items.append(item)
+        return tuple(items), pos
+    raise SerialError("Bad value tag %r" % (tag,))
+
+
+class _ValueTable:
+
+    """Read-only value table decoding entries on first access."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, value_id):
+        try:
+            return self._cache[value_id]
+        except KeyError:
+            value, _ = _decode_value(self._blob, self._offsets[value_id])
+            self._cache[value_id] = value
+            return value
+
+
+# == WRITING ==
+
+class _Output:
+
+    """File wrapper keeping track of the write position."""
+
+    def __init__(self, file):
+        self.file = file
+        self.pos = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.pos += len(data)
+
+    def align(self):
+        """Pad the output to a multiple of 8 bytes."""
+        self.write(b'\0' * (-self.pos % 8))
+
+
+def _subtree_ends(flat):
+    """Return the 'ends' section of an arena."""
+    ends = array('i', range(1, len(flat) + 1))
+    parents = flat.parents
+    # Descendants follow their ancestors, so a backward pass suffices.
+    for index in range(len(flat) - 1, 0, -1):
+        parent = parents[index]
+        if ends[parent] < ends[index]:
+            ends[parent] = ends[index]
+    return ends
+
+
+def _narrow(data):
+    """Return the items of 'data' in the narrowest fitting array."""
+    low, high = (min(data), max(data)) if len(data) else (0, 0)
+    for typecode in _TYPECODES:
+        bound = 1 << (8 * array(typecode).itemsize - 1)
+        if -bound <= low and high < bound:
+            break
+    if typecode == data.typecode:
+        return data
+    return array(typecode, data)
+
+
+def dump_arena(flat, file):
+    """Write an arena to the binary file object 'file'."""
+    out = _Output(file)
+    out.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder]))
+    out.align()
+
+    value_offsets = array('q')
+    encoded_values = []
+    blob_size = 0
+    for value in flat.values:
+        encoded = _encode_value(value)
+        value_offsets.append(blob_size)
+        encoded_values.append(encoded)
+        blob_size += len(encoded)
+
+    sections = []
+    typecodes = []
+    for attr in _ARRAY_SECTIONS:
+        if attr == 'kinds':
+            data = flat.kinds
+        elif attr == 'ends':
+            data = _narrow(_subtree_ends(flat))
+        elif attr == 'value_offsets':
+            data = _narrow(value_offsets)
+        else:
+            data = _narrow(getattr(flat, attr))
+        start = out.pos
+        out.write(memoryview(data).cast('B'))
+        sections.extend((start, out.pos - start))
+        typecodes.append(data.typecode)
+        out.align()
+
+    start = out.pos
+    for encoded in encoded_values:
+        out.write(encoded)
+    sections.extend((start, out.pos - start))
+    out.align()
+
+    out.write(_FOOTER.pack(*sections + [
+        ''.join(typecodes).encode('ascii'),
+        len(flat),
+        len(value_offsets),
+        MAGIC
+    ]))
+
+
+def dump(tree, file):
+    """Write the tree rooted at 'tree' to the binary file object 'file'."""
+    dump_arena(arena.Arena.from_node(tree), file)
+
+
+# == READING ==
+
+class MappedArena(arena.Arena):
+
+    """
+    An arena whose arrays are views into a serialized buffer,
+    usually a memory-mapped file.
+
+    Child and sibling links and data offsets are derived from the
+    stored sections on demand. Nodes are only materialized by
+    'to_node' and values are only decoded when first read. Call
+    'close' (or use the arena as a context manager) to release the
+    mapping.
+    """
+
+    def __init__(self, buf, mapping=None):
+        """Wrap the serialized data in buffer 'buf'."""
+        # NOTE: The base initializer is skipped on purpose; every array
+        # either comes from 'buf' or is derived on demand.
+        # pylint: disable=super-init-not-called
+        self._mapping = mapping
+        self._views = [memoryview(buf)]
+        self._data_offsets = None
+        try:
+            self._read(self._views[0])
+        except Exception:
+            self.close()
+            raise
+
+    def _read(self, whole):
+        """Check the header and footer and expose the sections."""
+        if len(whole) < _HEADER.size + _FOOTER.size:
+            raise SerialError("Truncated AST file")
+        magic, version, byte_order = _HEADER.unpack_from(whole, 0)
+        if magic != MAGIC:
+            raise SerialError("Not a Llama AST file")
+        if version != VERSION:
+            raise SerialError(
+                "Unsupported AST format version %d (expected %d)" %
+                (version, VERSION)
+            )
+        footer = _FOOTER.unpack_from(whole, len(whole) - _FOOTER.size)
+        if footer[-1] != MAGIC:
+            raise SerialError("Truncated AST file")
+
+        def section(i):
+            start, size = footer[2 * i], footer[2 * i + 1]
+            if start + size > len(whole):
+                raise SerialError("Corrupt AST file")
+            view = whole[start:start + size]
+            self._views.append(view)
+            return view
+
+        typecodes = footer[-4].decode('ascii', 'replace')
+        swap = byte_order != _BYTE_ORDERS[sys.byteorder]
+        for i, (attr, typecode) in enumerate(zip(_ARRAY_SECTIONS, typecodes)):
+            if typecode not in (_TYPECODES if i else 'B'):
+                raise SerialError("Corrupt AST file")
+            raw = section(i)
+            if swap:
+                # Cannot use the buffer in place; copy and convert.
+                data = array(typecode, raw.tobytes())
+                data.byteswap()
+            else:
+                try:
+                    data = raw.cast(typecode)
+                except TypeError:
+                    raise SerialError("Corrupt AST file")
+                self._views.append(data)
+            setattr(self, attr, data)
+
+        blob = section(len(_ARRAY_SECTIONS))
+        self.values = _ValueTable(self.value_offsets, blob)
+
+        node_count, value_count = footer[-3], footer[-2]
+        lengths = [len(self.values)] + [
+            len(getattr(self, attr)) for attr in _ARRAY_SECTIONS[:5]
+        ]
+        if lengths != [value_count] + [node_count] * 5:
+            raise SerialError("Corrupt AST file")
+
+    @property
+    def data_offsets(self):
+        """Offset of the data values of each node, computed once."""
+        if self._data_offsets is None:
+            counts = bytes(self.kinds).translate(_DATA_COUNTS)
+            offsets = array('i', [0])
+            offsets.extend(itertools.accumulate(counts))
+            offsets.pop()
+            self._data_offsets = offsets
+        return self._data_offsets
+
+    def children(self, index):
+        """Iterate over the children of a node."""
+        ends = self.ends
+        end, child = ends[index], index + 1
+        while child < end:
+            yield child
+            child = ends[child]
+
+    def child(self, index, attr):
+        """Return the child of a node stored in field 'attr'."""
+        position = self.node_class(index)._child_fields.index(attr)
+        return next(itertools.islice(self.children(index), position, None))
+
+    def subtree_end(self, index):
+        """Return the index following the last descendant of a node."""
+        return self.ends[index]
+
+    def close(self):
+        """Release the underlying buffer; the arena is unusable after."""
+        self._data_offsets = None
+        while self._views:
+            self._views.pop().release()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def loads(data):
+    """Return a MappedArena over the serialized bytes 'data'."""
+    return MappedArena(data)
+
+
+def load(filename):
+    """Memory-map the AST file 'filename' and return a MappedArena."""
+    with open(filename, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return MappedArena(mapping, mapping)
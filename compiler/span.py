@@ -0,0 +1,247 @@
+"""
+# ----------------------------------------------------------------------
+# span.py
+#
+# Source spans of AST nodes
+# http://courses.softlab.ntua.gr/compilers/2012a/llama2012.pdf
+# ----------------------------------------------------------------------
+"""
+
+from array import array
+import bisect
+
+
+class SpanTable:
+
+    """
+    The source spans of the AST nodes of one compilation.
+
+    A span is a pair of offsets into the input: the start of the first
+    token and the end of the last token of a node. Spans are stored in
+    packed arrays, in the order they are recorded; each recorded node
+    refers to the table and holds the index of its span there.
+    Line and column numbers are derived from the offsets.
+
+    A copy of a recorded node shares its span, but is not recorded:
+    queries find the original node.
+
+    A node recorded more than once takes its latest span. Queries by
+    position use an IntervalIndex of the latest spans, built on the
+    first query after recording and kept until the next record.
+
+    Types are canonical (see ast.TypeInterner): one type node stands
+    for all occurrences of the type, so it has a single span. Where
+    each type is written is recorded on the node it is written in.
+    """
+
+    def __init__(self, data=""):
+        """Make an empty table for spans into the input 'data'."""
+        # Offset of the first character of every line.
+        self.line_starts = array('i', [0])
+        newline = data.find('\n')
+        while newline != -1:
+            self.line_starts.append(newline + 1)
+            newline = data.find('\n', newline + 1)
+
+        self.nodes = []
+        self.starts = array('i')
+        self.ends = array('i')
+
+        # IntervalIndex of the latest spans; built by 'intervals'.
+        self._intervals = None
+
+        # Types written in recorded nodes, with their occurrences.
+        # Keys  : indices of the spans of the nodes
+        # Values: lists of (type, offsets), where 'offsets' holds the
+        #         (start, end) of every type in the occurrence, in preorder
+        self._types = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def record(self, node, start, end):
+        """Record that 'node' spans the input from 'start' to 'end'."""
+        node._span = self
+        node._span_index = len(self.nodes)
+        self.nodes.append(node)
+        self.starts.append(start)
+        self.ends.append(end)
+        self._intervals = None
+
+    def record_types(self, node, occurrences):
+        """
+        Record where the types written in the node just recorded are.
+
+        Each occurrence is a tree of (type, start, end, occurrences of
+        the subtypes, in the order of their child fields).
+        """
+        assert self.nodes[-1] is node, "Node must be recorded first"
+        written = []
+        for occurrence in occurrences:
+            offsets = array('i')
+            stack = [occurrence]
+            while stack:
+                _, start, end, children = stack.pop()
+                offsets.append(start)
+                offsets.append(end)
+                stack.extend(reversed(children))
+            written.append((occurrence[0], offsets))
+        self._types[len(self.nodes) - 1] = written
+
+    def type_span(self, node, root, t):
+        """
+        Return the (start, end) offsets where type 't' is first written
+        within type 'root' in the recorded 'node', or None if unknown.
+        """
+        for written, offsets in self._types.get(node._span_index, ()):
+            if written is not root:
+                continue
+            k = 0
+            stack = [root]
+            while stack:
+                current = stack.pop()
+                if current is t:
+                    return offsets[k], offsets[k + 1]
+                k += 2
+                stack.extend(
+                    getattr(current, attr)
+                    for attr in reversed(current._child_fields)
+                )
+        return None
+
+    def span(self, node):
+        """Return the (start, end) offsets of a recorded node."""
+        i = node._span_index
+        return self.starts[i], self.ends[i]
+
+    def line_column(self, offset):
+        """Return the (line, column) of an offset, both counting from 1."""
+        line = bisect.bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def position(self, node):
+        """Return the (line, column) where a recorded node starts."""
+        return self.line_column(self.starts[node._span_index])
+
+    def offset(self, lineno, column):
+        """Return the offset of a (line, column) pair, both counting from 1."""
+        return self.line_starts[lineno - 1] + column - 1
+
+    def intervals(self):
+        """Return the IntervalIndex of the latest spans, built once."""
+        if self._intervals is None:
+            nodes = self.nodes
+            self._intervals = IntervalIndex(self.starts, self.ends, [
+                i for i, node in enumerate(nodes)
+                if node._span is self and node._span_index == i
+            ])
+        return self._intervals
+
+    def node_at(self, offset):
+        """
+        Return the innermost recorded node whose span contains
+        'offset', or None if there is no such node.
+        """
+        k = self.intervals().innermost(offset)
+        return None if k is None else self.nodes[k]
+
+    def nodes_in(self, start, end):
+        """
+        Return the recorded nodes whose spans overlap the input
+        from 'start' to 'end', outer nodes before inner ones.
+        """
+        nodes = self.nodes
+        return [nodes[k] for k in self.intervals().overlapping(start, end)]
+
+
+class IntervalIndex:
+
+    """
+    A static index over a set of intervals, answering which of them
+    contain a point or overlap a range in logarithmic time.
+
+    Intervals are half-open and identified by their position in the
+    'starts' and 'ends' arrays. They are sorted by start, outer before
+    inner; a complete binary tree over that order holds the greatest
+    end in each subtree. Every interval starting at or before a point
+    and ending after it contains the point, so the innermost one is the
+    last such interval in order, found in a single descent.
+
+    For the nested spans of an AST this yields the innermost node.
+    Among equal intervals, the one with the smaller identifier counts
+    as inner: the parser records children before their parents.
+    """
+
+    def __init__(self, starts, ends, ids):
+        """Index the intervals 'ids' given by 'starts' and 'ends'."""
+        # Sort by (start, -end, -id), packed into one integer key.
+        self.order = order = array('i', sorted(
+            ids, key=lambda i: (starts[i] << 62) - (ends[i] << 31) - i
+        ))
+        self.starts = array('i', map(starts.__getitem__, order))
+
+        size = 1
+        while size < len(order):
+            size *= 2
+        self.size = size
+        # Node 1 is the root, the children of node p are 2p and 2p + 1
+        # and leaf k lives at size + k. Padding leaves end before 0.
+        level = array('i', map(ends.__getitem__, order))
+        level.extend(array('i', [-1]) * (size - len(order)))
+        tree = level
+        while len(level) > 1:
+            level = array('i', map(max, level[::2], level[1::2]))
+            tree = level + tree
+        self.max_ends = array('i', [-1]) + tree
+
+    def __len__(self):
+        return len(self.order)
+
+    def innermost(self, offset):
+        """
+        Return the innermost interval containing 'offset',
+        or None if there is no such interval.
+        """
+        last = bisect.bisect_right(self.starts, offset) - 1
+        if last < 0:
+            return None
+        tree, size = self.max_ends, self.size
+
+        # Climb from leaf 'last', looking at the subtrees just left of
+        # the part covered so far, until one ends after 'offset'.
+        p = size + last
+        if tree[p] <= offset:
+            while True:
+                if p == 1:
+                    return None
+                if p & 1 and tree[p - 1] > offset:
+                    p -= 1
+                    break
+                p //= 2
+            # Descend to the rightmost leaf ending after 'offset'.
+            while p < size:
+                p = 2 * p + 1 if tree[2 * p + 1] > offset else 2 * p
+        return self.order[p - size]
+
+    def overlapping(self, start, end):
+        """
+        Return the intervals overlapping the range from 'start' to
+        'end', ordered by start, outer before inner. Takes time
+        logarithmic in the number of intervals for each one found.
+        """
+        last = bisect.bisect_left(self.starts, max(end, start + 1)) - 1
+        tree, size, order = self.max_ends, self.size, self.order
+        found = []
+        # Subtrees as (node, index of first leaf, number of leaves).
+        stack = [(1, 0, size)]
+        while stack:
+            p, first, width = stack.pop()
+            if first > last or tree[p] <= start:
+                continue
+            if p >= size:
+                found.append(order[first])
+                continue
+            width //= 2
+            stack.append((2 * p + 1, first + width, width))
+            stack.append((2 * p, first, width))
+        return found
@@ -10,9 +10,9 @@
 # ----------------------------------------------------------------------
 """
 
-from collections import defaultdict
+from array import array
 
-from compiler import ast
+from compiler import ast, hamt, library
 
 
 class SymbolError(ast.NodeError):
@@ -48,6 +48,9 @@ class Scope:
 
     def __init__(self, entries, visible, nesting):
         """Make a new scope."""
+        # The Table holding the scope, told whenever 'visible' changes.
+        self._table = None
+
         # List of names defined in the scope.
         # Mainly used for clean-up upon closing the scope.
         self.entries = entries
@@ -61,12 +64,24 @@ class Scope:
         # Exceptions: Some scopes are visible from the moment of their
         # creation, as for example those introduced by a 'let rec'.
         # This is necessary for implementing recursive definitions.
-        self.visible = visible
+        self._visible = visible
 
         # Nesting level within the SymbolTable.
         # TODO: Should this be a read-only attribute?
         self.nesting = nesting
 
+    @property
+    def visible(self):
+        """Whether the entries of the scope are visible to lookup."""
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible):
+        if visible != self._visible:
+            self._visible = visible
+            if self._table is not None:
+                self._table._scope_visibility_changed(self)
+
 
 class Table:
     """A fully Pythonic symbol table for Llama."""
@@ -81,44 +96,63 @@ class Table:
         # Used for fast lookup and sanity-checking.
         scope = None
 
+        # Position of the entry within its scope.
+        slot = None
+
         # Entry has an implicit identifier: node.name
 
-        def __init__(self, node, scope):
+        def __init__(self, node, scope, slot):
             """Create a new symbol table entry from a NameNode."""
             self.node = node
             self.scope = scope
+            self.slot = slot
+
+    def __init__(self, namespace=None):
+        """
+        Make a new symbol table and open the library scope, holding
+        the mapping 'namespace' (by default, library.NAMESPACE).
+        """
+        # NOTE: All state is per-instance, so that tables never share
+        # scopes or entries and are reclaimed along with their owner.
+        self._scopes = []
+        self.nesting = 0       # Inv.: nesting == len(scopes)
+        self.cur_scope = None  # Inv.: cur_scope == _scopes[-1] if _scopes
 
-    _scopes = []
-    nesting = 0       # Inv.: nesting == len(scopes)
-    cur_scope = None  # Inv.: cur_scope == _scopes[-1] if _scopes else None
+        # Each hashtable entry is a list containing symbols with
+        # the same identifier, appearing at increasing scope depth.
+        # Only names with at least one symbol have a list, so lookups
+        # of unknown names leave the table untouched.
+        self._hash_table = {}
 
-    # Each hashtable entry is a list containing symbols with
-    # the same identifier, appearing at increasing scope depth.
-    _hash_table = defaultdict(list)
+        # The same, restricted to symbols in visible scopes; the live
+        # definition of a name is always the last of its list.
+        self._visible_table = {}
 
-    def __init__(self):
-        """Make a new symbol table and insert the library namespace."""
-        self._insert_library_symbols()
+        self._insert_library_symbols(namespace)
 
-    def _insert_library_symbols(self):
+    def _insert_library_symbols(self, namespace):
         """Open a new scope populated with the library namespace."""
-        # TODO: Dump library namespace here as a tuple of virtual AST nodes.
-        lib_namespace = tuple()
+        # The namespace is shared with other tables and never copied:
+        # lookups fall back to it after the names defined in the table.
+        if namespace is None:
+            namespace = library.NAMESPACE
+            self._namespace_slots = library.SLOTS
+        else:
+            self._namespace_slots = dict(
+                (name, slot) for slot, name in enumerate(namespace)
+            )
+        self._namespace = namespace
 
         lib_scope = Scope(
             entries=[],
             visible=True,
-            nesting=self.nesting
+            nesting=self.nesting + 1
         )
-
-        for node in lib_namespace:
-            entry = self._Entry(node, lib_scope)
-            lib_scope.entries.append(entry)
-
         self._push_scope(lib_scope)
 
     def _push_scope(self, scope):
         """Push 'scope' and maintain invariants."""
+        scope._table = self
         self._scopes.append(scope)
         self.nesting += 1
         self.cur_scope = self._scopes[-1]
@@ -127,6 +161,7 @@ class Table:
         """Pop scope and maintain invariants."""
         assert self._scopes, 'No scope to pop.'
         old_scope = self._scopes.pop()
+        old_scope._table = None
         self.nesting -= 1
         if self._scopes:
             self.cur_scope = self._scopes[-1]
@@ -150,10 +185,44 @@ class Table:
         old_scope = self._pop_scope()
         for entry in old_scope.entries:
             ename = entry.node.name
-            assert self._hash_table[ename], 'Identifier %s not found' % ename
-            self._hash_table[ename].pop()
+            assert ename in self._hash_table, 'Identifier %s not found' % ename
+            self._pop_entry(self._hash_table, ename)
+            if old_scope.visible:
+                assert self._visible_table[ename][-1] is entry
+                self._pop_entry(self._visible_table, ename)
         return old_scope
 
+    @staticmethod
+    def _pop_entry(table, name, pos=-1):
+        """Remove an entry from the list of 'name' in a hash table."""
+        stack = table[name]
+        del stack[pos]
+        if not stack:
+            del table[name]
+
+    def _scope_visibility_changed(self, scope):
+        """
+        Show or hide the entries of 'scope' from lookup.
+
+        The lists of visible entries stay ordered by scope depth. Scopes
+        change visibility while they are the innermost ones, so every
+        entry is normally added or removed at the end of its list.
+        """
+        for entry in scope.entries:
+            ename = entry.node.name
+            if scope.visible:
+                stack = self._visible_table.setdefault(ename, [])
+                pos = len(stack)
+                while pos and stack[pos - 1].scope.nesting > scope.nesting:
+                    pos -= 1
+                stack.insert(pos, entry)
+            else:
+                stack = self._visible_table[ename]
+                pos = len(stack) - 1
+                while stack[pos] is not entry:
+                    pos -= 1
+                self._pop_entry(self._visible_table, ename, pos)
+
 #     def insert_scope(self, scope):
 #         """Merge 'scope' with current scope."""
 #         assert self.cur_scope, 'No scope to merge into.'
@@ -170,10 +239,31 @@ class Table:
         scope visibilities.
         If lookup succeeds, return the stored node, None otherwise.
         """
-        for entry in reversed(self._hash_table[name]):
-            if entry.scope.visible:
-                return entry.node
-        return None
+        stack = self._visible_table.get(name)
+        if stack:
+            return stack[-1].node
+        return self._namespace.get(name)
+
+    def resolve(self, name):
+        """
+        Find the definition governing the given use of 'name', like
+        'lookup_live_definition'. If lookup succeeds, return the node
+        along with the nesting of its scope and its slot in the scope,
+        None otherwise.
+
+        Library functions are at nesting 1, in their library.SLOTS.
+        Top-level definitions are not in the library scope: the
+        analyzer opens a scope for each top-level let, so they are at
+        nesting 2 and deeper, numbered from 0 in their scope.
+        """
+        stack = self._visible_table.get(name)
+        if stack:
+            entry = stack[-1]
+            return entry.node, entry.scope.nesting, entry.slot
+        node = self._namespace.get(name)
+        if node is None:
+            return None
+        return node, 1, self._namespace_slots[name]
 
     def lookup_in_current_scope(self, name):
         """
@@ -182,11 +272,12 @@ class Table:
         """
         assert self.cur_scope, 'No scope to search.'
 
-        try:
-            entry = self._hash_table[name][-1]
-        except IndexError:
-            # NOTE: Using defaultdict means KeyError never happens.
+        stack = self._hash_table.get(name)
+        if not stack:
+            if self.nesting == 1:
+                return self._namespace.get(name)
             return None
+        entry = stack[-1]
 
         enest = entry.scope.nesting
         if enest >= self.nesting:
@@ -206,6 +297,394 @@ class Table:
         if prev is not None:
             raise RedefIdentifierError(node, prev)
 
-        new_entry = self._Entry(node, self.cur_scope)
-        self._hash_table[node.name].append(new_entry)
+        # Symbols inserted in the library scope itself are numbered
+        # after the library namespace. Other scopes number from 0.
+        slot = len(self.cur_scope.entries)
+        if self.nesting == 1:
+            slot += len(self._namespace)
+
+        new_entry = self._Entry(node, self.cur_scope, slot)
+        self._hash_table.setdefault(node.name, []).append(new_entry)
+        if self.cur_scope.visible:
+            self._visible_table.setdefault(node.name, []).append(new_entry)
         self.cur_scope.entries.append(new_entry)
+
+    def __len__(self):
+        """
+        Return the number of symbols in the table,
+        not counting the library namespace.
+        """
+        return sum(len(scope.entries) for scope in self._scopes)
+
+    def stats(self):
+        """
+        Return a dict describing the size of the table: the number of
+        distinct names, of symbols and of visible symbols, the number
+        of symbols in each open scope, outermost first, and the size
+        of the shared library namespace, which the others exclude.
+        """
+        return {
+            "names": len(self._hash_table),
+            "entries": sum(map(len, self._hash_table.values())),
+            "visible_entries": sum(map(len, self._visible_table.values())),
+            "scope_sizes": [len(scope.entries) for scope in self._scopes],
+            "library_names": len(self._namespace),
+        }
+
+
+class CompactTable:
+    """
+    A symbol table for Llama keeping its state in typed arrays.
+
+    Offers the lookups and insertion of Table, but allocates no object
+    per scope or per symbol. Names are mapped to dense integer ids on
+    first insertion; ids are never recycled, so the table grows with
+    the vocabulary of the programs, not with their size. Symbols are
+    numbered in insertion order, so every open scope owns a contiguous
+    range of symbol numbers. The symbols of each name form a stack,
+    linked from newest to oldest through an array; a second set of
+    links skips the symbols of hidden scopes.
+
+    Scopes are identified by their nesting level. Only the current
+    scope may change visibility, through 'set_visible'.
+    """
+
+    def __init__(self, namespace=None):
+        """
+        Make a new symbol table and open the library scope, holding
+        the mapping 'namespace' (by default, library.NAMESPACE).
+        """
+        self._namespace = library.NAMESPACE if namespace is None else namespace
+        self._name_ids = {}
+
+        # Per name id: newest symbol, and newest visible symbol (or -1).
+        self._heads = array('i')
+        self._live_heads = array('i')
+
+        # Per symbol: its node, its name id and the next older symbol
+        # of the same name, among all and among visible symbols.
+        self._nodes = []
+        self._names = array('i')
+        self._older = array('i')
+        self._older_live = array('i')
+
+        # Per open scope: its first symbol and whether it is visible.
+        self._scope_starts = array('i')
+        self._scope_visible = array('b')
+
+        self.open_scope()
+
+    @property
+    def nesting(self):
+        """Number of open scopes."""
+        return len(self._scope_starts)
+
+    def open_scope(self, visible=True):
+        """Open a new scope in the symbol table; return its nesting."""
+        self._scope_starts.append(len(self._nodes))
+        self._scope_visible.append(visible)
+        return len(self._scope_starts)
+
+    def close_scope(self):
+        """Close current scope in symbol table. Cleanup scope entries."""
+        assert self._scope_starts, 'No scope to pop.'
+        start = self._scope_starts.pop()
+        visible = self._scope_visible.pop()
+        heads, live_heads = self._heads, self._live_heads
+        names, older = self._names, self._older
+        for sym in range(len(names) - 1, start - 1, -1):
+            heads[names[sym]] = older[sym]
+        if visible:
+            older_live = self._older_live
+            for sym in range(len(names) - 1, start - 1, -1):
+                live_heads[names[sym]] = older_live[sym]
+        del self._nodes[start:]
+        del names[start:]
+        del older[start:]
+        del self._older_live[start:]
+
+    def is_visible(self):
+        """Return whether the current scope is visible."""
+        return bool(self._scope_visible[-1])
+
+    def set_visible(self, visible):
+        """Show or hide the current scope from 'lookup_live_definition'."""
+        assert self._scope_starts, 'No current scope.'
+        if visible == self.is_visible():
+            return
+        self._scope_visible[-1] = visible
+        live_heads, names = self._live_heads, self._names
+        older_live = self._older_live
+        # The current scope is the innermost one, so its symbols are the
+        # newest visible symbols of their names when shown.
+        for sym in range(self._scope_starts[-1], len(names)):
+            name_id = names[sym]
+            if visible:
+                older_live[sym] = live_heads[name_id]
+                live_heads[name_id] = sym
+            else:
+                live_heads[name_id] = older_live[sym]
+
+    def lookup_live_definition(self, name):
+        """
+        Find the definition governing the given use of 'name',
+        honouring scope visibilities.
+        If lookup succeeds, return the stored node, None otherwise.
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is not None:
+            sym = self._live_heads[name_id]
+            if sym >= 0:
+                return self._nodes[sym]
+        return self._namespace.get(name)
+
+    def lookup_in_current_scope(self, name):
+        """
+        Lookup 'name' in current scope, ignoring visibility.
+        If lookup succeeds, return the stored node, None otherwise.
+        """
+        assert self._scope_starts, 'No scope to search.'
+        name_id = self._name_ids.get(name)
+        if name_id is not None:
+            sym = self._heads[name_id]
+            if sym >= self._scope_starts[-1]:
+                return self._nodes[sym]
+        if len(self._scope_starts) == 1:
+            return self._namespace.get(name)
+        return None
+
+    def insert_symbol(self, node):
+        """
+        Insert a new NameNode in the current scope.
+        Alert if an alias is already present in same scope.
+        """
+        assert self._scope_starts, 'No scope to insert into.'
+        assert isinstance(node, ast.NameNode), 'Node is not a NameNode.'
+
+        name_id = self._name_ids.get(node.name)
+        if name_id is None:
+            name_id = self._name_ids[node.name] = len(self._heads)
+            self._heads.append(-1)
+            self._live_heads.append(-1)
+
+        prev = self.lookup_in_current_scope(node.name)
+        if prev is not None:
+            raise RedefIdentifierError(node, prev)
+
+        sym = len(self._nodes)
+        newest = self._heads[name_id]
+
+        self._nodes.append(node)
+        self._names.append(name_id)
+        self._older.append(newest)
+        self._heads[name_id] = sym
+        if self._scope_visible[-1]:
+            self._older_live.append(self._live_heads[name_id])
+            self._live_heads[name_id] = sym
+        else:
+            self._older_live.append(-1)
+
+    def __len__(self):
+        """
+        Return the number of symbols in the table,
+        not counting the library namespace.
+        """
+        return len(self._nodes)
+
+    def stats(self):
+        """
+        Return a dict describing the size of the table, as Table.stats
+        does, plus the number of interned names.
+        """
+        ends = self._scope_starts[1:] + array('i', [len(self._nodes)])
+        visible_entries = sum(
+            end - start
+            for start, end, visible in zip(
+                self._scope_starts, ends, self._scope_visible
+            )
+            if visible
+        )
+        return {
+            "names": sum(1 for sym in self._heads if sym >= 0),
+            "entries": len(self._nodes),
+            "visible_entries": visible_entries,
+            "scope_sizes": [
+                end - start for start, end in zip(self._scope_starts, ends)
+            ],
+            "library_names": len(self._namespace),
+            "interned_names": len(self._name_ids),
+        }
+
+
+class _Frame:
+    """An open scope of a PersistentTable. Frames are never mutated."""
+
+    __slots__ = ('parent', 'nesting', 'visible', 'size', 'symbols', 'outer')
+
+    def __init__(self, parent, visible, size, symbols, outer):
+        # The enclosing frame, or None.
+        self.parent = parent
+        self.nesting = parent.nesting + 1 if parent is not None else 1
+        self.visible = visible
+
+        # Number of symbols in the scope, and the symbols themselves
+        # as a linked list of (node, rest) pairs, newest first.
+        self.size = size
+        self.symbols = symbols
+
+        # The environment of the table when the scope was opened.
+        self.outer = outer
+
+
+class PersistentTable:
+    """
+    A symbol table for Llama built on a persistent map.
+
+    Offers the same API as CompactTable, plus 'snapshot': the whole
+    state of the table is a few references to immutable structures,
+    so capturing it is free, and a table made from a snapshot starts
+    from that state without replaying the scopes that led to it.
+    Tables made from the same snapshot evolve independently and may
+    be used from different threads.
+
+    A hamt.HAMT maps every name to its newest symbol, the nesting of
+    that symbol's scope and its live (newest visible) symbol. Every
+    scope records the map as it was on opening, so closing a scope
+    takes constant time.
+    """
+
+    def __init__(self, snapshot=None, namespace=None):
+        """
+        Make a new symbol table and open the library scope, holding
+        the mapping 'namespace' (by default, library.NAMESPACE), or
+        resume from a 'snapshot' taken from another table.
+        """
+        if snapshot is None:
+            if namespace is None:
+                namespace = library.NAMESPACE
+            self._env = hamt.HAMT()
+            self._frame = None
+            self._namespace = namespace
+            self.open_scope()
+        else:
+            self._env, self._frame, self._namespace = snapshot
+
+    def snapshot(self):
+        """Return the current state of the table, in constant time."""
+        return self._env, self._frame, self._namespace
+
+    @property
+    def nesting(self):
+        """Number of open scopes."""
+        return self._frame.nesting if self._frame is not None else 0
+
+    def open_scope(self, visible=True):
+        """Open a new scope in the symbol table; return its nesting."""
+        self._frame = _Frame(self._frame, visible, 0, None, self._env)
+        return self._frame.nesting
+
+    def close_scope(self):
+        """Close current scope in symbol table."""
+        assert self._frame is not None, 'No scope to pop.'
+        self._env = self._frame.outer
+        self._frame = self._frame.parent
+
+    def is_visible(self):
+        """Return whether the current scope is visible."""
+        return self._frame.visible
+
+    def set_visible(self, visible):
+        """Show or hide the current scope from 'lookup_live_definition'."""
+        frame = self._frame
+        assert frame is not None, 'No current scope.'
+        if visible == frame.visible:
+            return
+        # The current scope is the innermost one, so the environment
+        # is the outer one plus the symbols of the scope.
+        env = frame.outer
+        symbols = frame.symbols
+        while symbols is not None:
+            node, symbols = symbols
+            if visible:
+                live = node
+            else:
+                outer = env.get(node.name)
+                live = outer[2] if outer is not None else None
+            env = env.set(node.name, (node, frame.nesting, live))
+        self._env = env
+        self._frame = _Frame(
+            frame.parent, visible, frame.size, frame.symbols, frame.outer
+        )
+
+    def lookup_live_definition(self, name):
+        """
+        Find the definition governing the given use of 'name',
+        honouring scope visibilities.
+        If lookup succeeds, return the stored node, None otherwise.
+        """
+        symbol = self._env.get(name)
+        if symbol is not None and symbol[2] is not None:
+            return symbol[2]
+        return self._namespace.get(name)
+
+    def lookup_in_current_scope(self, name):
+        """
+        Lookup 'name' in current scope, ignoring visibility.
+        If lookup succeeds, return the stored node, None otherwise.
+        """
+        assert self._frame is not None, 'No scope to search.'
+        symbol = self._env.get(name)
+        if symbol is not None and symbol[1] == self._frame.nesting:
+            return symbol[0]
+        if self._frame.nesting == 1:
+            return self._namespace.get(name)
+        return None
+
+    def insert_symbol(self, node):
+        """
+        Insert a new NameNode in the current scope.
+        Alert if an alias is already present in same scope.
+        """
+        frame = self._frame
+        assert frame is not None, 'No scope to insert into.'
+        assert isinstance(node, ast.NameNode), 'Node is not a NameNode.'
+
+        prev = self.lookup_in_current_scope(node.name)
+        if prev is not None:
+            raise RedefIdentifierError(node, prev)
+
+        prev = self._env.get(node.name)
+        if frame.visible:
+            live = node
+        else:
+            live = prev[2] if prev is not None else None
+        self._env = self._env.set(node.name, (node, frame.nesting, live))
+        self._frame = _Frame(
+            frame.parent, frame.visible, frame.size + 1,
+            (node, frame.symbols), frame.outer
+        )
+
+    def __len__(self):
+        """
+        Return the number of symbols in the table,
+        not counting the library namespace.
+        """
+        return sum(self.stats()["scope_sizes"])
+
+    def stats(self):
+        """Return a dict describing the size of the table, as Table.stats."""
+        frames = []
+        frame = self._frame
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.parent
+        frames.reverse()
+        return {
+            "names": len(self._env),
+            "entries": sum(frame.size for frame in frames),
+            "visible_entries": sum(
+                frame.size for frame in frames if frame.visible
+            ),
+            "scope_sizes": [frame.size for frame in frames],
+            "library_names": len(self._namespace),
+        }
@@ -11,6 +11,8 @@
 # ----------------------------------------------------------------------
 """
 
+from array import array
+
 from compiler import ast
 
 # == INVALID TYPE ERRORS ==
@@ -87,6 +89,152 @@ def is_array(t):
     return isinstance(t, ast.Array)
 
 
+def _user_types(t):
+    """Return the names of all user types occurring in type 't'."""
+    if not t._child_fields:
+        return [t.name] if type(t) is ast.User else []
+    names = []
+    stack = [t]
+    while stack:
+        node = stack.pop()
+        if type(node) is ast.User:
+            names.append(node.name)
+        stack.extend(
+            getattr(node, attr) for attr in reversed(node._child_fields)
+        )
+    return names
+
+
+def _required_type(t):
+    """
+    Return the name of the user type that must have a value for type
+    't' to have one, or None. A ref needs the value it points to, but
+    an array may be empty and a function need not be called.
+    """
+    while type(t) is ast.Ref:
+        t = t.type
+    return t.name if type(t) is ast.User else None
+
+
+def _strong_components(edges):
+    """
+    Return the strongly connected components of a directed graph, as
+    lists of vertices, each component after all those it has edges to.
+
+    The vertices are 0, 1, ..., and 'edges[v]' lists the vertices that
+    'v' has edges to. The components are found with Tarjan's algorithm,
+    in time linear in the size of the graph, using an explicit stack
+    instead of recursion.
+    """
+    count = len(edges)
+    order = [None] * count  # Visiting order of each vertex.
+    low = [0] * count  # Least order reachable within the component.
+    on_stack = [False] * count
+    visited = 0
+    stack = []  # Vertices whose component is not yet complete.
+    components = []
+
+    for root in range(count):
+        if order[root] is not None:
+            continue
+        # Vertices being visited, each with the number of edges followed.
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                order[v] = low[v] = visited
+                visited += 1
+                stack.append(v)
+                on_stack[v] = True
+            targets = edges[v]
+            while i < len(targets):
+                w = targets[i]
+                i += 1
+                if order[w] is None:
+                    work.append((v, i))
+                    work.append((w, 0))
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], order[w])
+            else:
+                # All edges followed: 'v' is done.
+                if low[v] == order[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    component.reverse()
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+    return components
+
+
+class ConstructorTable:
+    """
+    The constructors of a user type, numbered densely by tag.
+
+    Tags are given in order of definition, from 0. Each is an index
+    into the arrays below, so that matching on a value and building one
+    can work with integer tags instead of constructor names.
+    """
+
+    def __init__(self, constructors):
+        """Make the table of a sequence of Constructor nodes."""
+        # Per tag: the Constructor node, its name, its number of
+        # arguments and the tuple of its argument types.
+        self.nodes = tuple(constructors)
+        self.names = tuple(c.name for c in self.nodes)
+        self.arities = array('i', (len(c.list) for c in self.nodes))
+        self.fields = tuple(tuple(c.list) for c in self.nodes)
+
+        # Tag of each constructor, by name.
+        self.tags = {name: tag for tag, name in enumerate(self.names)}
+
+        # Whether no constructor takes arguments, so that a value of
+        # the type can be represented by its tag alone.
+        self.enum = not any(self.arities)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+class TypeInfo:
+    """Facts about a user type, gathered once its definition is processed."""
+    # Whether the type occurs in the arguments of its own constructors,
+    # directly or through other types of its component.
+    recursive = False
+
+    # Number of constructors of the type.
+    constructors = 0
+
+    # Greatest number of arguments taken by a constructor of the type.
+    max_arity = 0
+
+    # Index of the strongly connected component of the type in the
+    # dependency graph of user types. Types only depend on types
+    # of the same component or of components with smaller indices.
+    component = None
+
+    # Whether the type has any finite values. A type none of whose
+    # constructors can be built without a value of its own component,
+    # e.g. 'type t = T of t', has none.
+    inhabited = True
+
+    def __init__(self, recursive, constructors, max_arity, component,
+                 inhabited):
+        """Create the info of a type."""
+        self.recursive = recursive
+        self.constructors = constructors
+        self.max_arity = max_arity
+        self.component = component
+        self.inhabited = inhabited
+
+
 class Table:
     """
     Database of all the program's types. Enables semantic checking
@@ -98,6 +246,8 @@ class Table:
         # Dictionary of types seen so far. Builtin types always available.
         # Keys  : names of types
         # Values: (definition node, constructors list)
+        # The definition node of a builtin type is the type itself;
+        # that of a user type is its TDef.
         self._known_types = dict()
         for typecon in ast.builtin_types_map.values():
             type_instance = typecon()
@@ -108,6 +258,29 @@ class Table:
         # Value: (definition node, produced type)
         self._known_constructors = dict()
 
+        # Types found valid so far. Canonical types are shared by all
+        # their occurrences, so each is validated only once.
+        # Keys  : ids of types
+        # Values: the types themselves, kept alive so ids stay unique
+        # Types are never unregistered, so a valid type stays valid.
+        # Invalid types are not recorded, so they are checked again,
+        # e.g. after 'process' registers a type they refer to.
+        self._valid = dict()
+
+        # Info on every user type processed so far.
+        # Keys  : names of user types
+        # Values: TypeInfo
+        self._type_info = dict()
+
+        # Constructor tables of the user types processed so far.
+        # Keys  : names of user types
+        # Values: ConstructorTable
+        self._constructor_tables = dict()
+
+        # Strongly connected components of the dependency graph of user
+        # types, as lists of type names, in topological order.
+        self._components = []
+
         # Bulk-add dispatching for builtin types.
         self._dispatcher = {
             typecon: self._validate_builtin
@@ -127,11 +300,11 @@ class Table:
         basetype = t.type
         if is_array(basetype):
             raise ArrayOfArrayError(t)
-        self.validate(basetype)
+        return (basetype,)
 
     def _validate_builtin(self, _):
         """A builtin type is always valid."""
-        pass
+        return ()
 
     def _validate_function(self, t):
         """
@@ -141,41 +314,72 @@ class Table:
         t1, t2 = t.fromType, t.toType
         if is_array(t2):
             raise ArrayReturnError(t)
-        self.validate(t1)
-        self.validate(t2)
+        return (t1, t2)
 
     def _validate_ref(self, t):
         """A 'ref T' type is valid iff T is a valid, non-array type."""
         basetype = t.type
         if is_array(basetype):
             raise RefOfArrayError(t)
-        self.validate(basetype)
+        return (basetype,)
 
     def _validate_user(self, t):
         """A user-defined type is valid, unless referencing an unknown type."""
         if t.name not in self._known_types:
             raise UndefTypeError(t)
+        return ()
 
-    def validate(self, t):
+    def validate(self, t, owner=None):
         """
         Verify that a type is a valid type, i.e. ensures type structure
         and semantics follow language spec.
+
+        Each check above returns the subtypes still to be validated;
+        they are walked with an explicit stack, in the order a recursive
+        walk would take, so arbitrarily deep types can be validated.
+
+        If 't' is written in the node 'owner', an error is reported
+        where the offending type is written there, rather than at the
+        first occurrence of that (canonical) type.
         """
-        return self._dispatcher[type(t)](t)
+        valid = self._valid
+        if id(t) in valid:
+            return
 
-    def _insert_new_type(self, new_type):
+        # Types checked by this call, by id. Subtypes shared within 't'
+        # are checked once, not once per occurrence.
+        checked = {}
+        dispatcher = self._dispatcher
+        stack = [t]
+        try:
+            while stack:
+                node = stack.pop()
+                key = id(node)
+                if key in valid or key in checked:
+                    continue
+                checked[key] = node
+                stack.extend(reversed(dispatcher[type(node)](node)))
+        except InvalidTypeError as e:
+            if owner is not None:
+                e.node = owner.locate_type(t, e.node)
+            raise
+
+        # Only now is every type in 'checked' known to be valid.
+        valid.update(checked)
+
+    def _insert_new_type(self, tdef):
         """
         Insert newly defined type in Table. Signal error on redefinition.
         """
-        existing_type, _ = self._known_types.get(new_type.name, (None, []))
-        if existing_type is None:
-            self._known_types[new_type.name] = (new_type, [])
+        existing_def, _ = self._known_types.get(tdef.name, (None, []))
+        if existing_def is None:
+            self._known_types[tdef.name] = (tdef, [])
             return
 
-        if isinstance(existing_type, ast.Builtin):
-            raise RedefBuiltinTypeError(new_type)
+        if isinstance(existing_def, ast.Builtin):
+            raise RedefBuiltinTypeError(tdef)
         else:
-            raise RedefUserTypeError(new_type, existing_type)
+            raise RedefUserTypeError(tdef, existing_def)
 
     def _insert_new_constructor(self, new_type, new_constructor):
         """
@@ -192,7 +396,7 @@ class Table:
             )
 
             for argType in new_constructor:
-                self.validate(argType)
+                self.validate(argType, new_constructor)
         else:
             raise RedefConstructorError(new_constructor, existing_constructor)
 
@@ -203,7 +407,7 @@ class Table:
         """
         # First, insert all newly-defined types.
         for tdef in type_defs:
-            self._insert_new_type(tdef.type)
+            self._insert_new_type(tdef)
 
         # Then, process each constructor and its arguments.
         for tdef in type_defs:
@@ -211,18 +415,150 @@ class Table:
             for constructor in tdef:
                 self._insert_new_constructor(new_type, constructor)
 
+        # Last, gather information on the new types, in dependency order.
+        # Types defined earlier are settled and take no part in the graph.
+        index_of = {tdef.name: i for i, tdef in enumerate(type_defs)}
+        edges = []
+        needs = []  # Per type, per constructor: the user types it needs.
+        for tdef in type_defs:
+            targets = []
+            type_needs = []
+            for constructor in tdef:
+                constructor_needs = []
+                for arg_type in constructor:
+                    for name in _user_types(arg_type):
+                        if name in index_of:
+                            targets.append(index_of[name])
+                    name = _required_type(arg_type)
+                    if name is not None:
+                        constructor_needs.append(name)
+                type_needs.append(constructor_needs)
+            edges.append(targets)
+            needs.append(type_needs)
+
+        for component in _strong_components(edges):
+            self._process_component(
+                [type_defs[v] for v in component],
+                [needs[v] for v in component],
+                len(component) > 1 or component[0] in edges[component[0]]
+            )
+
         # TODO: Emit warnings when typenames clash with definition names.
 
+    def _process_component(self, tdefs, needs, recursive):
+        """
+        Gather the TypeInfo of the types in a strongly connected
+        component, given those of all the types it depends on.
+        'needs' lists the user types needed by each constructor.
+        """
+        number = len(self._components)
+        names = [tdef.name for tdef in tdefs]
+        self._components.append(names)
+        members = set(names)
+
+        # A type is inhabited iff one of its constructors only needs
+        # inhabited types. Types of earlier components are settled;
+        # within the component, start from the constructors needing
+        # none of its types and propagate.
+        type_info = self._type_info
+        ready = []
+        waiting = []  # Per constructor: its type and needed types.
+        for name, type_needs in zip(names, needs):
+            for constructor_needs in type_needs:
+                pending = set()
+                for needed in constructor_needs:
+                    if needed in members:
+                        pending.add(needed)
+                        continue
+                    info = type_info.get(needed)
+                    if info is not None and not info.inhabited:
+                        break
+                else:
+                    if pending:
+                        waiting.append((name, pending))
+                    else:
+                        ready.append(name)
+
+        inhabited = set()
+        if waiting and len(names) > 1:
+            needed_by = {}
+            for k, (_, pending) in enumerate(waiting):
+                for needed in pending:
+                    needed_by.setdefault(needed, []).append(k)
+            while ready:
+                name = ready.pop()
+                if name in inhabited:
+                    continue
+                inhabited.add(name)
+                for k in needed_by.get(name, ()):
+                    owner, pending = waiting[k]
+                    pending.discard(name)
+                    if not pending:
+                        ready.append(owner)
+        else:
+            inhabited.update(ready)
+
+        for tdef in tdefs:
+            table = ConstructorTable(tdef.list)
+            self._constructor_tables[tdef.name] = table
+            self._type_info[tdef.name] = TypeInfo(
+                recursive=recursive,
+                constructors=len(table),
+                max_arity=max(table.arities, default=0),
+                component=number,
+                inhabited=tdef.name in inhabited
+            )
+
     def lookup_type(self, name):
         """
         Lookup the type named and retrieve stored info.
 
         If the type is found, a tuple is returned. The tuple contains
-        the definition node of that type and a list of defined constructors,
-        in that order. If the type doesn't exist, None is returned.
+        the definition node of that type (a TDef, or the type itself for
+        builtin types) and a list of defined constructors, in that order.
+        If the type doesn't exist, None is returned.
         """
         return self._known_types.get(name)
 
+    def lookup_type_info(self, name):
+        """
+        Lookup the user type named and retrieve its TypeInfo.
+        If there is no such user type, None is returned.
+        """
+        return self._type_info.get(name)
+
+    def lookup_constructor_table(self, name):
+        """
+        Lookup the user type named and retrieve its ConstructorTable.
+        If there is no such user type, None is returned.
+        """
+        return self._constructor_tables.get(name)
+
+    def lookup_tag(self, name):
+        """
+        Lookup the constructor named and retrieve its tag.
+
+        If the constructor is found, a tuple is returned. The tuple
+        contains the ConstructorTable of the produced type and the tag
+        of the constructor in it, in that order. If the constructor
+        doesn't exist, None is returned.
+        """
+        found = self._known_constructors.get(name)
+        if found is None:
+            return None
+        table = self._constructor_tables.get(found[1].name)
+        if table is None:
+            return None
+        return table, table.tags[name]
+
+    def components(self):
+        """
+        Return the strongly connected components of the dependency graph
+        of user types, as lists of type names, in topological order:
+        every type depends only on types of its own or earlier components.
+        """
+        return self._components
+
     def lookup_constructor(self, name):
         """
         Lookup the constructor named and retrieve stored info.
@@ -14,7 +14,7 @@ import collections
 import logging
 import sys
 
-from compiler import error, lex, parse, sem
+from compiler import dump, error, lex, parse, sem
 
 # Compiler invocation options and switches.
 # Available to all modules.
@@ -90,6 +90,19 @@ def mk_cli_parser():
         action="store_true",
         default=False
     )
+
+    cli_parser.add_argument(
+        "-da",
+        "--dump-ast",
+        help="""\
+            Dump the AST to stdout after parsing, as indented text\
+            (the default) or as JSON.\
+            """,
+        nargs="?",
+        choices=("text", "json"),
+        const="text",
+        default=None
+    )
     return cli_parser
 
 
@@ -128,6 +141,7 @@ def main():
     OPTS["lexer_verbose"] = args.lexer_verbose
     OPTS["parser_verbose"] = args.parser_verbose
     OPTS["parser_debug"] = args.parser_debug
+    OPTS["dump_ast"] = args.dump_ast
 
     lexer = lex.Lexer(
         logger=error.Logger(inputfile=OPTS["input"], level=logging.DEBUG),
@@ -155,6 +169,13 @@ def main():
     if not (lexer.logger.success and parser.logger.success):
         sys.exit(1)
 
+    # Dump the AST if requested.
+    if OPTS["dump_ast"] == "json":
+        dump.dump_json(ast, sys.stdout)
+        sys.stdout.write("\n")
+    elif OPTS["dump_ast"] == "text":
+        dump.dump_text(ast, sys.stdout)
+
     # Analyze and annotate the AST
     analyzer = sem.Analyzer(
         logger=error.Logger(inputfile=OPTS["input"], level=logging.DEBUG)
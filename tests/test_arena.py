@@ -0,0 +1,67 @@
+import glob
+import unittest
+
+from compiler import arena, ast, parse
+
+# pylint: disable=no-member
+
+
+class TestArena(unittest.TestCase):
+    """Test the flat AST representation."""
+
+    def test_kinds(self):
+        for kind, cls in enumerate(arena.NODE_CLASSES):
+            arena.kind_name(kind).should.equal(cls.__name__)
+        arena.kind_name(arena.LIST).should.equal("list")
+        arena.kind_name(arena.NONE).should.equal("None")
+
+    def test_roundtrip(self):
+        for path in sorted(glob.glob("tests/correct/*.lla")):
+            with open(path) as source:
+                tree = parse.quiet_parse(source.read())
+            flat = arena.Arena.from_node(tree)
+            rebuilt = flat.to_node()
+            self.assertTrue(rebuilt == tree, path)
+            for index in flat.nodes_of_class(ast.Node):
+                flat.to_node(index).lineno.should.equal(
+                    flat.position(index)[0]
+                )
+
+    def test_view(self):
+        tree = parse.quiet_parse("let f x = x + g 1 let y = f 2")
+        flat = arena.Arena.from_node(tree)
+
+        flat.node_class(0).should.be(ast.Program)
+        flat.parent(0).should.equal(arena.NIL)
+        len(list(flat.preorder())).should.equal(len(flat))
+
+        names = [flat.name(i) for i in flat.nodes_of_class(ast.Def)]
+        names.should.equal(["f", "y"])
+
+        calls = list(flat.nodes_of_class(ast.FunctionCallExpression))
+        [flat.name(i) for i in calls].should.equal(["g", "f"])
+        flat.position(calls[0]).should.equal((1, 15))
+
+        binop = next(flat.nodes_of_class(ast.BinaryExpression))
+        flat.data_value(binop, "operator").should.equal("+")
+        left = flat.child(binop, "leftOperand")
+        flat.name(left).should.equal("x")
+        flat.parent(left).should.equal(binop)
+        flat.kind(flat.child(binop, "type")).should.equal(arena.NONE)
+
+        self.assertTrue(flat.to_node(binop) == tree.list[0].list[0].body)
+
+    def test_deep_tree(self):
+        expr = ast.ConstExpression(0, None)
+        for _ in range(100000):
+            leaf = ast.ConstExpression(0, None)
+            expr = ast.BinaryExpression(expr, ";", leaf)
+        flat = arena.Arena.from_node(expr)
+        len(flat).should.equal(4 * 100000 + 2)
+        self.assertTrue(flat.to_node() == expr)
+
+    def test_interning(self):
+        tree = parse.quiet_parse("let x = 1 let y = x + x + x + 1")
+        flat = arena.Arena.from_node(tree)
+        flat.values.count("x").should.equal(1)
+        flat.values.count(1).should.equal(1)
@@ -1,5 +1,7 @@
+import copy
 import itertools
 import unittest
+import weakref
 
 from compiler import ast, parse
 
@@ -16,11 +18,78 @@ class TestAST(unittest.TestCase):
         node.lexpos = 2
         node.pos_to_str().should.equal("1:2:")
 
+    def test_slots(self):
+        nodes = (
+            ast.BinaryExpression(ast.GenidExpression("x"), "+", None),
+            ast.ArrayVariableDef("a", [], ast.Array(ast.Int())),
+            ast.Int(),
+            ast.Program([])
+        )
+        for node in nodes:
+            self.assertFalse(hasattr(node, "__dict__"))
+            node.should.have.property("lineno").being(None)
+            node.should.have.property("lexpos").being(None)
+            with self.assertRaises(AttributeError):
+                node.undeclared = 42
+            weakref.ref(node)().should.be(node)
+
+    def test_eq_ignores_position(self):
+        node1 = ast.ArrayVariableDef("a", [], ast.Array(ast.Int()))
+        node2 = ast.ArrayVariableDef("a", [], ast.Array(ast.Int()))
+        node1.lineno, node1.lexpos = 1, 2
+        node1.should.equal(node2)
+
+        node2.name = "b"
+        node1.shouldnt.equal(node2)
+
     def test_eq(self):
         foocon = ast.Constructor("foo", [])
         ast.Constructor("foo", []).should.equal(foocon)
         ast.Constructor("bar", []).shouldnt.equal(foocon)
 
+    @staticmethod
+    def _deep_chain(length):
+        expr = ast.ConstExpression(0, ast.Int())
+        for i in range(length):
+            expr = ast.BinaryExpression(expr, ";", ast.GenidExpression("x"))
+            expr.lineno = i
+        return expr
+
+    def test_deep_eq(self):
+        chain1, chain2 = self._deep_chain(100000), self._deep_chain(100000)
+        self.assertTrue(chain1 == chain2)
+        self.assertEqual(hash(chain1), hash(chain2))
+
+        chain2.leftOperand.leftOperand.rightOperand.name = "y"
+        self.assertFalse(chain1 == chain2)
+
+    def test_hash(self):
+        ast.Array(ast.Int()).should.equal(ast.Array(ast.Int()))
+        hash(ast.Array(ast.Int())).should.equal(hash(ast.Array(ast.Int())))
+
+        string1 = ast.ConstExpression(list("foo\0"), ast.String())
+        string2 = ast.ConstExpression(list("foo\0"), ast.String())
+        hash(string1).should.equal(hash(string2))
+
+    def test_copy(self):
+        tree = parse.quiet_parse("let f x = (x + 1) * 2 let g = f 1")
+        shallow = copy.copy(tree)
+        shallow.should.equal(tree)
+        shallow.list.should.be(tree.list)
+
+        deep = copy.deepcopy(tree)
+        deep.should.equal(tree)
+        deep.list.shouldnt.be(tree.list)
+        deep.list[0].lineno.should.equal(tree.list[0].lineno)
+
+        chain = self._deep_chain(100000)
+        self.assertTrue(copy.deepcopy(chain) == chain)
+
+        shared = ast.Int()
+        pair = copy.deepcopy(ast.Function(shared, shared))
+        pair.fromType.should.be(pair.toType)
+        pair.fromType.shouldnt.be(shared)
+
     def test_regression_constructor_attr_equality(self):
         tdef1 = parse.quiet_parse("type color = Red", "typedef")
         tdef2 = [ast.TDef(ast.User("color"), [ast.Constructor("Red")])]
@@ -85,3 +154,168 @@ class TestAST(unittest.TestCase):
         i2float.shouldnt.equal(ast.User("foo"))
         i2float.shouldnt.equal(ast.Ref(ast.Int()))
         i2float.shouldnt.equal(ast.Array(ast.Int()))
+
+    def test_type_interner(self):
+        types = ast.TypeInterner()
+        intt = types.intern(ast.Int())
+        types.intern(ast.Int()).should.be(intt)
+
+        i2i = ast.Function(ast.Int(), ast.Ref(ast.Int()))
+        canonical = types.intern(i2i)
+        canonical.shouldnt.be(i2i)
+        canonical.should.equal(i2i)
+        canonical.fromType.should.be(intt)
+        canonical.toType.type.should.be(intt)
+        i2i.fromType.shouldnt.be(intt)
+
+        reft = types.intern(ast.Ref(intt))
+        types.intern(ast.Function(intt, reft)).should.be(canonical)
+        types.intern(ast.Array(intt, 2)).shouldnt.be(
+            types.intern(ast.Array(intt))
+        )
+        types.intern(ast.User("foo")).shouldnt.be(
+            types.intern(ast.User("bar"))
+        )
+        len(types).should.equal(7)
+
+
+class TestTraversal(unittest.TestCase):
+    """Test the generic Visitor and Transformer."""
+
+    @staticmethod
+    def _deep_chain(length):
+        expr = ast.ConstExpression(0, ast.Int())
+        for _ in range(length):
+            expr = ast.BinaryExpression(expr, "+", ast.GenidExpression("x"))
+        return expr
+
+    def test_visitor_order_and_hooks(self):
+        tree = parse.quiet_parse("let f x = x + 1")
+        events = []
+
+        class Recorder(ast.Visitor):
+            def pre_Node(self, node):
+                events.append(("pre", type(node).__name__))
+
+            def post_Expression(self, node):
+                events.append(("post", type(node).__name__))
+
+        Recorder().visit(tree)
+        events.should.equal([
+            ("pre", "Program"),
+            ("pre", "LetDef"),
+            ("pre", "FunctionDef"),
+            ("pre", "Param"),
+            ("pre", "BinaryExpression"),
+            ("pre", "GenidExpression"),
+            ("post", "GenidExpression"),
+            ("pre", "ConstExpression"),
+            ("pre", "Int"),
+            ("post", "ConstExpression"),
+            ("post", "BinaryExpression"),
+        ])
+
+    def test_visitor_pruning(self):
+        tree = parse.quiet_parse("let f (x : int) = x + 1")
+        seen = []
+
+        class Pruner(ast.Visitor):
+            def pre_Node(self, node):
+                seen.append(node)
+
+            def pre_BinaryExpression(self, _):
+                return False
+
+            def pre_Type(self, _):
+                return False
+
+        Pruner().visit(tree)
+        len(seen).should.equal(4)
+
+    def test_visitor_child_order(self):
+        tree = parse.quiet_parse("let f x = x + 1")
+        events = []
+
+        class Reorderer(ast.Visitor):
+            def pre_BinaryExpression(self, node):
+                return (
+                    node.rightOperand,
+                    lambda: events.append("between"),
+                    node.leftOperand
+                )
+
+            def pre_Expression(self, node):
+                events.append(type(node).__name__)
+
+            def post_BinaryExpression(self, _):
+                events.append("post")
+
+        Reorderer().visit(tree)
+        events.should.equal([
+            "ConstExpression", "between", "GenidExpression", "post"
+        ])
+
+    def test_visitor_deep_tree(self):
+        counts = [0]
+
+        class Counter(ast.Visitor):
+            def pre_GenidExpression(self, _):
+                counts[0] += 1
+
+        Counter().visit(self._deep_chain(200000))
+        counts[0].should.equal(200000)
+
+    def test_transformer(self):
+        class Folder(ast.Transformer):
+            def post_BinaryExpression(self, node):
+                left, right = node.leftOperand, node.rightOperand
+                if isinstance(left, ast.ConstExpression) and \
+                        isinstance(right, ast.ConstExpression):
+                    return ast.ConstExpression(
+                        left.value + right.value, ast.Int()
+                    )
+                return node
+
+            def post_LetDef(self, node):
+                return node if node.list else None
+
+            def post_ConstantDef(self, node):
+                return None if node.name == "dead" else node
+
+        tree = parse.quiet_parse("let x = 1 + 2 + 3 let dead = 0 let y = x")
+        expected = parse.quiet_parse("let x = 6 let y = x")
+        self.assertTrue(Folder().visit(tree) == expected)
+
+        chain = self._deep_chain(100000)
+        ast.Transformer().visit(chain).should.be(chain)
+
+    def test_transformer_child_order(self):
+        class Renamer(ast.Transformer):
+            def __init__(self):
+                super().__init__()
+                self.names = []
+
+            def pre_BinaryExpression(self, node):
+                return (
+                    node.rightOperand,
+                    lambda: self.names.append("|"),
+                    node.leftOperand
+                )
+
+            def post_GenidExpression(self, node):
+                self.names.append(node.name)
+                return ast.GenidExpression(node.name.upper())
+
+        tree = parse.quiet_parse("a + b", "expr")
+        renamer = Renamer()
+        renamer.visit(tree).should.equal(ast.BinaryExpression(
+            ast.GenidExpression("A"), "+", ast.GenidExpression("B")
+        ))
+        renamer.names.should.equal(["b", "|", "a"])
+
+        class Stray(ast.Transformer):
+            def pre_BinaryExpression(self, node):
+                return (ast.GenidExpression("c"),)
+
+        with self.assertRaises(AssertionError):
+            Stray().visit(tree)
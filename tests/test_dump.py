@@ -0,0 +1,65 @@
+import io
+import json
+import unittest
+
+from compiler import ast, dump, parse
+
+# pylint: disable=no-member
+
+
+class TestDump(unittest.TestCase):
+    """Test the AST dumpers."""
+
+    def test_text(self):
+        tree = parse.quiet_parse("let x = -1")
+        out = io.StringIO()
+        dump.dump_text(tree, out)
+        out.getvalue().should.equal(
+            "Program\n"
+            "  list: [1]\n"
+            "    [0] LetDef isRec=False @1:1\n"
+            "      list: [1]\n"
+            "        [0] ConstantDef name='x' @1:5\n"
+            "          type: None\n"
+            "          body: UnaryExpression operator='-' @1:9\n"
+            "            operand: ConstExpression value=1 @1:10\n"
+            "              type: Int name='int'\n"
+            "            type: None\n"
+        )
+
+    def test_repr(self):
+        node = ast.GenidExpression("x")
+        repr(node).should.equal("GenidExpression name='x'\n  type: None")
+
+    def test_json(self):
+        tree = parse.quiet_parse('let s = "ab" type t = A of int')
+        out = io.StringIO()
+        dump.dump_json(tree, out)
+        data = json.loads(out.getvalue())
+
+        data["node"].should.equal("Program")
+        letdef, typedefs = data["list"]
+        const = letdef["list"][0]
+        const["name"].should.equal("s")
+        self.assertIsNone(const["type"])
+        const["body"]["value"].should.equal(["a", "b", "\0"])
+        const["body"]["lexpos"].should.equal(9)
+        typedefs[0]["list"][0]["list"][0]["node"].should.equal("Int")
+
+        out = io.StringIO()
+        dump.dump_json(None, out)
+        out.getvalue().should.equal("null")
+
+    def test_deep_tree(self):
+        expr = ast.ConstExpression(0, None)
+        for _ in range(100000):
+            leaf = ast.ConstExpression(0, None)
+            expr = ast.BinaryExpression(expr, ";", leaf)
+
+        out = io.StringIO()
+        dump.dump_json(expr, out)
+        out.getvalue().count('"BinaryExpression"').should.equal(100000)
+
+        out = io.StringIO()
+        dump.dump_text(expr, out, indent="")
+        out.getvalue().count("\n").should.equal(4 * 100000 + 2)
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from compiler import hamt
+
+# pylint: disable=no-member
+
+
+class _Colliding:
+    """A key whose hash collides with every other instance."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, _Colliding) and self.name == other.name
+
+
+class TestHAMT(unittest.TestCase):
+    """Test the persistent map."""
+
+    def test_empty(self):
+        empty = hamt.HAMT()
+        len(empty).should.equal(0)
+        self.assertIsNone(empty.get("x"))
+        empty.get("x", 1).should.equal(1)
+        ("x" in empty).should.be(False)
+        list(empty).should.equal([])
+
+    def test_persistence(self):
+        empty = hamt.HAMT()
+        one = empty.set("x", 1)
+        two = one.set("y", 2)
+        other = one.set("x", 3)
+
+        len(empty).should.equal(0)
+        dict(one.items()).should.equal({"x": 1})
+        dict(two.items()).should.equal({"x": 1, "y": 2})
+        dict(other.items()).should.equal({"x": 3})
+        two.set("y", 2).should.be(two)
+
+    def test_against_dict(self):
+        rng = random.Random(3)
+        maps = [(hamt.HAMT(), {})]
+        for _ in range(5000):
+            trie, reference = rng.choice(maps)
+            key = rng.randrange(2000) if rng.random() < 0.8 else str(
+                rng.randrange(100)
+            )
+            value = rng.randrange(10)
+            trie = trie.set(key, value)
+            reference = dict(reference)
+            reference[key] = value
+            maps.append((trie, reference))
+
+        for trie, reference in maps[::50]:
+            len(trie).should.equal(len(reference))
+            dict(trie.items()).should.equal(reference)
+            for key in range(-5, 2005, 7):
+                self.assertEqual(trie.get(key), reference.get(key))
+                self.assertEqual(key in trie, key in reference)
+
+    def test_collisions(self):
+        keys = [_Colliding(i) for i in range(10)]
+        trie = hamt.HAMT().set("a", 0)
+        for i, key in enumerate(keys):
+            trie = trie.set(key, i)
+        trie = trie.set(keys[3], 30)
+
+        len(trie).should.equal(11)
+        trie.get(keys[3]).should.equal(30)
+        trie.get(_Colliding(5)).should.equal(5)
+        self.assertIsNone(trie.get(_Colliding(10)))
+        trie.get("a").should.equal(0)
@@ -0,0 +1,354 @@
+import threading
+import unittest
+import weakref
+
+from compiler import ast, infer, parse, symbol
+
+# pylint: disable=no-member
+
+
+class TestUnifier(unittest.TestCase):
+    """Test the unification engine."""
+
+    def setUp(self):
+        self.unifier = infer.Unifier()
+
+    def _temps(self, count):
+        return [self.unifier.context.new_temp(None) for _ in range(count)]
+
+    def test_errors(self):
+        for exc in (
+            infer.TypeMismatchError,
+            infer.OccursCheckError,
+            infer.ForbiddenTypeError
+        ):
+            self.assertTrue(issubclass(exc, infer.InferenceError))
+
+    def test_union_find(self):
+        ttypes = self._temps(100)
+        for ttype1, ttype2 in zip(ttypes, ttypes[1:]):
+            self.unifier.unify(ttype1, ttype2)
+        root = self.unifier.find(ttypes[0])
+        context = self.unifier.context
+        for ttype in ttypes:
+            self.unifier.find(ttype).should.be(root)
+            context.parents[ttype.tag].should.equal(root.tag)
+        context.ranks[root.tag].should.be.lower_than(8)
+
+        self.unifier.unify(ttypes[50], ast.Int())
+        self.unifier.resolve(ttypes[0]).should.equal(ast.Int())
+
+    def test_structural(self):
+        a, b, c, d = self._temps(4)
+        self.unifier.unify(a, ast.Function(b, ast.Array(c, 2)))
+        self.unifier.unify(a, ast.Function(ast.Ref(d), d))
+        self.unifier.unify(c, ast.Char())
+
+        expected = parse.quiet_parse(
+            "(array [*, *] of char) ref -> array [*, *] of char", "type"
+        )
+        self.unifier.resolve(a).should.equal(expected)
+        self.unifier.resolve(d).should.equal(expected.toType)
+
+    def test_resolve_shares(self):
+        a, = self._temps(1)
+        int_type = ast.Int()
+        ground = ast.Function(int_type, int_type)
+        self.unifier.resolve(ground).should.be(ground)
+        self.unifier.unify(a, ground)
+        self.unifier.resolve(a).should.be(ground)
+
+        b, c = self._temps(2)
+        self.unifier.unify(b, ast.Ref(c))
+        self.unifier.resolve(b).type.should.be(self.unifier.find(c))
+
+    def test_mismatch(self):
+        a, b = self._temps(2)
+        self.unifier.unify(a, ast.Function(ast.Int(), b))
+        for term in (
+            ast.Int(),
+            ast.Ref(ast.Int()),
+            ast.Function(ast.Float(), b),
+            ast.User("foo"),
+        ):
+            with self.assertRaises(infer.TypeMismatchError):
+                self.unifier.unify(a, term)
+
+        self.unifier.unify(b, ast.Array(ast.Int(), 1))
+        with self.assertRaises(infer.TypeMismatchError):
+            self.unifier.unify(b, ast.Array(ast.Int(), 2))
+        foo, bar = self._bound(ast.User("foo")), self._bound(ast.User("bar"))
+        with self.assertRaises(infer.TypeMismatchError):
+            self.unifier.unify(foo, bar)
+
+    def _bound(self, term):
+        ttype, = self._temps(1)
+        self.unifier.unify(ttype, term)
+        return ttype
+
+    def test_occurs_check(self):
+        a, b, c = self._temps(3)
+        self.unifier.unify(a, ast.Ref(a))
+        with self.assertRaises(infer.OccursCheckError):
+            self.unifier.check_cycles()
+
+        self.unifier.unify(b, ast.Function(c, ast.Int()))
+        self.unifier.unify(c, b)
+        with self.assertRaises(infer.OccursCheckError):
+            self.unifier.resolve(b)
+        with self.assertRaises(infer.OccursCheckError):
+            self.unifier.check_cycles()
+
+        d, e = self._temps(2)
+        with self.assertRaises(infer.OccursCheckError):
+            self.unifier.solve([
+                infer.SpecConstraint(d, ast.Ref(e)),
+                infer.AsTypeOfConstraint(e, d)
+            ])
+
+        # Long acyclic chains are fine, built top-down or bottom-up.
+        ttypes = self._temps(10000)
+        for outer, inner in zip(ttypes, ttypes[1:]):
+            self.unifier.unify(outer, ast.Ref(inner))
+        self.unifier.unify(ttypes[-1], ast.Int())
+        self.unifier.check_cycles()
+        depth = 0
+        t = self.unifier.resolve(ttypes[0])
+        while isinstance(t, ast.Ref):
+            t, depth = t.type, depth + 1
+        depth.should.equal(9999)
+
+        for make in (ast.Ref, lambda inner: ast.Function(inner, ast.Int())):
+            ttypes = self._temps(10000)
+            self.unifier.solve(
+                infer.SpecConstraint(outer, make(inner))
+                for inner, outer in zip(ttypes, ttypes[1:])
+            )
+
+    def test_solve(self):
+        a, b, c = self._temps(3)
+        self.unifier.solve([
+            infer.AsTypeOfConstraint(a, b),
+            infer.SpecConstraint(b, ast.Ref(c)),
+            infer.SetConstraint(c, (ast.Int, ast.Float)),
+            infer.NegSetConstraint(a, (ast.Function,)),
+            infer.SpecConstraint(c, ast.Float()),
+        ])
+        self.unifier.resolve(a).should.equal(ast.Ref(ast.Float()))
+
+        d, = self._temps(1)
+        for constraint in (
+            infer.SetConstraint(d, (ast.Int, ast.Char)),
+            infer.NegSetConstraint(d, (ast.Float,)),
+        ):
+            with self.assertRaises(infer.ForbiddenTypeError):
+                self.unifier.solve([
+                    infer.SpecConstraint(d, ast.Float()), constraint
+                ])
+
+    def test_domains(self):
+        comparable = infer.domain((ast.Int, ast.Float, ast.Char))
+        infer.kinds(comparable).should.equal((ast.Char, ast.Float, ast.Int))
+        infer.kinds(infer.ANY_KIND).should.have.length_of(9)
+
+        a, b, c = self._temps(3)
+        self.unifier.domain(a).should.equal(infer.ANY_KIND)
+        self.unifier.restrict(a, comparable)
+        self.unifier.restrict(b, infer.ANY_KIND & ~infer.domain((ast.Int,)))
+        self.unifier.unify(a, b)
+        self.unifier.domain(b).should.equal(
+            infer.domain((ast.Float, ast.Char))
+        )
+
+        # Empty domains are found before any type is known.
+        self.unifier.restrict(c, infer.domain((ast.Int, ast.Bool)))
+        with self.assertRaises(infer.ForbiddenTypeError):
+            self.unifier.unify(c, a)
+
+        d, e = self._temps(2)
+        self.unifier.unify(d, ast.Ref(e))
+        self.unifier.domain(d).should.equal(infer.domain((ast.Ref,)))
+        with self.assertRaises(infer.ForbiddenTypeError):
+            self.unifier.restrict(d, comparable)
+
+    def test_solve_domains(self):
+        ttypes = self._temps(1000)
+        constraints = []
+        for ttype1, ttype2 in zip(ttypes, ttypes[1:]):
+            constraints.append(infer.AsTypeOfConstraint(ttype1, ttype2))
+            constraints.append(
+                infer.NegSetConstraint(ttype1, (ast.Function, ast.Array))
+            )
+        self.unifier.solve(constraints)
+        self.unifier.domain(ttypes[-1]).should.equal(infer.domain((
+            ast.Bool, ast.Char, ast.Float, ast.Int, ast.Unit,
+            ast.User, ast.Ref
+        )))
+
+        with self.assertRaises(infer.ForbiddenTypeError):
+            self.unifier.solve([
+                infer.SetConstraint(ttypes[500], (ast.Function,))
+            ])
+
+
+class TestGeneralization(unittest.TestCase):
+    """Test level-based let-polymorphism."""
+
+    def setUp(self):
+        self.unifier = infer.Unifier()
+        self.table = symbol.Table()
+
+    def _temp(self):
+        return self.unifier.context.new_temp(None, level=self.table.nesting)
+
+    def _function(self):
+        """Return the types of a function, its parameter and result."""
+        self.table.open_scope()
+        param, result = self._temp(), self._temp()
+        self.table.close_scope()
+        function = self._temp()
+        self.unifier.unify(function, ast.Function(param, result))
+        return function, param, result
+
+    def test_levels(self):
+        outer = self._temp()
+        self.table.open_scope()
+        self.table.open_scope()
+        inner, innermost = self._temp(), self._temp()
+        self.unifier.level(inner).should.equal(self.table.nesting)
+
+        self.unifier.unify(inner, ast.Ref(innermost))
+        self.unifier.unify(outer, ast.Function(inner, ast.Int()))
+        for ttype in (outer, inner, innermost):
+            self.unifier.level(ttype).should.equal(1)
+
+        a, b = self._temp(), self._temp()
+        self.unifier.unify(a, ast.Ref(b))
+        self.table.close_scope()
+        c = self._temp()
+        self.unifier.unify(c, a)
+        self.unifier.level(b).should.equal(self.table.nesting)
+
+    def test_polymorphic_let(self):
+        # let id x = x in (id 1, id true)
+        nesting = self.table.nesting
+        self.table.open_scope()
+        identity, param, result = self._function()
+        self.unifier.unify(param, result)
+        self.unifier.generalize(identity, nesting)
+        self.unifier.level(param).should.equal(infer.GENERIC)
+
+        for arg_type in (ast.Int(), ast.Bool()):
+            instance = self.unifier.instantiate(identity, self.table.nesting)
+            use = self._temp()
+            self.unifier.unify(instance, ast.Function(arg_type, use))
+            self.unifier.resolve(use).should.equal(arg_type)
+
+        # The generalized type itself is left intact.
+        self.unifier.resolve(param).should.be(self.unifier.find(param))
+
+    def test_monomorphic_variable(self):
+        # fun y -> let g z = y in (g 1, g 'c')
+        self.table.open_scope()
+        y = self._temp()
+        nesting = self.table.nesting
+        self.table.open_scope()
+        g, z, result = self._function()
+        self.unifier.unify(result, y)
+        self.unifier.generalize(g, nesting)
+        self.unifier.level(z).should.equal(infer.GENERIC)
+        self.unifier.level(y).should.equal(nesting)
+
+        first = self.unifier.instantiate(g, self.table.nesting)
+        second = self.unifier.instantiate(g, self.table.nesting)
+        first.fromType.shouldnt.be(second.fromType)
+        first.toType.should.be(second.toType)
+        self.unifier.unify(self._temp(), first)
+        self.unifier.unify(y, ast.Int())
+        with self.assertRaises(infer.TypeMismatchError):
+            self.unifier.unify(second.toType, ast.Char())
+
+    def test_instantiate_domains(self):
+        # let lt x y = x < y
+        nesting = self.table.nesting
+        self.table.open_scope()
+        lt, x, _ = self._function()
+        comparable = infer.domain((ast.Int, ast.Float, ast.Char))
+        self.unifier.restrict(x, comparable)
+        self.unifier.generalize(lt, nesting)
+
+        instance = self.unifier.instantiate(lt, self.table.nesting)
+        self.unifier.domain(instance.fromType).should.equal(comparable)
+        with self.assertRaises(infer.ForbiddenTypeError):
+            self.unifier.unify(instance.fromType, ast.Bool())
+
+    def test_ground_instance(self):
+        t = self._temp()
+        ground = ast.Function(ast.Int(), ast.Int())
+        self.unifier.unify(t, ground)
+        self.unifier.generalize(t, 0)
+        self.unifier.instantiate(t, 1).should.be(ground)
+
+    def test_cyclic_instance(self):
+        t, u = self._temp(), self._temp()
+        self.unifier.unify(t, ast.Ref(u))
+        self.unifier.unify(u, t)
+        self.unifier.generalize(t, 0)
+        with self.assertRaises(infer.OccursCheckError):
+            self.unifier.instantiate(t, 1)
+
+
+class TestContext(unittest.TestCase):
+    """Test inference contexts."""
+
+    def test_allocation(self):
+        context1, context2 = infer.Context(), infer.Context()
+        node = ast.GenidExpression("x")
+        ttype = context1.new_temp(node, ast.Int())
+        ttype.tag.should.equal(0)
+        context2.new_temp(None).tag.should.equal(0)
+        context1.new_temp(None).tag.should.equal(1)
+        len(context1).should.equal(2)
+        context1.temps[0].should.be(ttype)
+        context1.nodes[0].should.be(node)
+        context1.spec_types[0].should.equal(ast.Int())
+
+    def test_write_back(self):
+        context = infer.Context()
+        unifier = infer.Unifier(context)
+        nodes = [ast.GenidExpression(name) for name in "xyz"]
+        x, y, z = (context.new_temp(node) for node in nodes)
+        unifier.solve([
+            infer.SpecConstraint(x, ast.Function(y, z)),
+            infer.SpecConstraint(y, ast.Int()),
+        ])
+        unifier.write_back()
+        nodes[0].type.should.equal(ast.Function(ast.Int(), z))
+        nodes[1].type.should.equal(ast.Int())
+        nodes[2].type.should.be(z)
+
+        # Nothing refers back to the context: dropping it frees it.
+        ref = weakref.ref(context)
+        del context, unifier, x, y
+        self.assertIsNone(ref())
+
+    def test_threads(self):
+        def run(results):
+            unifier = infer.Unifier()
+            ttypes = [
+                unifier.context.new_temp(None) for _ in range(2000)
+            ]
+            for ttype1, ttype2 in zip(ttypes, ttypes[1:]):
+                unifier.unify(ttype1, ast.Ref(ttype2))
+            unifier.unify(ttypes[-1], ast.Int())
+            results.append([ttype.tag for ttype in ttypes])
+
+        results = []
+        threads = [
+            threading.Thread(target=run, args=(results,)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.should.equal([list(range(2000))] * 4)
@@ -0,0 +1,93 @@
+import unittest
+
+from compiler import ast, layout, parse, typesem
+
+# pylint: disable=no-member
+
+
+class TestLayout(unittest.TestCase):
+    """Test the layout of types."""
+
+    def setUp(self):
+        self.types = typesem.Table()
+        tree = parse.quiet_parse(
+            """
+            type color = Red | Green | Blue
+            type shape = Point | Circle of float
+                       | Rect of char float color (int -> int)
+            type list = Nil | Cons of int list
+            """
+        )
+        for typeDefList in tree:
+            self.types.process(typeDefList)
+        self.layouts = layout.Table(self.types)
+
+    def _layout(self, source):
+        return self.layouts.layout(parse.quiet_parse(source, "type"))
+
+    def test_builtin(self):
+        for source, size, align in (
+            ("unit", 0, 1),
+            ("bool", 1, 1),
+            ("char", 1, 1),
+            ("int", layout.WORD, layout.WORD),
+            ("float", 8, 8),
+        ):
+            found = self._layout(source)
+            (found.size, found.align).should.equal((size, align))
+            self.assertFalse(found.boxed)
+
+    def test_pointer(self):
+        for source in ("int ref", "(array of int) -> int", "list ref"):
+            found = self._layout(source)
+            (found.size, found.align).should.equal((layout.WORD, layout.WORD))
+            self.assertTrue(found.boxed)
+
+    def test_array(self):
+        found = self._layout("array [*, *, *] of char")
+        found.should.be.a(layout.ArrayLayout)
+        found.dimensions.should.equal(3)
+        found.size.should.equal(4 * layout.WORD)
+        found.dimension_offset(2).should.equal(3 * layout.WORD)
+        found.element.size.should.equal(1)
+        self.assertFalse(found.boxed)
+
+    def test_user(self):
+        color = self._layout("color")
+        self.assertTrue(color.packed)
+        self.assertFalse(color.boxed)
+        color.size.should.equal(1)
+        color.table.should.be(self.types.lookup_constructor_table("color"))
+
+        for name in ("shape", "list"):
+            found = self._layout(name)
+            self.assertFalse(found.packed)
+            self.assertTrue(found.boxed)
+            found.size.should.equal(layout.WORD)
+
+        # Rect of char float color (int -> int)
+        block = self.layouts.block_layout("Rect")
+        block.tag.should.equal(2)
+        block.offsets.should.equal((4, 8, 16, 24))
+        block.size.should.equal(32)
+        self.layouts.block_layout("Point").size.should.equal(8)
+
+        with self.assertRaises(typesem.UndefTypeError):
+            self._layout("undeftype")
+        with self.assertRaises(typesem.UndefConstructorError):
+            self.layouts.block_layout("Undef")
+
+    def test_packed_sizes(self):
+        for count, size in ((2, 1), (256, 1), (257, 2), (65537, 4)):
+            table = typesem.ConstructorTable(
+                [ast.Constructor("C%d" % i) for i in range(count)]
+            )
+            found = layout.UserLayout(table)
+            (found.size, found.align).should.equal((size, size))
+
+    def test_cache(self):
+        t = parse.quiet_parse("array of list", "type")
+        self.layouts.layout(t).should.be(self.layouts.layout(t))
+        self.layouts.layout(t.type).should.be(
+            self.layouts.user_layout("list")
+        )
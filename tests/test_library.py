@@ -0,0 +1,62 @@
+import unittest
+
+from compiler import ast, library, parse
+
+# pylint: disable=no-member
+
+
+class TestLibrary(unittest.TestCase):
+    """Test the library namespace."""
+
+    def test_signatures(self):
+        namespace = library.NAMESPACE
+        strcpy = namespace["strcpy"]
+        strcpy.should.be.an(ast.FunctionDef)
+        self.assertIsNone(strcpy.body)
+        [param.type for param in strcpy.params].should.equal(
+            [ast.String(), ast.String()]
+        )
+        strcpy.type.should.equal(ast.Unit())
+
+        namespace["incr"].params[0].type.should.equal(ast.Ref(ast.Int()))
+        namespace["pi"].params[0].type.should.equal(ast.Unit())
+        namespace["round"].type.should.equal(ast.Int())
+
+        # Types are shared between signatures.
+        self.assertIs(
+            namespace["print_string"].params[0].type, strcpy.params[0].type
+        )
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            library.NAMESPACE["print_int"] = None
+
+    def test_names(self):
+        for name, node in library.NAMESPACE.items():
+            node.name.should.equal(name)
+            node.params.shouldnt.be.empty
+
+        # Library functions that the test programs call.
+        used = {
+            "print_int", "print_char", "print_float", "print_string",
+            "read_int", "read_string", "incr", "float_of_int",
+            "int_of_char", "char_of_int", "strlen", "strcmp", "strcpy",
+        }
+        used.difference(library.NAMESPACE).should.be.empty
+
+    def test_types_are_valid(self):
+        # Every parameter type is one that the parser would produce.
+        for node in library.NAMESPACE.values():
+            for param in node.params:
+                text = "let f (x : %s) = x" % _type_text(param.type)
+                tree = parse.quiet_parse(text)
+                tree.list[0].list[0].params[0].type.should.equal(param.type)
+
+
+def _type_text(t):
+    """Return Llama source for a library parameter type."""
+    if isinstance(t, ast.Ref):
+        return "%s ref" % _type_text(t.type)
+    if isinstance(t, ast.Array):
+        return "array of %s" % _type_text(t.type)
+    return t.name
@@ -1,3 +1,6 @@
+import pickle
+import subprocess
+import sys
 import unittest
 
 from compiler import ast, error, lex, parse
@@ -27,6 +30,31 @@ class TestModuleAPI(unittest.TestCase):
         p2 = parse.Parser(start='type')
         (parse.quiet_parse("int", start='type')).should.equal(p2.parse("int"))
 
+    @staticmethod
+    def _grammar_and_ast():
+        """Return the grammar rules and a parsed sample program."""
+        grammar = sorted(
+            (name, rule.__doc__)
+            for name, rule in vars(parse.Parser).items()
+            if name.startswith("p_") and name != "p_error"
+        )
+        tree = parse.quiet_parse("let f x = x + 1 let y = f 2 ; 3")
+        return grammar, tree
+
+    def test_parse_without_docstrings(self):
+        # Docstrings are stripped under -OO; the grammar must survive.
+        code = (
+            "import pickle, sys\n"
+            "from tests import test_parser\n"
+            "result = test_parser.TestModuleAPI._grammar_and_ast()\n"
+            "sys.stdout.buffer.write(pickle.dumps(result))\n"
+        )
+        output = subprocess.check_output((sys.executable, "-OO", "-c", code))
+        grammar, tree = pickle.loads(output)
+        expected_grammar, expected_tree = self._grammar_and_ast()
+        grammar.should.equal(expected_grammar)
+        self.assertTrue(tree == expected_tree)
+
 
 class TestParserAPI(unittest.TestCase):
     """Test the API of the Parser class."""
@@ -42,6 +70,36 @@ class TestParserAPI(unittest.TestCase):
         )
         p1.should.have.property("logger").being.equal(logger)
 
+    def test_types_are_canonical(self):
+        p1 = parse.Parser(logger=error.LoggerMock())
+        tree = p1.parse("""
+            let f (x : int -> int) (y : int -> int) = 1
+            let mutable z : int
+            let s = "abc"
+            let t = "def"
+            """)
+        fdef = tree.list[0].list[0]
+        xtype, ytype = fdef.params[0].type, fdef.params[1].type
+        xtype.should.be(ytype)
+        xtype.fromType.should.be(fdef.body.type)
+        xtype.lineno.should.equal(2)
+        xtype.lexpos.should.equal(24)
+        located = fdef.params[1].locate_type(ytype, ytype)
+        located.should.equal(ytype)
+        located.pos_to_str().should.equal("2:41:")
+        zdef = tree.list[1].list[0]
+        zdef.type.type.should.be(xtype.toType)
+        zdef.locate_type(zdef.type, xtype.toType).pos_to_str().should.equal(
+            "3:29:"
+        )
+        sconst, tconst = tree.list[2].list[0].body, tree.list[3].list[0].body
+        sconst.type.should.be(tconst.type)
+        len(p1.types).should.equal(5)
+
+        p1.parse("let x = 1").list[0].list[0].body.type.shouldnt.be(
+            fdef.body.type
+        )
+
 
 class TestParserRules(unittest.TestCase):
     """Test the Parser's coverage of Llama grammar."""
@@ -1,6 +1,9 @@
+import gc
+import threading
+import tracemalloc
 import unittest
 
-from compiler import error, parse, sem
+from compiler import ast, error, library, parse, sem
 
 # pylint: disable=no-member
 
@@ -21,6 +24,141 @@ class TestAnalyzer(unittest.TestCase):
         simple_ast = parse.quiet_parse("let x = 42")
         self.analyzer.analyze(simple_ast)
 
+    def test_analyze_deep_tree(self):
+        expr = ast.ConstExpression(0, ast.Int())
+        for _ in range(100000):
+            const = ast.ConstExpression(1, ast.Int())
+            expr = ast.BinaryExpression(expr, ";", const)
+        program = ast.Program([ast.LetDef([ast.ConstantDef("x", expr)])])
+        self.analyzer.analyze(program)
+
+    def test_let_in_scope(self):
+        program = parse.quiet_parse("let x = let y = 1 in y let z = 2")
+        self.analyzer.analyze(program)
+        table = self.analyzer.symbol_table
+        table.lookup_live_definition("y").should.be(None)
+        table.lookup_live_definition("z").shouldnt.be(None)
+
+    def _resolve(self, source):
+        program = parse.quiet_parse(source)
+        self.analyzer.analyze(program)
+        uses = []
+
+        class Collector(ast.Visitor):
+            def pre_NameUse(self, use):
+                uses.append(use)
+
+        Collector().visit(program)
+        return program, uses
+
+    def test_resolution(self):
+        program, uses = self._resolve("""
+            let x = 1
+            let rec f a b = f (a + x) b
+            let g = let x = 2 in x
+            let h n =
+                for i = n to i do print_int i done
+            let i = 0
+        """)
+        self.logger.errors.should.equal(1)
+
+        x1 = program.list[0].list[0]
+        f = program.list[1].list[0]
+        a, b = f.params
+        x2 = program.list[2].list[0].body.letdef.list[0]
+        h = program.list[3].list[0]
+        loop = h.body
+        print_int = library.NAMESPACE["print_int"]
+
+        [(use.name, use.definition) for use in uses].should.equal([
+            ("f", f), ("a", a), ("x", x1), ("b", b),
+            ("x", x2),
+            ("n", h.params[0]), ("i", None),
+            ("print_int", print_int), ("i", loop),
+        ])
+        # Each top-level let has a scope of its own, from nesting 2.
+        [use.address for use in uses].should.equal([
+            (3, 0), (4, 0), (2, 0), (4, 1),
+            (5, 0),
+            (6, 0), None,
+            (1, library.SLOTS["print_int"]), (7, 0),
+        ])
+
+    def test_match_resolution(self):
+        _, uses = self._resolve("""
+            type t = A of int int | B
+            let f y = match y with A x (z) -> x + z | B -> y end
+        """)
+        self.logger.errors.should.equal(0)
+        [use.name for use in uses].should.equal(["y", "x", "z", "y"])
+        [use.address for use in uses].should.equal(
+            [(3, 0), (4, 0), (4, 1), (3, 0)]
+        )
+        uses[1].definition.should.be.an(ast.GenidPattern)
+
+
+class TestAnalyzerStress(unittest.TestCase):
+    """Analyze many programs in one process."""
+
+    source = """
+        let rec f x = if x = 0 then 1 else x * f (x - 1)
+        let g y = let z = f y in z + y
+        let w = g 3
+    """
+
+    def _analyze(self, program, names):
+        analyzer = sem.Analyzer(logger=error.LoggerMock())
+        analyzer.analyze(program)
+        table = analyzer.symbol_table
+        for name in names:
+            self.assertIsNotNone(table.lookup_live_definition(name))
+        self.assertIsNone(table.lookup_live_definition("z"))
+        self.assertEqual(table.nesting, 4)
+
+    def test_flat_memory(self):
+        program = parse.quiet_parse(self.source)
+        names = ("f", "g", "w")
+
+        tracemalloc.start()
+        try:
+            for _ in range(100):
+                self._analyze(program, names)
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(2000):
+                self._analyze(program, names)
+            gc.collect()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        # A leak of one scope per run would be hundreds of KiB; allow
+        # for one-off allocations such as attribute caches.
+        (after - before).should.be.lower_than(64 * 1024)
+
+    def test_threads(self):
+        programs = [
+            (parse.quiet_parse(self.source.replace("w", name)), name)
+            for name in ("a", "b", "c", "d")
+        ]
+        failures = []
+
+        def work(program, name):
+            try:
+                for _ in range(300):
+                    self._analyze(program, ("f", "g", name))
+            except Exception as e:  # pylint: disable=broad-except
+                failures.append(e)
+
+        threads = [
+            threading.Thread(target=work, args=args) for args in programs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failures.should.equal([])
+
 
 class TestSemModuleAPI(unittest.TestCase):
     """Test API of the sem module."""
@@ -0,0 +1,96 @@
+import glob
+import io
+import os
+import tempfile
+import unittest
+
+from compiler import arena, ast, parse, serial
+
+# pylint: disable=no-member
+
+
+class TestSerial(unittest.TestCase):
+    """Test the binary AST format."""
+
+    @staticmethod
+    def _dumps(tree):
+        buf = io.BytesIO()
+        serial.dump(tree, buf)
+        return buf.getvalue()
+
+    def test_roundtrip(self):
+        for path in sorted(glob.glob("tests/correct/*.lla")):
+            with open(path) as source:
+                tree = parse.quiet_parse(source.read())
+            with serial.loads(self._dumps(tree)) as flat:
+                self.assertTrue(flat.to_node() == tree, path)
+
+    def test_values(self):
+        values = (
+            None, True, False, 0, -1, 2 ** 70, -2 ** 70, 1.5, "",
+            "name", "λ", ("a", "\0"), ()
+        )
+        for value in values:
+            encoded = serial._encode_value(value)
+            decoded, end = serial._decode_value(encoded, 0)
+            decoded.should.equal(value)
+            self.assertIs(type(decoded), type(value))
+            end.should.equal(len(encoded))
+
+    def test_load_file(self):
+        tree = parse.quiet_parse('let f x = x + 1 let s = "abc"')
+        with tempfile.NamedTemporaryFile(delete=False) as out:
+            serial.dump(tree, out)
+        try:
+            with serial.load(out.name) as flat:
+                flat.node_class(0).should.be(ast.Program)
+                defs = list(flat.nodes_of_class(ast.Def))
+                [flat.name(i) for i in defs].should.equal(["f", "s"])
+                fdef = tree.list[0].list[0]
+                flat.position(defs[0]).should.equal((fdef.lineno, fdef.lexpos))
+                self.assertTrue(flat.to_node(defs[1]) == tree.list[1].list[0])
+        finally:
+            os.unlink(out.name)
+
+    def test_lazy_values(self):
+        tree = parse.quiet_parse("let x = 1 let y = 2 let z = 3")
+        with serial.loads(self._dumps(tree)) as flat:
+            flat.values._cache.should.be.empty
+            defs = list(flat.nodes_of_class(ast.Def))
+            len(flat.values._cache).should.equal(0)
+            flat.name(defs[1]).should.equal("y")
+            len(flat.values._cache).should.equal(1)
+
+    def test_bad_input(self):
+        data = self._dumps(parse.quiet_parse("let x = 1"))
+        serial.loads.when.called_with(b"").should.throw(serial.SerialError)
+        serial.loads.when.called_with(
+            b"NOTLLAMA" + data[8:]
+        ).should.throw(serial.SerialError, "Not a Llama AST file")
+        serial.loads.when.called_with(
+            data[:8] + b"\xff\xff" + data[10:]
+        ).should.throw(serial.SerialError, "Unsupported AST format")
+        serial.loads.when.called_with(
+            data[:-8]
+        ).should.throw(serial.SerialError)
+
+    def test_narrow_arrays(self):
+        small = parse.quiet_parse("let x = 1")
+        with serial.loads(self._dumps(small)) as flat:
+            flat.parents.format.should.equal('b')
+            flat.linenos.format.should.equal('b')
+
+        wide = parse.quiet_parse("let x = 1" + " " * 40000 + "let y = 2")
+        with serial.loads(self._dumps(wide)) as flat:
+            flat.lexposes.format.should.equal('i')
+            self.assertTrue(flat.to_node() == wide)
+
+    def test_deep_tree(self):
+        expr = ast.ConstExpression(0, None)
+        for _ in range(100000):
+            leaf = ast.ConstExpression(0, None)
+            expr = ast.BinaryExpression(expr, ";", leaf)
+        data = self._dumps(expr)
+        with serial.loads(data) as flat:
+            len(flat).should.equal(len(arena.Arena.from_node(expr)))
+            self.assertTrue(flat.to_node() == expr)
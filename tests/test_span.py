@@ -0,0 +1,191 @@
+import copy
+import random
+import unittest
+import weakref
+
+from compiler import ast, error, parse, span
+
+# pylint: disable=no-member
+
+
+class TestSpanTable(unittest.TestCase):
+    """Test the source span table."""
+
+    source = "let f x =\n  x + 1\nlet y = (f 2)"
+
+    def setUp(self):
+        self.parser = parse.Parser(logger=error.LoggerMock())
+        self.tree = self.parser.parse(self.source)
+        self.spans = self.parser.spans
+
+    def _text(self, node):
+        start, end = node.span
+        return self.source[start:end]
+
+    def test_line_column(self):
+        table = span.SpanTable("ab\n\ncd")
+        table.line_column(0).should.equal((1, 1))
+        table.line_column(1).should.equal((1, 2))
+        table.line_column(3).should.equal((2, 1))
+        table.line_column(4).should.equal((3, 1))
+        table.line_column(5).should.equal((3, 2))
+
+    def test_offset(self):
+        table = span.SpanTable("ab\n\ncd")
+        for offset in range(6):
+            table.offset(*table.line_column(offset)).should.equal(offset)
+
+    def test_spans(self):
+        fdef = self.tree.list[0].list[0]
+        self._text(fdef).should.equal("f x =\n  x + 1")
+        self._text(fdef.body).should.equal("x + 1")
+        self._text(fdef.body.leftOperand).should.equal("x")
+        self._text(self.tree.list[1]).should.equal("let y = (f 2)")
+        self._text(self.tree.list[1].list[0].body).should.equal("(f 2)")
+
+    def test_positions(self):
+        fdef = self.tree.list[0].list[0]
+        fdef.lineno.should.equal(1)
+        fdef.lexpos.should.equal(5)
+        fdef.body.pos_to_str().should.equal("2:3:")
+        fdef.body.rightOperand.pos_to_str().should.equal("2:7:")
+
+    def test_set_pos(self):
+        fdef = self.tree.list[0].list[0]
+        fdef.lineno = 7
+        fdef.pos_to_str().should.equal("7:5:")
+        self.assertIsNone(fdef.span)
+
+        node = ast.GenidExpression("z")
+        self.assertFalse(node.has_pos())
+        count = len(self.spans)
+        node.copy_pos(fdef.body)
+        node.pos_to_str().should.equal("2:3:")
+        node.span.should.equal(fdef.body.span)
+        len(self.spans).should.equal(count)
+        self.spans.node_at(fdef.body.span[0]).should.be(fdef.body.leftOperand)
+
+        copied = copy.deepcopy(self.tree)
+        copied.list[1].span.should.equal(self.tree.list[1].span)
+        len(self.spans).should.equal(count)
+        self.spans.node_at(0).should.be(self.tree.list[0])
+
+    def test_copies_not_kept(self):
+        body = self.tree.list[0].list[0].body
+        ref = weakref.ref(copy.copy(body))
+        self.assertIsNone(ref())
+
+    def test_node_at(self):
+        fdef = self.tree.list[0].list[0]
+        self.spans.node_at(0).should.be(self.tree.list[0])
+        self.spans.node_at(4).should.be(fdef)
+        self.spans.node_at(self.source.index("x +")).should.be(
+            fdef.body.leftOperand
+        )
+        self.spans.node_at(self.source.index("+")).should.be(fdef.body)
+        call = self.tree.list[1].list[0].body
+        self.spans.node_at(self.source.index("(f")).should.be(call)
+        self.spans.node_at(self.source.index("2)")).should.be(
+            call.list[0]
+        )
+        self.assertIsNone(self.spans.node_at(len(self.source)))
+        self.assertIsNone(self.spans.node_at(self.source.index("\nlet")))
+
+    def test_node_at_many(self):
+        source = "\n".join("let x%d = %d + (%d * x)" % (i, i, i)
+                           for i in range(2000))
+        parser = parse.Parser(logger=error.LoggerMock())
+        tree = parser.parse(source)
+        last = tree.list[-1].list[0]
+        offset = source.rindex("*")
+        parser.spans.node_at(offset).should.be(last.body.rightOperand)
+
+    def test_nodes_in(self):
+        fdef = self.tree.list[0].list[0]
+        body = fdef.body
+        start = self.source.index("+")
+        self.spans.nodes_in(start, start + 3).should.equal(
+            [self.tree.list[0], fdef, body, body.rightOperand]
+        )
+        self.spans.nodes_in(start, start).should.equal(
+            [self.tree.list[0], fdef, body]
+        )
+        self.spans.nodes_in(0, len(self.source)).should.have.length_of(
+            len(self.spans.intervals())
+        )
+        end = len(self.source)
+        self.spans.nodes_in(end, end + 1).should.equal([])
+
+    def test_record_invalidates(self):
+        fdef = self.tree.list[0].list[0]
+        self.spans.node_at(4).should.be(fdef)
+        node = ast.GenidExpression("f")
+        self.spans.record(node, 4, 5)
+        self.spans.node_at(4).should.be(node)
+
+    def test_record_again(self):
+        body = self.tree.list[0].list[0].body
+        count = len(self.spans.intervals())
+        self.spans.record(body, 0, 3)
+        body.span.should.equal((0, 3))
+        body.pos_to_str().should.equal("1:1:")
+        self.spans.node_at(0).should.be(body)
+        self.spans.node_at(self.source.index("+")).shouldnt.be(body)
+        len(self.spans.intervals()).should.equal(count)
+
+
+class TestIntervalIndex(unittest.TestCase):
+    """Test the interval index against a linear scan."""
+
+    @staticmethod
+    def _nested(rng, start, end, depth, starts, ends):
+        """Add random nested intervals within 'start' and 'end'."""
+        starts.append(start)
+        ends.append(end)
+        pos = start
+        while depth and pos < end and rng.random() < 0.8:
+            child_start = rng.randrange(pos, end)
+            child_end = rng.randrange(child_start, end) + 1
+            TestIntervalIndex._nested(
+                rng, child_start, child_end, depth - 1, starts, ends
+            )
+            pos = child_end
+
+    def test_against_scan(self):
+        rng = random.Random(42)
+        for _ in range(30):
+            starts, ends = [], []
+            self._nested(rng, 0, rng.randrange(1, 300), 6, starts, ends)
+            ids = list(range(len(starts)))
+            rng.shuffle(ids)
+            index = span.IntervalIndex(starts, ends, ids)
+            index.should.have.length_of(len(starts))
+
+            def rank(i):
+                return (starts[i], -ends[i], -i)
+
+            for offset in range(-1, ends[0] + 2):
+                containing = [
+                    i for i in ids if starts[i] <= offset < ends[i]
+                ]
+                expected = max(containing, key=rank) if containing else None
+                self.assertEqual(index.innermost(offset), expected)
+
+            for _ in range(50):
+                low = rng.randrange(-1, ends[0] + 2)
+                high = low + rng.randrange(0, 40)
+                expected = sorted(
+                    (i for i in ids
+                     if starts[i] < max(high, low + 1) and ends[i] > low),
+                    key=rank
+                )
+                self.assertEqual(index.overlapping(low, high), expected)
+
+    def test_empty(self):
+        index = span.IntervalIndex([], [], [])
+        self.assertIsNone(index.innermost(0))
+        index.overlapping(0, 10).should.equal([])
+
+        index = span.IntervalIndex([3], [5], [0])
+        self.assertIsNone(index.innermost(5))
+        index.innermost(4).should.equal(0)
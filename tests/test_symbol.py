@@ -1,6 +1,7 @@
+import random
 import unittest
 
-from compiler import ast, symbol
+from compiler import ast, library, symbol
 
 # pylint: disable=no-member
 
@@ -19,6 +20,142 @@ class TestTableAPI(unittest.TestCase):
     def test_table_init():
         symbol.Table()
 
+    @staticmethod
+    def test_tables_are_independent():
+        node = ast.GenidExpression("foo")
+        table1 = symbol.Table()
+        table1.open_scope()
+        table1.insert_symbol(node)
+
+        table2 = symbol.Table()
+        table2.nesting.should.equal(1)
+        table2.lookup_live_definition("foo").should.be(None)
+        table2.open_scope()
+        table2.insert_symbol(node)
+
+        table1.close_scope()
+        table1.lookup_live_definition("foo").should.be(None)
+        table2.lookup_live_definition("foo").should.be(node)
+
+    @staticmethod
+    def test_visibility():
+        nodes = [ast.GenidExpression("x") for _ in range(3)]
+        table = symbol.Table()
+        scopes = []
+        for node in nodes:
+            scopes.append(table.open_scope())
+            table.insert_symbol(node)
+
+        scopes[1].visible = False
+        table.lookup_live_definition("x").should.be(nodes[2])
+        scopes[2].visible = False
+        table.lookup_live_definition("x").should.be(nodes[0])
+        scopes[1].visible = True
+        table.lookup_live_definition("x").should.be(nodes[1])
+        scopes[2].visible = True
+        table.lookup_live_definition("x").should.be(nodes[2])
+
+        # Names inserted into a hidden scope show up with it.
+        hidden = table.open_scope()
+        hidden.visible = False
+        node = ast.GenidExpression("x")
+        table.insert_symbol(node)
+        table.lookup_live_definition("x").should.be(nodes[2])
+        hidden.visible = True
+        table.lookup_live_definition("x").should.be(node)
+
+        table.close_scope()
+        table.lookup_live_definition("x").should.be(nodes[2])
+        scopes[2].visible = False
+        table.close_scope()
+        table.lookup_live_definition("x").should.be(nodes[1])
+        table.close_scope()
+        table.lookup_live_definition("x").should.be(nodes[0])
+
+        # Closed scopes no longer affect the table.
+        scopes[2].visible = True
+        table.lookup_live_definition("x").should.be(nodes[0])
+
+    @staticmethod
+    def test_stats():
+        table = symbol.Table()
+        table.stats().should.equal({
+            "names": 0,
+            "entries": 0,
+            "visible_entries": 0,
+            "scope_sizes": [0],
+            "library_names": len(library.NAMESPACE),
+        })
+
+        table.open_scope()
+        table.insert_symbol(ast.GenidExpression("x"))
+        table.insert_symbol(ast.GenidExpression("y"))
+        scope = table.open_scope()
+        scope.visible = False
+        table.insert_symbol(ast.GenidExpression("x"))
+        len(table).should.equal(3)
+        table.stats().should.equal({
+            "names": 2,
+            "entries": 3,
+            "visible_entries": 2,
+            "scope_sizes": [0, 2, 1],
+            "library_names": len(library.NAMESPACE),
+        })
+
+        # Failed lookups leave no trace.
+        for i in range(1000):
+            table.lookup_live_definition("z%d" % i).should.be(None)
+            table.lookup_in_current_scope("z%d" % i).should.be(None)
+        table.stats()["names"].should.equal(2)
+
+        # Neither do closed scopes.
+        table.close_scope()
+        table.close_scope()
+        table.stats().should.equal({
+            "names": 0,
+            "entries": 0,
+            "visible_entries": 0,
+            "scope_sizes": [0],
+            "library_names": len(library.NAMESPACE),
+        })
+
+    def test_library(self):
+        print_int = library.NAMESPACE["print_int"]
+        for cls in (symbol.Table, symbol.CompactTable, symbol.PersistentTable):
+            table = cls()
+            table.lookup_live_definition("print_int").should.be(print_int)
+            table.lookup_in_current_scope("print_int").should.be(print_int)
+            with self.assertRaises(symbol.RedefIdentifierError):
+                table.insert_symbol(ast.GenidExpression("print_int"))
+
+            # User definitions shadow the library.
+            table.open_scope()
+            table.lookup_in_current_scope("print_int").should.be(None)
+            node = ast.GenidExpression("print_int")
+            table.insert_symbol(node)
+            table.lookup_live_definition("print_int").should.be(node)
+            table.close_scope()
+            table.lookup_live_definition("print_int").should.be(print_int)
+            len(table).should.equal(0)
+
+            table = cls(namespace={})
+            table.lookup_live_definition("print_int").should.be(None)
+
+    def test_resolve_slots(self):
+        table = symbol.Table()
+        table.resolve("print_int").should.equal(
+            (library.NAMESPACE["print_int"], 1, library.SLOTS["print_int"])
+        )
+        node = ast.GenidExpression("x")
+        table.insert_symbol(node)
+        table.resolve("x").should.equal((node, 1, len(library.NAMESPACE)))
+
+        # Other scopes, e.g. those of top-level lets, number from 0.
+        table.open_scope()
+        other = ast.GenidExpression("y")
+        table.insert_symbol(other)
+        table.resolve("y").should.equal((other, 2, 0))
+
     def test_redef_identifier_error(self):
         exc = symbol.RedefIdentifierError
         self.assertTrue(issubclass(exc, symbol.SymbolError))
@@ -84,3 +221,131 @@ class TestTableAPI(unittest.TestCase):
         table.close_scope()
         table.close_scope()
         table.close_scope()
+
+
+class TestCompactTable(unittest.TestCase):
+    """Test the CompactTable class against Table."""
+
+    @staticmethod
+    def test_functionality():
+        expr = ast.GenidExpression("foo")
+        param = ast.Param("foo")
+
+        table = symbol.CompactTable()
+        table.nesting.should.equal(1)
+        table.open_scope().should.equal(2)
+        table.insert_symbol(expr)
+        table.lookup_in_current_scope("foo").should.be(expr)
+        table.lookup_live_definition("foo").should.be(expr)
+        table.lookup_live_definition("bar").should.be(None)
+        table.insert_symbol.when.called_with(param).should.throw(
+            symbol.RedefIdentifierError
+        )
+
+        table.open_scope(visible=False)
+        table.is_visible().should.be(False)
+        table.insert_symbol(param)
+        table.lookup_in_current_scope("foo").should.be(param)
+        table.lookup_live_definition("foo").should.be(expr)
+        table.set_visible(True)
+        table.lookup_live_definition("foo").should.be(param)
+        table.set_visible(False)
+        table.lookup_live_definition("foo").should.be(expr)
+        table.close_scope()
+        table.lookup_in_current_scope("foo").should.be(expr)
+
+        table.close_scope()
+        table.lookup_live_definition("foo").should.be(None)
+        table.stats()["interned_names"].should.equal(1)
+
+    def test_against_table(self):
+        _check_against_table(self, symbol.CompactTable)
+
+
+def _check_against_table(test, cls):
+    """Check random operations on a table of class 'cls' against Table."""
+    rng = random.Random(7)
+    names = ["n%d" % i for i in range(12)]
+    for _ in range(20):
+        table, other = symbol.Table(), cls()
+        for _ in range(500):
+            action = rng.random()
+            if action < 0.15:
+                visible = rng.random() < 0.7
+                table.open_scope().visible = visible
+                other.open_scope(visible)
+            elif action < 0.25 and table.nesting > 1:
+                table.close_scope()
+                other.close_scope()
+            elif action < 0.3:
+                visible = rng.random() < 0.5
+                table.cur_scope.visible = visible
+                other.set_visible(visible)
+            elif action < 0.6:
+                node = ast.GenidExpression(rng.choice(names))
+                try:
+                    table.insert_symbol(node)
+                except symbol.RedefIdentifierError as e:
+                    with test.assertRaises(symbol.RedefIdentifierError):
+                        other.insert_symbol(node)
+                    test.assertIs(other.lookup_in_current_scope(
+                        node.name
+                    ), e.prev)
+                else:
+                    other.insert_symbol(node)
+            else:
+                name = rng.choice(names)
+                test.assertIs(
+                    other.lookup_live_definition(name),
+                    table.lookup_live_definition(name)
+                )
+                test.assertIs(
+                    other.lookup_in_current_scope(name),
+                    table.lookup_in_current_scope(name)
+                )
+            test.assertEqual(other.nesting, table.nesting)
+            stats = other.stats()
+            stats.pop("interned_names", None)
+            test.assertEqual(stats, table.stats())
+
+
+class TestPersistentTable(unittest.TestCase):
+    """Test the PersistentTable class."""
+
+    def test_against_table(self):
+        _check_against_table(self, symbol.PersistentTable)
+
+    @staticmethod
+    def test_snapshots():
+        nodes = [ast.GenidExpression(name) for name in "xyx"]
+        table = symbol.PersistentTable()
+        table.open_scope()
+        table.insert_symbol(nodes[0])
+        outer = table.snapshot()
+
+        table.open_scope(visible=False)
+        table.insert_symbol(nodes[1])
+        inner = table.snapshot()
+        table.set_visible(True)
+        table.insert_symbol(nodes[2])
+        table.lookup_live_definition("x").should.be(nodes[2])
+
+        # Tables resume from snapshots independently of each other.
+        resumed = symbol.PersistentTable(inner)
+        resumed.nesting.should.equal(3)
+        resumed.is_visible().should.be(False)
+        resumed.lookup_live_definition("y").should.be(None)
+        resumed.lookup_in_current_scope("y").should.be(nodes[1])
+        resumed.lookup_in_current_scope("x").should.be(None)
+        resumed.close_scope()
+        resumed.lookup_live_definition("x").should.be(nodes[0])
+
+        table.lookup_live_definition("y").should.be(nodes[1])
+        symbol.PersistentTable(outer).stats().should.equal({
+            "names": 1,
+            "entries": 1,
+            "visible_entries": 1,
+            "scope_sizes": [0, 1],
+            "library_names": len(library.NAMESPACE),
+        })
+        len(table).should.equal(3)
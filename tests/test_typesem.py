@@ -261,3 +261,166 @@ class TestTable(unittest.TestCase):
                 exc.should.have.property("node")
 
                 self._assert_node_lineinfo(exc.node)
+
+    def test_validate_occurrence(self):
+        """Errors are reported where the offending type is written."""
+        tree = parse.quiet_parse(
+            """type t = A of array of array of int
+               type u = B of int
+                      | C of int ((array of array of int) -> int)
+            """
+        )
+        positions = []
+        for type_defs in tree:
+            with self.assertRaises(typesem.ArrayOfArrayError) as context:
+                typesem.Table().process(type_defs)
+            positions.append(context.exception.node.pos_to_str())
+        positions.should.equal(["1:15:", "3:36:"])
+
+    def test_validate_deep(self):
+        """Deeply nested types are validated without recursion."""
+        table = typesem.Table()
+        t = ast.Int()
+        for _ in range(100000):
+            t = ast.Function(ast.Int(), t)
+        table.validate(t)
+
+        t = ast.Function(ast.Int(), ast.Array(ast.Int()))
+        for _ in range(100000):
+            t = ast.Ref(t)
+        with self.assertRaises(typesem.ArrayReturnError):
+            table.validate(t)
+
+        # 2 ** 64 occurrences of int, but only 65 distinct types.
+        t = ast.Int()
+        for _ in range(64):
+            t = ast.Function(t, t)
+        table.validate(t)
+
+    def test_validate_memoized(self):
+        """Valid types are checked once; invalid ones every time."""
+        table = typesem.Table()
+        checked = []
+        dispatcher = table._dispatcher
+        for typecon, check in list(dispatcher.items()):
+            dispatcher[typecon] = (
+                lambda t, check=check: checked.append(t) or check(t)
+            )
+
+        curried = parse.quiet_parse("int -> int -> int", "type")
+        table.validate(curried)
+        len(checked).should.equal(3)
+        table.validate(curried)
+        table.validate(curried.toType)
+        len(checked).should.equal(3)
+
+        tree = parse.quiet_parse("foo ref", "type")
+        for _ in range(2):
+            with self.assertRaises(typesem.UndefTypeError):
+                table.validate(tree)
+        len(checked).should.equal(7)
+
+        table.process(parse.quiet_parse("type foo = Foo", "typedef"))
+        table.validate(tree)
+        table.validate(tree)
+        len(checked).should.equal(9)
+
+    def test_components(self):
+        """Types are grouped into components, dependencies first."""
+        table = typesem.Table()
+        tree = parse.quiet_parse(
+            """
+            type x = X of y z and y = Y of int and z = Z of y x
+            type w = W of x
+            """
+        )
+        for typeDefList in tree:
+            table.process(typeDefList)
+        table.components().should.equal([["y"], ["x", "z"], ["w"]])
+
+        # A long chain, defined with each type before its dependency.
+        count = 10000
+        source = " and ".join(
+            "t%d = T%d of t%d" % (i, i, i + 1) for i in range(count)
+        )
+        source = "type %s and t%d = Last" % (source, count)
+        table = typesem.Table()
+        table.process(parse.quiet_parse(source, "typedef"))
+        components = table.components()
+        len(components).should.equal(count + 1)
+        components[0].should.equal(["t%d" % count])
+        components[-1].should.equal(["t0"])
+
+    def test_type_info(self):
+        """Test the info gathered on each user type."""
+        table = typesem.Table()
+        tree = parse.quiet_parse(
+            """
+            type a = A of b | A2 and b = B of a
+            type c = C of c | C2 of int float
+            type d = D of d ref | D2 of e
+            and e = E of e (int -> e) (array of e)
+            type f = F of a d | F2 of c | F3
+            """
+        )
+        for typeDefList in tree:
+            table.process(typeDefList)
+
+        expected = {
+            "a": (True, 2, 1, 0, True),
+            "b": (True, 1, 1, 0, True),
+            "c": (True, 2, 2, 1, True),
+            "d": (True, 2, 1, 3, False),
+            "e": (True, 1, 3, 2, False),
+            "f": (False, 3, 2, 4, True),
+        }
+        for name, facts in expected.items():
+            info = table.lookup_type_info(name)
+            (
+                info.recursive, info.constructors, info.max_arity,
+                info.component, info.inhabited
+            ).should.equal(facts)
+
+        self.assertIsNone(table.lookup_type_info("int"))
+        self.assertIsNone(table.lookup_type_info("undeftype"))
+
+    def test_constructor_tables(self):
+        """Test the tag, arity and field tables of each user type."""
+        table = typesem.Table()
+        tree = parse.quiet_parse(
+            """
+            type color = Red | Green | Blue
+            type shape = Point | Circle of float | Rect of float float color
+            """
+        )
+        for typeDefList in tree:
+            table.process(typeDefList)
+
+        colors = table.lookup_constructor_table("color")
+        len(colors).should.equal(3)
+        colors.names.should.equal(("Red", "Green", "Blue"))
+        list(colors.arities).should.equal([0, 0, 0])
+        colors.fields.should.equal(((), (), ()))
+        self.assertTrue(colors.enum)
+
+        shapes = table.lookup_constructor_table("shape")
+        shapes.names.should.equal(("Point", "Circle", "Rect"))
+        list(shapes.arities).should.equal([0, 1, 3])
+        self.assertFalse(shapes.enum)
+        float_type, _, color_type = shapes.fields[2]
+        float_type.should.be(shapes.fields[1][0])
+        color_type.should.equal(ast.User("color"))
+
+        for name, owner, tag in (
+            ("Red", colors, 0),
+            ("Blue", colors, 2),
+            ("Point", shapes, 0),
+            ("Rect", shapes, 2),
+        ):
+            found, found_tag = table.lookup_tag(name)
+            found.should.be(owner)
+            found_tag.should.equal(tag)
+            found.nodes[tag].should.be(table.lookup_constructor(name)[0])
+
+        self.assertIsNone(table.lookup_tag("Nothing"))
+        self.assertIsNone(table.lookup_constructor_table("int"))